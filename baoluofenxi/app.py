@@ -1,12 +1,30 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, send_file
 from flask_cors import CORS
+import click
 import os
 import logging
-from datetime import datetime
-from config import config
-from database import init_db, db
+from datetime import datetime, timezone
+from config import config, load_database_settings
+from database import init_db, bootstrap_database, db
+from database_config import db_config
 from models.models import ExperimentType, ExperimentData, EnvelopeSettings
 from services.data_processor import DataProcessor
+from services.chunked_upload import ChunkedUploadManager
+from services.storage_types import normalize_storage_spec
+from services.envelope_store import MEDIA_TYPE as ENVELOPE_MEDIA_TYPE
+from services.envelope_cache import EnvelopeCacheService
+from services.cache_warmer import CacheWarmer, start_cache_warmer, schedule_cache_warmup
+from services.clickhouse_manager import get_clickhouse_manager
+from services.maintenance import MaintenanceService, start_maintenance_scheduler
+from services.compression import compress_response, negotiate_encoding, precompressed_file
+from services.http_cache import make_etag, not_modified, with_etag
+from services.json_provider import NumpyJSONProvider
+from services.warmup import start_background_warmup
+from services.response_formats import (
+    UnsupportedFormatError,
+    format_response,
+    negotiate_format,
+)
 
 # 配置日志
 logging.basicConfig(
@@ -14,8 +32,18 @@ logging.basicConfig(
 )
 
 
-def create_app(config_name=None):
-    """应用工厂函数"""
+def create_app(config_name=None, start_background=None, bootstrap=None):
+    """
+    应用工厂函数
+
+    创建应用时不连接数据库：连接在第一次使用时建立（或由后台预热建立），
+    建库建表由 flask --app app init-db 显式执行。
+
+    Args:
+        start_background: 是否启动缓存预热、定期维护和后台预热线程；默认在
+            flask 命令行中不启动；多进程服务器（wsgi.py）在fork出的工作进程中再启动
+        bootstrap: 是否在启动时建库建表，默认取配置 bootstrap_on_start
+    """
     # 设置前端静态文件路径
     frontend_dist_path = os.path.join(
         os.path.dirname(__file__), 'web'
@@ -24,6 +52,8 @@ def create_app(config_name=None):
     app = Flask(__name__,
                 static_folder=frontend_dist_path,
                 static_url_path='')
+    # 响应中的numpy数组/标量、NaN与datetime由自定义JSON provider处理
+    app.json = NumpyJSONProvider(app)
 
     # 启用CORS支持前后端分离（保留用于开发环境）
     CORS(
@@ -40,9 +70,15 @@ def create_app(config_name=None):
     # 加载配置
     config_name = config_name or os.environ.get("FLASK_CONFIG") or "default"
     app.config.from_object(config[config_name])
+    app.config.update(load_database_settings())
 
     # 初始化数据库
     init_db(app)
+    if bootstrap if bootstrap is not None else app.config.get("BOOTSTRAP_ON_START"):
+        bootstrap_storage(app)
+
+    # 注册命令行命令
+    register_cli_commands(app)
 
     # 注册API路由
     register_api_routes(app)
@@ -50,9 +86,49 @@ def create_app(config_name=None):
     # 注册前端路由
     register_frontend_routes(app)
 
+    # 按Accept-Encoding压缩API响应
+    if app.config.get("COMPRESSION_ENABLED"):
+        app.after_request(compress_response)
+
+    if start_background is None:
+        # flask 命令行（init-db 等）只执行命令，不需要后台线程
+        start_background = os.environ.get("FLASK_RUN_FROM_CLI") != "true"
+    if start_background:
+        # 后台建立数据库连接
+        if app.config.get("WARMUP_ON_START"):
+            start_background_warmup(app)
+
+        # 后台预热已保存配置的包络缓存
+        if app.config.get("CACHE_WARM_ENABLED"):
+            start_cache_warmer(app)
+
+        # 定期清理过期缓存和不再引用的ClickHouse表
+        if app.config.get("MAINTENANCE_ENABLED"):
+            start_maintenance_scheduler(app)
+
     return app
 
 
+def bootstrap_storage(app):
+    """创建MySQL数据库、表和基础数据，以及ClickHouse数据库"""
+    bootstrap_database(app)
+    if app.config.get("USE_CLICKHOUSE"):
+        get_clickhouse_manager().ensure_database_exists()
+
+
+def register_cli_commands(app):
+    """注册命令行命令（flask --app app <命令>）"""
+
+    @app.cli.command("init-db")
+    def init_db_command():
+        """创建数据库、表和基础数据（部署和升级后执行一次）"""
+        if not os.path.exists(db_config.config_file):
+            db_config.save_config()
+            click.echo(f"已生成默认配置文件 {db_config.config_file}")
+        bootstrap_storage(app)
+        click.echo("数据库初始化完成")
+
+
 def register_api_routes(app):
     """注册所有API路由"""
 
@@ -77,6 +153,7 @@ def register_api_routes(app):
             description = data.get("description", "")
             time_column = data.get("time_column", "t")
             data_columns = data.get("data_columns", [])
+            storage_types = data.get("storage_types") or None
 
             if not name or not data_columns:
                 return (
@@ -84,12 +161,19 @@ def register_api_routes(app):
                     400,
                 )
 
+            # 校验列存储类型配置（Float32 / 定点Int32）
+            try:
+                normalize_storage_spec(storage_types, data_columns)
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
+
             # 创建试验类型
             experiment_type = ExperimentType(
                 name=name,
                 description=description,
                 time_column=time_column,
                 data_columns=data_columns,
+                storage_types=storage_types,
             )
 
             db.session.add(experiment_type)
@@ -180,6 +264,7 @@ def register_api_routes(app):
                         "success": True,
                         "message": "上传成功",
                         "data_id": result["data_id"],
+                        "deduplicated": result.get("deduplicated", False),
                     }
                 )
             else:
@@ -189,6 +274,134 @@ def register_api_routes(app):
             logging.error(f"上传数据失败: {e}")
             return jsonify({"success": False, "message": f"上传失败: {str(e)}"}), 500
 
+    @app.route("/api/upload/<int:experiment_type_id>/chunked/init", methods=["POST"])
+    def init_chunked_upload(experiment_type_id):
+        """初始化分块上传（用于超过单次请求大小限制的大文件）"""
+        try:
+            experiment_type = ExperimentType.query.get_or_404(experiment_type_id)
+            data = request.json or {}
+
+            data_name = data.get("data_name", "")
+            file_name = data.get("file_name", "")
+            total_size = data.get("total_size")
+
+            if not data_name:
+                return jsonify({"success": False, "message": "请输入数据名称"}), 400
+
+            if not file_name or not total_size:
+                return jsonify({"success": False, "message": "缺少文件名或文件大小"}), 400
+
+            manager = ChunkedUploadManager()
+            if not manager.is_allowed_file(file_name):
+                return jsonify({"success": False, "message": "不支持的文件格式"}), 400
+
+            result = manager.init_upload(
+                experiment_type.id,
+                data_name,
+                file_name,
+                total_size,
+                chunk_size=data.get("chunk_size"),
+                file_checksum=data.get("file_checksum"),
+            )
+            if not result["success"]:
+                return jsonify(result), 400
+
+            # CSV在第一个分块到达前就开始后台流式解析
+            manager.start_ingest(app, result["data"]["upload_id"])
+
+            return jsonify(result), 201
+
+        except Exception as e:
+            logging.error(f"初始化分块上传失败: {e}")
+            return jsonify({"success": False, "message": f"初始化失败: {str(e)}"}), 500
+
+    @app.route(
+        "/api/upload/chunked/<upload_id>/chunks/<int:index>", methods=["PUT", "POST"]
+    )
+    def append_upload_chunk(upload_id, index):
+        """上传单个分块，请求体为分块原始字节，校验值放在X-Chunk-Checksum头中"""
+        try:
+            if "chunk" in request.files:
+                chunk_data = request.files["chunk"].read()
+                checksum = request.form.get("checksum")
+            else:
+                chunk_data = request.get_data(cache=False)
+                checksum = request.headers.get("X-Chunk-Checksum")
+
+            manager = ChunkedUploadManager()
+            result = manager.append_chunk(upload_id, index, chunk_data, checksum)
+            if not result["success"]:
+                return jsonify(result), 400
+
+            # 解析任务所在的工作进程已退出时重新开始
+            manager.start_ingest(app, upload_id)
+
+            return jsonify(result)
+
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            logging.error(f"上传分块失败: {e}")
+            return jsonify({"success": False, "message": f"上传分块失败: {str(e)}"}), 500
+
+    @app.route("/api/upload/chunked/<upload_id>", methods=["GET"])
+    def get_chunked_upload_status(upload_id):
+        """获取分块上传状态（断点续传时用于查询缺失的分块）"""
+        try:
+            result = ChunkedUploadManager().get_status(upload_id)
+            if not result["success"]:
+                return jsonify(result), 404
+
+            return jsonify(result)
+
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            logging.error(f"获取分块上传状态失败: {e}")
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    @app.route("/api/upload/chunked/<upload_id>/complete", methods=["POST"])
+    def complete_chunked_upload(upload_id):
+        """完成分块上传并入库"""
+        try:
+            result = ChunkedUploadManager().complete_upload(upload_id)
+
+            if result.get("processing"):
+                return jsonify(result), 202
+
+            if result["success"]:
+                return jsonify(
+                    {
+                        "success": True,
+                        "message": "上传成功",
+                        "data_id": result["data_id"],
+                    }
+                )
+            else:
+                return jsonify(result), 400
+
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            logging.error(f"完成分块上传失败: {e}")
+            return jsonify({"success": False, "message": f"上传失败: {str(e)}"}), 500
+
+    @app.route("/api/upload/chunked/<upload_id>", methods=["DELETE"])
+    def abort_chunked_upload(upload_id):
+        """取消分块上传"""
+        try:
+            result = ChunkedUploadManager().abort_upload(upload_id)
+            if not result["success"]:
+                return jsonify(result), 404
+
+            return jsonify(result)
+
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        except Exception as e:
+            logging.error(f"取消分块上传失败: {e}")
+            return jsonify({"success": False, "message": str(e)}), 500
+
     @app.route("/api/preview/<int:experiment_type_id>", methods=["POST"])
     def preview_data(experiment_type_id):
         """预览上传的文件数据"""
@@ -252,6 +465,25 @@ def register_api_routes(app):
         try:
             experiment_type = ExperimentType.query.get_or_404(experiment_type_id)
 
+            # 数据未变化时只比较ETag：新增/删除改变行数和最大ID，修改更新updated_at
+            data_state = (
+                db.session.query(
+                    db.func.count(ExperimentData.id),
+                    db.func.max(ExperimentData.id),
+                    db.func.max(ExperimentData.updated_at),
+                )
+                .filter(ExperimentData.experiment_type_id == experiment_type_id)
+                .one()
+            )
+            etag = make_etag(
+                "experiment-data",
+                experiment_type.to_dict(),
+                *data_state,
+            )
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
             # 获取所有试验数据
             experiment_data = (
                 ExperimentData.query.filter_by(
@@ -264,9 +496,11 @@ def register_api_routes(app):
             data_list = []
             for data in experiment_data:
                 data_dict = data.to_dict()
-                # 添加一些额外的统计信息
+                # 添加一些额外的统计信息（upload_time为UTC时间，按服务器时区显示）
                 data_dict["upload_time_formatted"] = (
-                    data.upload_time.strftime("%Y-%m-%d %H:%M:%S")
+                    data.upload_time.replace(tzinfo=timezone.utc)
+                    .astimezone()
+                    .strftime("%Y-%m-%d %H:%M:%S")
                     if data.upload_time
                     else ""
                 )
@@ -279,7 +513,7 @@ def register_api_routes(app):
                 data.row_count for data in experiment_data if data.row_count
             )
 
-            return jsonify(
+            response = jsonify(
                 {
                     "success": True,
                     "data": {
@@ -294,6 +528,7 @@ def register_api_routes(app):
                     },
                 }
             )
+            return with_etag(response, etag)
 
         except Exception as e:
             logging.error(f"获取试验数据列表失败: {e}")
@@ -308,9 +543,15 @@ def register_api_routes(app):
             data = request.json
             is_historical = data.get("is_historical", False)
 
+            changed = bool(experiment_data.is_historical) != bool(is_historical)
             experiment_data.is_historical = is_historical
             db.session.commit()
 
+            # 历史数据集变化，已缓存的包络立即失效
+            if changed:
+                EnvelopeCacheService().bump_version(experiment_data.experiment_type_id)
+                schedule_cache_warmup(experiment_data.experiment_type_id)
+
             status_text = "历史数据" if is_historical else "活跃数据"
 
             return jsonify(
@@ -332,12 +573,14 @@ def register_api_routes(app):
         try:
             experiment_data = ExperimentData.query.get_or_404(data_id)
 
-            # 软删除，只修改状态
+            # 软删除，ClickHouse中的表在宽限期后由维护任务删除
             experiment_data.status = "deleted"
+            experiment_data.deleted_at = datetime.utcnow()
             db.session.commit()
 
-            # TODO: 可以考虑同时删除ClickHouse中的表
-            # 但为了数据安全，暂时只做软删除
+            if experiment_data.is_historical:
+                EnvelopeCacheService().bump_version(experiment_data.experiment_type_id)
+                schedule_cache_warmup(experiment_data.experiment_type_id)
 
             return jsonify(
                 {
@@ -359,6 +602,12 @@ def register_api_routes(app):
 
             data_info = experiment_data.to_dict()
 
+            # ClickHouse表创建后不再修改，记录未变化时无需查询表信息
+            etag = make_etag("experiment-data-info", data_info)
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
             # 如果有ClickHouse表名，获取表信息
             if experiment_data.clickhouse_table_name:
                 try:
@@ -372,13 +621,146 @@ def register_api_routes(app):
                 except Exception as e:
                     logging.warning(f"获取ClickHouse表信息失败: {e}")
                     data_info["clickhouse_info"] = {"error": str(e)}
+                    etag = None
 
-            return jsonify({"success": True, "data": data_info})
+            return with_etag(jsonify({"success": True, "data": data_info}), etag)
 
         except Exception as e:
             logging.error(f"获取试验数据信息失败: {e}")
             return jsonify({"success": False, "message": str(e)}), 500
 
+    @app.route("/api/experiment-data/<int:data_id>/data", methods=["GET"])
+    def get_experiment_data_columns(data_id):
+        """
+        按列获取单次试验的原始数据
+
+        查询参数：columns=C1,C3、time_min/time_max、limit、format；
+        数据量大时可通过 format 或 Accept 头选择二进制格式
+        """
+        try:
+            experiment_data = ExperimentData.query.get_or_404(data_id)
+            if experiment_data.status != "active":
+                return jsonify({"success": False, "message": "数据不存在"}), 404
+
+            args = request.args
+            columns = [
+                column
+                for column in ",".join(args.getlist("columns")).split(",")
+                if column
+            ]
+            time_min = args.get("time_min", type=float)
+            time_max = args.get("time_max", type=float)
+            if (time_min is None) != (time_max is None):
+                return (
+                    jsonify(
+                        {"success": False, "message": "time_min与time_max需同时指定"}
+                    ),
+                    400,
+                )
+            time_range = (time_min, time_max) if time_min is not None else None
+            limit = args.get("limit", type=int)
+
+            try:
+                output_format = negotiate_format(args.get("format"))
+            except UnsupportedFormatError as e:
+                return jsonify({"success": False, "message": str(e)}), 406
+
+            # ClickHouse表写入后不再修改
+            etag = make_etag(
+                "experiment-data-columns",
+                data_id,
+                experiment_data.clickhouse_table_name,
+                columns,
+                time_range,
+                limit,
+                output_format,
+            )
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            processor = DataProcessor()
+            result = processor.get_run_columns(
+                experiment_data,
+                columns,
+                time_range,
+                limit,
+            )
+            if not result["success"]:
+                return jsonify(result), 400
+
+            return with_etag(format_response(result["data"], output_format), etag)
+
+        except Exception as e:
+            logging.error(f"获取试验数据失败: {e}")
+            return jsonify({"success": False, "message": str(e)}), 500
+
+    @app.route("/api/experiment-data/<int:data_id>/page", methods=["GET"])
+    def get_experiment_data_page(data_id):
+        """
+        按时间键集分页浏览单次试验的原始数据
+
+        查询参数：columns=C1,C3、after 与 after_offset（下一页）或 before 与
+        before_offset（上一页）、page_size、format
+        """
+        try:
+            experiment_data = ExperimentData.query.get_or_404(data_id)
+            if experiment_data.status != "active":
+                return jsonify({"success": False, "message": "数据不存在"}), 404
+
+            args = request.args
+            columns = [
+                column
+                for column in ",".join(args.getlist("columns")).split(",")
+                if column
+            ]
+            after = args.get("after", type=float)
+            before = args.get("before", type=float)
+            after_offset = args.get("after_offset", type=int)
+            before_offset = args.get("before_offset", type=int)
+            if (after_offset is not None and after is None) or (
+                before_offset is not None and before is None
+            ):
+                return jsonify(
+                    {"success": False, "message": "游标偏移需要与对应的 after 或 before 一起指定"}
+                ), 400
+            offset = after_offset if after is not None else before_offset
+            page_size = args.get("page_size", type=int)
+
+            try:
+                output_format = negotiate_format(args.get("format"))
+            except UnsupportedFormatError as e:
+                return jsonify({"success": False, "message": str(e)}), 406
+
+            # ClickHouse表写入后不再修改
+            etag = make_etag(
+                "experiment-data-page",
+                data_id,
+                experiment_data.clickhouse_table_name,
+                columns,
+                after,
+                before,
+                offset,
+                page_size,
+                output_format,
+            )
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            processor = DataProcessor()
+            result = processor.get_run_page(
+                experiment_data, columns, after, before, page_size, offset
+            )
+            if not result["success"]:
+                return jsonify(result), 400
+
+            return with_etag(format_response(result["data"], output_format), etag)
+
+        except Exception as e:
+            logging.error(f"分页获取试验数据失败: {e}")
+            return jsonify({"success": False, "message": str(e)}), 500
+
     @app.route(
         "/api/envelope/<int:experiment_type_id>/settings", methods=["GET", "POST"]
     )
@@ -406,6 +788,10 @@ def register_api_routes(app):
 
                 db.session.commit()
 
+                schedule_cache_warmup(
+                    experiment_type_id, CacheWarmer.PRIORITY_SETTINGS_CHANGE
+                )
+
                 return jsonify({"success": True, "message": "设置保存成功"})
 
             except Exception as e:
@@ -420,16 +806,49 @@ def register_api_routes(app):
 
             return jsonify(settings.to_dict() if settings else {})
 
-    @app.route("/api/envelope/<int:experiment_type_id>/envelope", methods=["POST"])
+    @app.route(
+        "/api/envelope/<int:experiment_type_id>/envelope", methods=["GET", "POST"]
+    )
     def get_envelope_data(experiment_type_id):
-        """获取包络数据API"""
+        """
+        获取包络数据API
+
+        POST使用JSON请求体；GET使用查询参数（columns=C1,C3），便于浏览器和代理缓存
+        """
         try:
-            data = request.get_json()
-            selected_columns = data.get("selected_columns", [])
+            if request.method == "POST":
+                data = request.get_json() or {}
+                selected_columns = data.get("selected_columns", [])
 
-            # 新增参数：采样配置
-            use_sampling = data.get("use_sampling", True)
-            sampling_points = data.get("sampling_points", 200)
+                # 新增参数：采样配置
+                use_sampling = data.get("use_sampling", True)
+                sampling_points = data.get("sampling_points", 200)
+                # 汇总分辨率（时间桶宽度），不传时按采样点数自动选择
+                resolution = data.get("resolution")
+                output_format = data.get("format") or request.args.get("format")
+            else:
+                args = request.args
+                selected_columns = [
+                    column
+                    for column in ",".join(args.getlist("columns")).split(",")
+                    if column
+                ]
+                use_sampling = args.get("use_sampling", "true").lower() not in (
+                    "false",
+                    "0",
+                )
+                sampling_points = args.get("sampling_points", 200, type=int)
+                resolution = args.get("resolution", type=float)
+                output_format = args.get("format")
+            # 格式由 format 参数或 Accept 头决定；
+            # binary: 直接返回二进制缓存文件，不经过JSON编解码
+            try:
+                output_format = negotiate_format(
+                    output_format, {"binary": ENVELOPE_MEDIA_TYPE}
+                )
+            except UnsupportedFormatError as e:
+                return jsonify({"success": False, "message": str(e)}), 406
+            binary = output_format == "binary"
 
             if not selected_columns:
                 return (
@@ -437,12 +856,32 @@ def register_api_routes(app):
                     400,
                 )
 
+            # 历史数据集版本和请求参数相同则包络不变，只需比较ETag
+            etag = None
+            version = EnvelopeCacheService().historical_version(experiment_type_id)
+            if version is not None:
+                etag = make_etag(
+                    "envelope",
+                    experiment_type_id,
+                    version,
+                    sorted(set(selected_columns)),
+                    bool(use_sampling),
+                    sampling_points if use_sampling else None,
+                    float(resolution) if resolution is not None else None,
+                    output_format,
+                )
+                cached = not_modified(etag)
+                if cached:
+                    return cached
+
             processor = DataProcessor()
             envelope_data = processor.calculate_envelope_for_columns(
                 experiment_type_id,
                 selected_columns,
                 sampling_points=sampling_points,
                 use_sampling=use_sampling,
+                resolution=resolution,
+                binary=binary,
             )
 
             if "error" in envelope_data:
@@ -451,7 +890,26 @@ def register_api_routes(app):
                     400,
                 )
 
-            return jsonify({"success": True, "data": envelope_data})
+            if binary:
+                # 缓存文件不再修改，压缩结果保存为同目录下的预压缩文件，之后直接发送
+                cache_file = envelope_data["cache_file"]
+                encoding = (
+                    negotiate_encoding() if app.config.get("COMPRESSION_ENABLED") else None
+                )
+                if encoding:
+                    cache_file = precompressed_file(cache_file, encoding)
+                response = send_file(
+                    cache_file,
+                    mimetype=ENVELOPE_MEDIA_TYPE,
+                    conditional=False,
+                    etag=False,
+                )
+                if encoding:
+                    response.content_encoding = encoding
+                response.vary.add("Accept")
+                return with_etag(response, etag)
+
+            return with_etag(format_response(envelope_data, output_format), etag)
 
         except Exception as e:
             logging.error(f"获取包络数据失败: {e}")
@@ -466,7 +924,7 @@ def register_api_routes(app):
 
     @app.route("/api/envelope/<int:experiment_type_id>/temp-upload", methods=["POST"])
     def upload_temp_comparison_data(experiment_type_id):
-        """上传临时对比数据到ClickHouse"""
+        """上传临时对比数据（本地暂存区或ClickHouse临时表）"""
         try:
             experiment_type = ExperimentType.query.get_or_404(experiment_type_id)
 
@@ -521,9 +979,22 @@ def register_api_routes(app):
             selected_columns = data.get("selected_columns", [])
             temp_data_id = data.get("temp_data_id")
 
-            # 新增：对比数据采样配置
+            # 包络和对比数据共用的网格：resolution 为时间间隔，优先于采样点数；
+            # 不采样时点数取包络与对比数据中较多的一方
             use_sampling = data.get("use_sampling", True)
             sampling_points = data.get("sampling_points", 200)
+            resolution = data.get("resolution")
+            if resolution is not None and float(resolution) <= 0:
+                return jsonify({"success": False, "message": "网格间隔必须大于0"}), 400
+            align = bool(data.get("align", False))
+            max_shift = data.get("max_shift")
+            max_shift = float(max_shift) if max_shift is not None else None
+            try:
+                output_format = negotiate_format(
+                    data.get("format") or request.args.get("format")
+                )
+            except UnsupportedFormatError as e:
+                return jsonify({"success": False, "message": str(e)}), 406
 
             if not selected_columns:
                 return (
@@ -534,67 +1005,175 @@ def register_api_routes(app):
             if not temp_data_id:
                 return jsonify({"success": False, "message": "缺少临时数据ID"}), 400
 
+            # 历史包络由版本决定，临时表上传后不再修改
+            etag = make_etag(
+                "compare",
+                experiment_type_id,
+                EnvelopeCacheService().historical_version(experiment_type_id),
+                list(selected_columns),
+                temp_data_id,
+                bool(use_sampling),
+                sampling_points if use_sampling else None,
+                resolution,
+                align,
+                max_shift if align else None,
+                output_format,
+            )
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            # 历史包络与对比数据在同一流程中重采样到同一网格，可直接逐点叠加
             processor = DataProcessor()
+            result = processor.compare_on_grid(
+                experiment_type,
+                selected_columns,
+                temp_data_id,
+                points=sampling_points if use_sampling else None,
+                resolution=float(resolution) if resolution else None,
+                align=align,
+                max_shift=max_shift,
+            )
+            if not result["success"]:
+                return jsonify(result), 400
 
-            # 获取历史包络数据（使用之前设置的采样配置）
-            envelope_result = processor.calculate_envelope_simple(
-                experiment_type_id, selected_columns
+            comparison_data = result["data"]["comparison_data"]
+            response = format_response(
+                {
+                    **result["data"],
+                    "comparison_sampling_info": {
+                        "use_sampling": use_sampling,
+                        "sampling_points": comparison_data["sampling_points"],
+                        "original_points": comparison_data["original_points"],
+                        "sampling_method": comparison_data["sampling_method"],
+                    },
+                },
+                output_format,
             )
-            if not envelope_result["success"]:
+            return with_etag(response, etag)
+
+        except Exception as e:
+            logging.error(f"包络对比失败: {e}")
+            return jsonify({"success": False, "message": f"对比失败: {str(e)}"}), 500
+
+    @app.route("/api/envelope/<int:experiment_type_id>/batch-compare", methods=["POST"])
+    def batch_compare_envelope(experiment_type_id):
+        """批量检查多次对比试验（临时数据或已入库数据）是否超出同一历史包络"""
+        try:
+            experiment_type = ExperimentType.query.get_or_404(experiment_type_id)
+            data = request.get_json() or {}
+
+            selected_columns = data.get("selected_columns", [])
+            runs = list(data.get("runs", []))
+            runs += [{"temp_data_id": run} for run in data.get("temp_data_ids", [])]
+            runs += [{"data_id": run} for run in data.get("data_ids", [])]
+
+            if not selected_columns:
                 return (
-                    jsonify(
-                        {
-                            "success": False,
-                            "message": f'获取历史包络失败: {envelope_result["message"]}',
-                        }
-                    ),
+                    jsonify({"success": False, "message": "请选择要对比的数据列"}),
                     400,
                 )
 
-            # 获取临时对比数据（应用采样配置）
-            comparison_result = processor.get_temp_comparison_data(
-                temp_data_id,
-                experiment_type.time_column,
+            if not runs or any(
+                not run.get("temp_data_id") and run.get("data_id") is None
+                for run in runs
+            ):
+                return (
+                    jsonify({"success": False, "message": "缺少要对比的数据"}),
+                    400,
+                )
+
+            processor = DataProcessor()
+            result = processor.batch_check_exceedance(
+                experiment_type,
                 selected_columns,
-                use_sampling=use_sampling,
-                sampling_points=sampling_points,
+                runs,
+                tolerance=float(data.get("tolerance", 0)),
+                trace_points=int(data.get("trace_points", 0)),
+                max_intervals=int(data.get("max_intervals", 5)),
+                align=bool(data.get("align", False)),
+                max_shift=(
+                    float(data["max_shift"])
+                    if data.get("max_shift") is not None
+                    else None
+                ),
             )
-            if not comparison_result["success"]:
+            if not result["success"]:
+                return jsonify(result), 400
+
+            return jsonify(result)
+
+        except Exception as e:
+            logging.error(f"批量对比失败: {e}")
+            return jsonify({"success": False, "message": f"批量对比失败: {str(e)}"}), 500
+
+    @app.route("/api/envelope/<int:experiment_type_id>/exceedance", methods=["POST"])
+    def check_envelope_exceedance(experiment_type_id):
+        """在服务端检查对比数据是否超出历史包络，只返回超限区间和降采样曲线"""
+        try:
+            experiment_type = ExperimentType.query.get_or_404(experiment_type_id)
+            data = request.get_json() or {}
+
+            selected_columns = data.get("selected_columns", [])
+            temp_data_id = data.get("temp_data_id")
+            data_id = data.get("data_id")
+            tolerance = float(data.get("tolerance", 0))
+            trace_points = int(data.get("trace_points", 500))
+            max_intervals = int(data.get("max_intervals", 20))
+            # 可选：检查前按与包络中心线的互相关估计并消除时间偏移
+            align = bool(data.get("align", False))
+            max_shift = data.get("max_shift")
+            max_shift = float(max_shift) if max_shift is not None else None
+
+            if not selected_columns:
                 return (
-                    jsonify(
-                        {
-                            "success": False,
-                            "message": f'获取对比数据失败: {comparison_result["message"]}',
-                        }
-                    ),
+                    jsonify({"success": False, "message": "请选择要对比的数据列"}),
                     400,
                 )
 
-            return jsonify(
-                {
-                    "success": True,
-                    "data": {
-                        "envelope_data": envelope_result["data"],
-                        "comparison_data": comparison_result["data"],
-                        "comparison_sampling_info": {
-                            "use_sampling": use_sampling,
-                            "sampling_points": comparison_result["data"].get(
-                                "sampling_points", 0
-                            ),
-                            "original_points": comparison_result["data"].get(
-                                "original_points", 0
-                            ),
-                            "sampling_method": comparison_result["data"].get(
-                                "sampling_method", "unknown"
-                            ),
-                        },
-                    },
-                }
+            if not temp_data_id and data_id is None:
+                return (
+                    jsonify({"success": False, "message": "缺少临时数据ID或数据ID"}),
+                    400,
+                )
+
+            etag = make_etag(
+                "exceedance",
+                experiment_type_id,
+                EnvelopeCacheService().historical_version(experiment_type_id),
+                list(selected_columns),
+                temp_data_id,
+                data_id,
+                tolerance,
+                trace_points,
+                max_intervals,
+                align,
+                max_shift if align else None,
             )
+            cached = not_modified(etag)
+            if cached:
+                return cached
+
+            processor = DataProcessor()
+            result = processor.check_run_exceedance(
+                experiment_type,
+                selected_columns,
+                temp_table_name=temp_data_id,
+                data_id=data_id,
+                tolerance=tolerance,
+                trace_points=trace_points,
+                max_intervals=max_intervals,
+                align=align,
+                max_shift=max_shift,
+            )
+            if not result["success"]:
+                return jsonify(result), 400
+
+            return with_etag(jsonify(result), etag)
 
         except Exception as e:
-            logging.error(f"包络对比失败: {e}")
-            return jsonify({"success": False, "message": f"对比失败: {str(e)}"}), 500
+            logging.error(f"包络超限检查失败: {e}")
+            return jsonify({"success": False, "message": f"超限检查失败: {str(e)}"}), 500
 
     @app.route("/api/envelope/<int:experiment_type_id>/save-temp", methods=["POST"])
     def save_temp_data(experiment_type_id):
@@ -675,6 +1254,22 @@ def register_api_routes(app):
             logging.error(f"获取数据管理信息失败: {e}")
             return jsonify({"success": False, "message": str(e)}), 500
 
+    @app.route("/api/maintenance/run", methods=["POST"])
+    def run_maintenance():
+        """立即执行一次维护（dry_run=true 时只统计不删除）"""
+        try:
+            data = request.get_json(silent=True) or {}
+            dry_run = bool(data.get("dry_run", False))
+
+            result = MaintenanceService().run(dry_run=dry_run)
+            if not result["success"]:
+                return jsonify(result), 409
+            return jsonify(result)
+
+        except Exception as e:
+            logging.error(f"执行维护失败: {e}")
+            return jsonify({"success": False, "message": f"维护失败: {str(e)}"}), 500
+
     @app.errorhandler(404)
     def not_found(error):
         return jsonify({"success": False, "message": "API endpoint not found"}), 404
@@ -718,8 +1313,7 @@ def register_frontend_routes(app):
                 )
 
 
-# 创建应用实例
-app = create_app()
-
 if __name__ == "__main__":
+    # 开发服务器；生产环境使用 gunicorn -c gunicorn.conf.py wsgi:app
+    app = create_app()
     app.run(debug=True, host="0.0.0.0", port=5005)
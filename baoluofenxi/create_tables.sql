@@ -13,6 +13,8 @@ CREATE TABLE `experiment_types` (
   `description` text CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL,
   `time_column` varchar(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL,
   `data_columns` json NULL,
+  `storage_types` json NULL,
+  `historical_version` int NOT NULL DEFAULT 0,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   PRIMARY KEY (`id`) USING BTREE,
   UNIQUE INDEX `name`(`name` ASC) USING BTREE
@@ -32,8 +34,19 @@ CREATE TABLE `experiment_data` (
   `upload_time` timestamp NULL DEFAULT CURRENT_TIMESTAMP,
   `is_historical` tinyint(1) NULL DEFAULT 0,
   `status` varchar(20) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT 'active',
+  `summary_resolutions` json NULL,
+  `time_min` double NULL DEFAULT NULL,
+  `time_max` double NULL DEFAULT NULL,
+  `source_hash` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL,
+  `content_hash` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL,
+  `prefix_hash` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL,
+  `deleted_at` datetime NULL DEFAULT NULL,
+  `updated_at` datetime NULL DEFAULT NULL,
   PRIMARY KEY (`id`) USING BTREE,
-  UNIQUE INDEX `clickhouse_table_name`(`clickhouse_table_name` ASC) USING BTREE,
+  INDEX `clickhouse_table_name`(`clickhouse_table_name` ASC) USING BTREE,
+  INDEX `ix_experiment_data_source_hash`(`source_hash` ASC) USING BTREE,
+  INDEX `ix_experiment_data_content_hash`(`content_hash` ASC) USING BTREE,
+  INDEX `ix_experiment_data_prefix_hash`(`prefix_hash` ASC) USING BTREE,
   INDEX `experiment_type_id`(`experiment_type_id` ASC) USING BTREE
 ) ENGINE = InnoDB AUTO_INCREMENT = 1 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci ROW_FORMAT = Dynamic;
 
@@ -60,12 +73,16 @@ CREATE TABLE `envelope_cache` (
   `id` int NOT NULL AUTO_INCREMENT,
   `experiment_type_id` int NOT NULL,
   `selected_columns_hash` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NOT NULL,
-  `historical_data_ids` json NOT NULL,
-  `envelope_data` json NOT NULL,
+  `historical_data_ids` json NULL,
+  `historical_version` int NULL DEFAULT NULL,
+  `envelope_data` json NULL,
+  `cache_file` varchar(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_0900_ai_ci NULL DEFAULT NULL,
+  `cache_size` int NULL DEFAULT NULL,
   `created_at` datetime NULL DEFAULT CURRENT_TIMESTAMP,
   `expires_at` datetime NOT NULL,
   PRIMARY KEY (`id`) USING BTREE,
-  INDEX `experiment_type_id`(`experiment_type_id` ASC) USING BTREE
+  INDEX `experiment_type_id`(`experiment_type_id` ASC) USING BTREE,
+  INDEX `ix_envelope_cache_lookup`(`experiment_type_id` ASC, `selected_columns_hash` ASC, `historical_version` ASC) USING BTREE
 ) ENGINE = InnoDB AUTO_INCREMENT = 1 CHARACTER SET = utf8mb4 COLLATE = utf8mb4_0900_ai_ci ROW_FORMAT = Dynamic;
 
 -- ----------------------------
@@ -1,15 +1,69 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import text, inspect
 import pymysql
 import logging
 
 # 初始化SQLAlchemy
 db = SQLAlchemy()
 
+# 已有数据库需要补充的列：{表名: [(列名, 列定义)]}
+# db.create_all 只会创建缺失的表，不会为已存在的表添加新列
+SCHEMA_UPGRADES = {
+    'experiment_types': [
+        ('storage_types', 'JSON NULL'),
+        ('historical_version', 'INT NOT NULL DEFAULT 0'),
+    ],
+    'experiment_data': [
+        ('summary_resolutions', 'JSON NULL'),
+        ('time_min', 'DOUBLE NULL'),
+        ('time_max', 'DOUBLE NULL'),
+        ('source_hash', 'VARCHAR(64) NULL'),
+        ('content_hash', 'VARCHAR(64) NULL'),
+        ('prefix_hash', 'VARCHAR(64) NULL'),
+        ('deleted_at', 'DATETIME NULL'),
+        ('updated_at', 'DATETIME NULL'),
+    ],
+    'envelope_cache': [
+        ('cache_file', 'VARCHAR(64) NULL'),
+        ('cache_size', 'INT NULL'),
+        ('historical_version', 'INT NULL'),
+    ],
+}
+
+# 已有数据库中需要改为可空的列：{表名: [(列名, 列定义)]}
+NULLABLE_UPGRADES = {
+    'envelope_cache': [
+        # 包络数据改为存储在缓存文件中
+        ('envelope_data', 'JSON NULL'),
+        # 缓存改为按历史数据集版本匹配
+        ('historical_data_ids', 'JSON NULL'),
+    ],
+}
+
+# 已有数据库需要调整的索引：{表名: [(索引名, [列名], 是否唯一)]}
+INDEX_UPGRADES = {
+    'experiment_data': [
+        # 重复上传的数据记录共用同一张ClickHouse表，表名不再唯一
+        ('clickhouse_table_name', ['clickhouse_table_name'], False),
+        ('ix_experiment_data_source_hash', ['source_hash'], False),
+        ('ix_experiment_data_content_hash', ['content_hash'], False),
+        ('ix_experiment_data_prefix_hash', ['prefix_hash'], False),
+    ],
+    'envelope_cache': [
+        ('ix_envelope_cache_lookup', ['experiment_type_id', 'selected_columns_hash', 'historical_version'], False),
+    ],
+}
+
 def init_db(app):
-    """初始化数据库连接"""
+    """初始化数据库连接（只注册连接池，第一次使用时才连接）"""
     db.init_app(app)
-    
+
+def bootstrap_database(app):
+    """
+    创建数据库、表和基础数据，并补充已有表的新列和索引
+
+    通过 flask --app app init-db 显式执行（或配置 bootstrap_on_start 在启动时执行）
+    """
     # 创建数据库（如果不存在）
     create_database_if_not_exists(app.config)
     
@@ -17,6 +71,9 @@ def init_db(app):
         # 创建所有表
         db.create_all()
         
+        # 为已存在的表补充新增的列
+        upgrade_schema()
+        
         # 初始化基础数据
         init_base_data()
 
@@ -44,6 +101,54 @@ def create_database_if_not_exists(config):
         logging.error(f"创建数据库时出错: {e}")
         raise
 
+def upgrade_schema():
+    """为已存在的表补充新增的列并调整索引"""
+    inspector = inspect(db.engine)
+    
+    for table_name, columns in SCHEMA_UPGRADES.items():
+        if not inspector.has_table(table_name):
+            continue
+        
+        existing_columns = {col['name'] for col in inspector.get_columns(table_name)}
+        for column_name, definition in columns:
+            if column_name in existing_columns:
+                continue
+            
+            execute_raw_sql(f"ALTER TABLE `{table_name}` ADD COLUMN `{column_name}` {definition}")
+            db.session.commit()
+            logging.info(f"表 {table_name} 新增列 {column_name}")
+    
+    for table_name, columns in NULLABLE_UPGRADES.items():
+        if not inspector.has_table(table_name):
+            continue
+        
+        nullable_columns = {col['name']: col['nullable'] for col in inspector.get_columns(table_name)}
+        for column_name, definition in columns:
+            if nullable_columns.get(column_name, True):
+                continue
+            
+            execute_raw_sql(f"ALTER TABLE `{table_name}` MODIFY COLUMN `{column_name}` {definition}")
+            db.session.commit()
+            logging.info(f"表 {table_name} 的列 {column_name} 改为可空")
+    
+    for table_name, indexes in INDEX_UPGRADES.items():
+        if not inspector.has_table(table_name):
+            continue
+        
+        existing_indexes = {idx['name']: idx for idx in inspect(db.engine).get_indexes(table_name)}
+        for index_name, column_names, unique in indexes:
+            existing = existing_indexes.get(index_name)
+            if existing is not None and bool(existing.get('unique')) == unique:
+                continue
+            
+            if existing is not None:
+                execute_raw_sql(f"DROP INDEX `{index_name}` ON `{table_name}`")
+            unique_sql = 'UNIQUE ' if unique else ''
+            columns_sql = ', '.join(f"`{column_name}`" for column_name in column_names)
+            execute_raw_sql(f"CREATE {unique_sql}INDEX `{index_name}` ON `{table_name}` ({columns_sql})")
+            db.session.commit()
+            logging.info(f"表 {table_name} 更新索引 {index_name}")
+
 def init_base_data():
     """初始化基础数据"""
     from models.models import ExperimentType
@@ -1,5 +1,7 @@
 import configparser
+import logging
 import os
+import threading
 from typing import Dict, Any
 
 class DatabaseConfigManager:
@@ -7,40 +9,53 @@ class DatabaseConfigManager:
     
     def __init__(self, config_file: str = "database_config.ini"):
         self.config_file = config_file
-        self.config = configparser.ConfigParser()
-        self.load_config()
+        # 首次使用时才读取配置文件，导入模块时不读写磁盘
+        self._config = None
+        self._load_lock = threading.Lock()
+    
+    @property
+    def config(self) -> configparser.ConfigParser:
+        if self._config is None:
+            with self._load_lock:
+                if self._config is None:
+                    self.load_config()
+        return self._config
     
     def load_config(self):
         """加载配置文件"""
+        config = configparser.ConfigParser()
         if os.path.exists(self.config_file):
-            self.config.read(self.config_file, encoding='utf-8')
+            config.read(self.config_file, encoding='utf-8')
         else:
-            # 如果配置文件不存在，创建默认配置
-            self.create_default_config()
-    
-    def create_default_config(self):
-        """创建默认配置文件"""
-        self.config.add_section('mysql')
-        self.config.set('mysql', 'host', 'localhost')
-        self.config.set('mysql', 'port', '3306')
-        self.config.set('mysql', 'user', 'root')
-        self.config.set('mysql', 'password', '')
-        self.config.set('mysql', 'database', 'baoluo')
-        self.config.set('mysql', 'charset', 'utf8mb4')
-        
-        self.config.add_section('clickhouse')
-        self.config.set('clickhouse', 'host', 'localhost')
-        self.config.set('clickhouse', 'http_port', '8123')
-        self.config.set('clickhouse', 'tcp_port', '9000')
-        self.config.set('clickhouse', 'user', 'root')
-        self.config.set('clickhouse', 'password', '123456')
-        self.config.set('clickhouse', 'database', 'baoluo')
+            # 配置文件不存在时使用默认配置（不写入磁盘，由 flask init-db 生成）
+            logging.warning(f"配置文件 {self.config_file} 不存在，使用默认配置")
+            self.create_default_config(config)
+        self._config = config
+    
+    def create_default_config(self, config: configparser.ConfigParser):
+        """填充默认配置"""
+        config.add_section('mysql')
+        config.set('mysql', 'host', 'localhost')
+        config.set('mysql', 'port', '3306')
+        config.set('mysql', 'user', 'root')
+        config.set('mysql', 'password', '')
+        config.set('mysql', 'database', 'baoluo')
+        config.set('mysql', 'charset', 'utf8mb4')
         
-        self.config.add_section('app')
-        self.config.set('app', 'use_clickhouse', 'true')
-        self.config.set('app', 'max_file_size', '16777216')
+        config.add_section('clickhouse')
+        config.set('clickhouse', 'host', 'localhost')
+        config.set('clickhouse', 'http_port', '8123')
+        config.set('clickhouse', 'tcp_port', '9000')
+        config.set('clickhouse', 'user', 'root')
+        config.set('clickhouse', 'password', '123456')
+        config.set('clickhouse', 'database', 'baoluo')
         
-        # 保存配置文件
+        config.add_section('app')
+        config.set('app', 'use_clickhouse', 'true')
+        config.set('app', 'max_file_size', '16777216')
+    
+    def save_config(self):
+        """保存配置文件"""
         with open(self.config_file, 'w', encoding='utf-8') as f:
             self.config.write(f)
     
@@ -81,8 +96,68 @@ class DatabaseConfigManager:
             'allowed_extensions': self.config.get('app', 'allowed_extensions', fallback='csv,xlsx,xls').split(','),
             'default_time_column': self.config.get('app', 'default_time_column', fallback='t'),
             'max_data_points': self.config.getint('app', 'max_data_points', fallback=10000),
-            'envelope_cache_timeout': self.config.getint('app', 'envelope_cache_timeout', fallback=3600),
-            'batch_size': self.config.getint('app', 'batch_size', fallback=10000)
+            'envelope_cache_timeout': self.config.getint('app', 'envelope_cache_timeout', fallback=604800),
+            'historical_version_check_interval': self.config.getfloat('app', 'historical_version_check_interval', fallback=2),
+            'batch_size': self.config.getint('app', 'batch_size', fallback=10000),
+            'upload_folder': self.config.get('app', 'upload_folder', fallback='uploads'),
+            'upload_chunk_size': self.config.getint('app', 'upload_chunk_size', fallback=8388608),
+            'chunked_upload_wait_timeout': self.config.getint('app', 'chunked_upload_wait_timeout', fallback=300),
+            'envelope_cache_folder': self.config.get('app', 'envelope_cache_folder', fallback='cache/envelopes'),
+            'envelope_cache_compression': self.config.get('app', 'envelope_cache_compression', fallback='zlib'),
+            'envelope_memory_cache_size': self.config.getint('app', 'envelope_memory_cache_size', fallback=268435456),
+            'cache_warm_enabled': self.config.getboolean('app', 'cache_warm_enabled', fallback=True),
+            'cache_warm_workers': self.config.getint('app', 'cache_warm_workers', fallback=2),
+            'cache_warm_sampling_points': [int(points) for points in self.config.get('app', 'cache_warm_sampling_points', fallback='200,500,1000').split(',') if points.strip()],
+            'cache_warm_interval': self.config.getint('app', 'cache_warm_interval', fallback=600),
+            'cache_warm_refresh_ahead': self.config.getint('app', 'cache_warm_refresh_ahead', fallback=3600),
+            'summary_resolutions': [float(res) for res in self.config.get('app', 'summary_resolutions', fallback='0.1,1,10,60').split(',') if res.strip()],
+            'batch_compare_workers': self.config.getint('app', 'batch_compare_workers', fallback=4),
+            'shared_cache_enabled': self.config.getboolean('app', 'shared_cache_enabled', fallback=True),
+            'shared_cache_folder': self.config.get('app', 'shared_cache_folder', fallback='cache/shared'),
+            'shared_cache_size': self.config.getint('app', 'shared_cache_size', fallback=2147483648),
+            'maintenance_enabled': self.config.getboolean('app', 'maintenance_enabled', fallback=True),
+            'maintenance_interval': self.config.getint('app', 'maintenance_interval', fallback=3600),
+            'maintenance_grace_period': self.config.getint('app', 'maintenance_grace_period', fallback=86400),
+            'temp_table_max_age': self.config.getint('app', 'temp_table_max_age', fallback=86400),
+            'chunked_upload_retention': self.config.getint('app', 'chunked_upload_retention', fallback=172800),
+            'temp_storage': self.config.get('app', 'temp_storage', fallback='local'),
+            'scratch_ttl': self.config.getint('app', 'scratch_ttl', fallback=86400),
+            'bootstrap_on_start': self.config.getboolean('app', 'bootstrap_on_start', fallback=False),
+            'warmup_on_start': self.config.getboolean('app', 'warmup_on_start', fallback=True),
+            'compression_enabled': self.config.getboolean('app', 'compression_enabled', fallback=True),
+            'compression_min_size': self.config.getint('app', 'compression_min_size', fallback=1024),
+            'page_size': self.config.getint('app', 'page_size', fallback=1000),
+            'max_page_size': self.config.getint('app', 'max_page_size', fallback=50000),
+            'compression_encodings': [encoding.strip() for encoding in self.config.get('app', 'compression_encodings', fallback='zstd,br,gzip').split(',') if encoding.strip()]
+        }
+    
+    def get_server_config(self, pool: str = '') -> Dict[str, Any]:
+        """
+        获取生产服务器（gunicorn）配置
+
+        Args:
+            pool: 工作进程池名称（如 compute），该池的 <pool>_<key> 配置优先于 <key>
+        """
+        def option(key, getter, fallback):
+            if pool and self.config.has_option('server', f'{pool}_{key}'):
+                return getter('server', f'{pool}_{key}')
+            return getter('server', key, fallback=fallback)
+
+        get, getint, getboolean = self.config.get, self.config.getint, self.config.getboolean
+        return {
+            'bind': option('bind', get, '0.0.0.0:5005'),
+            'workers': option('workers', getint, 0),
+            'threads': option('threads', getint, 8),
+            'keepalive': option('keepalive', getint, 5),
+            'timeout': option('timeout', getint, 300),
+            'graceful_timeout': option('graceful_timeout', getint, 30),
+            'max_requests': option('max_requests', getint, 1000),
+            'max_requests_jitter': option('max_requests_jitter', getint, 100),
+            'backlog': option('backlog', getint, 2048),
+            'preload_app': option('preload_app', getboolean, False),
+            'warmup': option('warmup', getboolean, True),
+            'warmup_envelopes': option('warmup_envelopes', getboolean, True),
+            'background_services': option('background_services', getboolean, True),
         }
     
     def get_mysql_uri(self) -> str:
@@ -113,10 +188,7 @@ class DatabaseConfigManager:
         if not self.config.has_section(section):
             self.config.add_section(section)
         self.config.set(section, key, str(value))
-        
-        # 保存配置文件
-        with open(self.config_file, 'w', encoding='utf-8') as f:
-            self.config.write(f)
+        self.save_config()
     
     def test_connections(self) -> Dict[str, bool]:
         """测试数据库连接"""
@@ -0,0 +1,52 @@
+"""
+gunicorn 配置（生产环境）
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    SERVER_POOL=compute gunicorn -c gunicorn.conf.py wsgi:app
+
+参数来自 database_config.ini 的 [server] 段。环境变量 SERVER_POOL 指定工作
+进程池名称，该池的 <pool>_<key> 配置覆盖 <key>：包络计算等CPU密集的接口
+可以单独启动一个进程多、线程少的 compute 池，由反向代理按路径转发
+（见 README 部署一节），其余I/O为主的接口使用默认池（线程多）。
+"""
+import multiprocessing
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from database_config import DatabaseConfigManager  # noqa: E402
+
+_pool = os.environ.get("SERVER_POOL", "")
+_server_config = DatabaseConfigManager(
+    os.path.join(BASE_DIR, "database_config.ini")
+).get_server_config(_pool)
+
+# 应用中的相对路径（配置文件、上传和缓存目录）以后端目录为基准
+chdir = BASE_DIR
+bind = _server_config["bind"]
+workers = _server_config["workers"] or multiprocessing.cpu_count()
+threads = _server_config["threads"]
+worker_class = "gthread" if threads > 1 else "sync"
+keepalive = _server_config["keepalive"]
+timeout = _server_config["timeout"]
+graceful_timeout = _server_config["graceful_timeout"]
+max_requests = _server_config["max_requests"]
+max_requests_jitter = _server_config["max_requests_jitter"]
+backlog = _server_config["backlog"]
+preload_app = _server_config["preload_app"]
+proc_name = f"baoluofenxi-{_pool}" if _pool else "baoluofenxi"
+
+
+def post_worker_init(worker):
+    """工作进程加载应用后、开始接收请求前：重建连接、启动后台线程并预热"""
+    from services.warmup import reset_connections, start_background_services, warm_up
+
+    app = worker.wsgi
+    reset_connections(app)
+    if _server_config["background_services"]:
+        start_background_services(app)
+    if _server_config["warmup"]:
+        warm_up(app, connections=threads, envelopes=_server_config["warmup_envelopes"])
@@ -11,6 +11,8 @@ class ExperimentType(db.Model):
     description = db.Column(db.Text)
     time_column = db.Column(db.String(50), nullable=False, default='t')  # 时间列名称
     data_columns = db.Column(db.JSON, nullable=False)  # 数据列配置 ["C1", "C2", "C3"]
+    storage_types = db.Column(db.JSON, nullable=True)  # 列存储类型 {"*": "Float32", "C1": {"type": "Int32", "scale": 1000}}
+    historical_version = db.Column(db.Integer, nullable=False, default=0)  # 历史数据集版本，历史数据集变化时递增
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 移除关系定义，因为不使用外键约束
@@ -18,6 +20,11 @@ class ExperimentType(db.Model):
     def __repr__(self):
         return f'<ExperimentType {self.name}>'
     
+    def get_storage_spec(self):
+        """获取规范化的列存储类型配置，未配置时为空（全部Float64）"""
+        from services.storage_types import normalize_storage_spec
+        return normalize_storage_spec(self.storage_types, self.data_columns)
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -25,6 +32,8 @@ class ExperimentType(db.Model):
             'description': self.description,
             'time_column': self.time_column,
             'data_columns': self.data_columns,
+            'storage_types': self.storage_types,
+            'historical_version': self.historical_version,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -40,7 +49,15 @@ class ExperimentData(db.Model):
     row_count = db.Column(db.Integer, default=0)
     upload_time = db.Column(db.DateTime, default=datetime.utcnow)
     is_historical = db.Column(db.Boolean, default=False)  # 是否加入历史数据集
-    status = db.Column(db.String(20), default='active')  # active, deleted
+    status = db.Column(db.String(20), default='active')  # active, processing, deleted
+    summary_resolutions = db.Column(db.JSON, nullable=True)  # 已生成分桶汇总的分辨率 [0.1, 1, 10]
+    time_min = db.Column(db.Float, nullable=True)  # 时间列最小值
+    time_max = db.Column(db.Float, nullable=True)  # 时间列最大值
+    source_hash = db.Column(db.String(64), nullable=True, index=True)  # 原始文件SHA-256
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # 规范化数据内容SHA-256
+    prefix_hash = db.Column(db.String(64), nullable=True, index=True)  # 前 PREFIX_ROWS 行数据内容SHA-256（写入前判断可能重复）
+    deleted_at = db.Column(db.DateTime, nullable=True)  # 软删除时间，宽限期后由维护任务删除ClickHouse表
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)  # 最后修改时间（用于ETag）
     
     def __repr__(self):
         return f'<ExperimentData {self.data_name}>'
@@ -55,7 +72,11 @@ class ExperimentData(db.Model):
             'row_count': self.row_count,
             'upload_time': self.upload_time.isoformat() if self.upload_time else None,
             'is_historical': self.is_historical,
-            'status': self.status
+            'status': self.status,
+            'summary_resolutions': self.summary_resolutions,
+            'time_min': self.time_min,
+            'time_max': self.time_max,
+            'content_hash': self.content_hash
         }
 
 class EnvelopeSettings(db.Model):
@@ -85,12 +106,18 @@ class EnvelopeSettings(db.Model):
 class EnvelopeCache(db.Model):
     """包络缓存表（用于缓存计算结果）"""
     __tablename__ = 'envelope_cache'
+    __table_args__ = (
+        db.Index('ix_envelope_cache_lookup', 'experiment_type_id', 'selected_columns_hash', 'historical_version'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     experiment_type_id = db.Column(db.Integer, nullable=False)  # 移除外键约束
     selected_columns_hash = db.Column(db.String(64), nullable=False)  # 选中列的hash值
-    historical_data_ids = db.Column(db.JSON, nullable=False)  # 历史数据ID列表
-    envelope_data = db.Column(db.JSON, nullable=False)  # 包络数据（上下边界）
+    historical_data_ids = db.Column(db.JSON, nullable=True)  # 历史数据ID列表（旧版缓存键）
+    historical_version = db.Column(db.Integer, nullable=True)  # 计算时的历史数据集版本
+    envelope_data = db.Column(db.JSON, nullable=True)  # 包络数据（旧版缓存，新缓存存储在文件中）
+    cache_file = db.Column(db.String(64), nullable=True)  # 二进制缓存文件名（见 EnvelopeStore）
+    cache_size = db.Column(db.Integer, nullable=True)  # 缓存文件字节数
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=False)
     
@@ -104,7 +131,10 @@ class EnvelopeCache(db.Model):
         return {
             'id': self.id,
             'experiment_type_id': self.experiment_type_id,
+            'historical_version': self.historical_version,
             'envelope_data': self.envelope_data,
+            'cache_file': self.cache_file,
+            'cache_size': self.cache_size,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'expires_at': self.expires_at.isoformat() if self.expires_at else None
         }
\ No newline at end of file
@@ -0,0 +1,172 @@
+import itertools
+import logging
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from database_config import db_config
+
+
+class CacheWarmer:
+    """
+    包络缓存预热
+
+    按已保存的包络配置（EnvelopeSettings.selected_columns）在后台计算常用
+    采样点数下的包络和对比基线，使交互请求直接命中缓存。任务放入优先级
+    队列，由固定数量的工作线程处理；同一任务在队列中只保留优先级最高的一个。
+    """
+
+    # 数值越小越先处理
+    PRIORITY_HISTORICAL_CHANGE = 0
+    PRIORITY_SETTINGS_CHANGE = 1
+    PRIORITY_STARTUP = 5
+    PRIORITY_REFRESH = 9
+
+    def __init__(self, app, workers: Optional[int] = None,
+                 sampling_levels: Optional[List[int]] = None,
+                 interval: Optional[int] = None, refresh_ahead: Optional[int] = None):
+        app_config = db_config.get_app_config()
+        self.app = app
+        self.workers = workers or app_config["cache_warm_workers"]
+        self.sampling_levels = sampling_levels or app_config["cache_warm_sampling_points"]
+        self.interval = interval or app_config["cache_warm_interval"]
+        self.refresh_ahead = refresh_ahead or app_config["cache_warm_refresh_ahead"]
+
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._pending: Dict[Tuple, int] = {}
+        self._pending_lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """启动工作线程和定时刷新线程，并为所有已保存的配置排队预热"""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"cache-warmer-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        scheduler = threading.Thread(
+            target=self._scheduler_loop, name="cache-warmer-scheduler", daemon=True
+        )
+        scheduler.start()
+        self._threads.append(scheduler)
+        logging.info(f"包络缓存预热已启动，工作线程数: {self.workers}")
+
+    def stop(self):
+        self._stop_event.set()
+        for _ in range(self.workers):
+            self._queue.put((-1, next(self._sequence), None))
+
+    def schedule_all(self, priority: int):
+        """为所有已保存的包络配置排队（需要应用上下文）"""
+        from models.models import EnvelopeSettings
+
+        for settings in EnvelopeSettings.query.all():
+            self._schedule_settings(settings, priority)
+
+    def schedule_type(self, experiment_type_id: int, priority: int):
+        """为指定试验类型的包络配置排队（需要应用上下文）"""
+        from models.models import EnvelopeSettings
+
+        settings = EnvelopeSettings.query.filter_by(
+            experiment_type_id=experiment_type_id
+        ).first()
+        if settings:
+            self._schedule_settings(settings, priority)
+
+    def _schedule_settings(self, settings, priority: int):
+        if not settings.selected_columns:
+            return
+        columns = tuple(sorted(settings.selected_columns))
+        for sampling_points in self.sampling_levels:
+            self._enqueue(("columns", settings.experiment_type_id, columns, sampling_points), priority)
+        # 对比接口使用的精确时间点基线
+        self._enqueue(("simple", settings.experiment_type_id, columns, None), priority)
+
+    def _enqueue(self, task: Tuple, priority: int):
+        with self._pending_lock:
+            queued_priority = self._pending.get(task)
+            if queued_priority is not None and queued_priority <= priority:
+                return
+            self._pending[task] = priority
+        self._queue.put((priority, next(self._sequence), task))
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            priority, _, task = self._queue.get()
+            if task is None:
+                break
+
+            with self._pending_lock:
+                # 已被更高优先级的同一任务处理过
+                if self._pending.get(task) != priority:
+                    continue
+                del self._pending[task]
+
+            try:
+                self._run_task(task)
+            except Exception as e:
+                logging.error(f"包络缓存预热失败 {task}: {e}")
+
+    def _run_task(self, task: Tuple):
+        from services.data_processor import DataProcessor
+
+        kind, experiment_type_id, columns, sampling_points = task
+        with self.app.app_context():
+            processor = DataProcessor()
+            if kind == "columns":
+                result = processor.calculate_envelope_for_columns(
+                    experiment_type_id,
+                    list(columns),
+                    sampling_points=sampling_points,
+                    refresh_within=self.refresh_ahead,
+                )
+                error = result.get("error")
+            else:
+                result = processor.calculate_envelope_simple(
+                    experiment_type_id, list(columns), refresh_within=self.refresh_ahead
+                )
+                error = None if result["success"] else result["message"]
+
+        if error:
+            logging.info(f"跳过包络缓存预热 {task}: {error}")
+
+    def _scheduler_loop(self):
+        """启动时预热一次，之后定期刷新即将过期的缓存"""
+        priority = self.PRIORITY_STARTUP
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    self.schedule_all(priority)
+            except Exception as e:
+                logging.error(f"包络缓存预热排队失败: {e}")
+            priority = self.PRIORITY_REFRESH
+            self._stop_event.wait(self.interval)
+
+
+# 全局缓存预热实例（未启用时为None）
+cache_warmer = None
+
+
+def start_cache_warmer(app) -> CacheWarmer:
+    """启动缓存预热（每个进程只启动一次）"""
+    global cache_warmer
+    if cache_warmer is None:
+        cache_warmer = CacheWarmer(app)
+        cache_warmer.start()
+    return cache_warmer
+
+
+def schedule_cache_warmup(experiment_type_id: int, priority: int = CacheWarmer.PRIORITY_HISTORICAL_CHANGE):
+    """历史数据集或包络配置变化后排队预热，未启用预热时忽略"""
+    if cache_warmer is None:
+        return
+    try:
+        cache_warmer.schedule_type(experiment_type_id, priority)
+    except Exception as e:
+        logging.error(f"包络缓存预热排队失败: {e}")
@@ -0,0 +1,662 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database_config import db_config
+
+# 后端根目录，相对路径的上传目录以此为基准
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def resolve_upload_folder() -> str:
+    """获取上传目录的绝对路径"""
+    upload_folder = db_config.get_app_config()["upload_folder"]
+    if not os.path.isabs(upload_folder):
+        upload_folder = os.path.join(BASE_DIR, upload_folder)
+    return upload_folder
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    """先写临时文件再原子替换，避免其他进程读到半个文件"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    """本机上的进程是否仍存在"""
+    if not pid:
+        return False
+    if os.name == "nt":
+        # Windows下os.kill会直接结束进程，且没有多进程部署（gunicorn不支持Windows），
+        # 其他进程号只可能来自已退出的进程
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class UploadAbortedError(IOError):
+    """分块上传已被取消或超时"""
+
+
+class ChunkStreamReader(io.RawIOBase):
+    """
+    按顺序读取已上传分块的文件对象
+
+    读取到尚未到达的分块时阻塞等待，使解析可以在最后一个分块到达之前开始。
+    """
+
+    def __init__(self, manager, upload_id: str, manifest: Dict[str, Any],
+                 poll_interval: float = 0.2):
+        super().__init__()
+        self.manager = manager
+        self.upload_id = upload_id
+        self.filename = manifest["file_name"]
+        self._chunk_size = manifest["chunk_size"]
+        self._total_size = manifest["total_size"]
+        self._poll_interval = poll_interval
+        self._pos = 0
+        self._handle = None
+        self._handle_index = None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            new_pos = offset
+        elif whence == io.SEEK_CUR:
+            new_pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            new_pos = self._total_size + offset
+        else:
+            raise ValueError(f"不支持的whence: {whence}")
+        self._pos = max(0, new_pos)
+        return self._pos
+
+    def readinto(self, buffer):
+        if self._pos >= self._total_size:
+            return 0
+
+        index, offset = divmod(self._pos, self._chunk_size)
+        if self._handle_index != index:
+            self._close_handle()
+            chunk_path = self.manager.wait_for_chunk(
+                self.upload_id, index, self._poll_interval
+            )
+            self._handle = open(chunk_path, "rb")
+            self._handle_index = index
+
+        self._handle.seek(offset)
+        data = self._handle.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self._pos += size
+        return size
+
+    def _close_handle(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+            self._handle_index = None
+
+    def close(self):
+        self._close_handle()
+        super().close()
+
+
+class ChunkedUploadManager:
+    """
+    分块上传（断点续传）管理器
+
+    目录结构（位于 uploads/chunked/<upload_id>/ 下）：
+        manifest.json  上传元信息，初始化后不再修改
+        chunks/        已校验的分块，文件名为分块序号
+        ingest.json    解析任务状态（所在进程、主机）和解析结果
+        result.json    完成上传后的最终结果
+        source.<ext>   全部分块到齐后拼接出的完整文件
+
+    分块以"临时文件 + 原子重命名"的方式落盘，因此多个工作进程可以并发
+    接收同一上传的分块，已到达的分块通过目录列表即可确定，无需加锁。
+
+    解析写入的数据保持processing状态，complete校验整个文件后才启用；
+    解析失败或所在进程已退出时，complete重新解析拼接好的文件。
+    """
+
+    CHECKSUM_ALGORITHM = "sha256"
+    EARLY_INGEST_EXTENSIONS = (".csv",)
+
+    # 进程内的后台解析线程
+    _ingest_threads: Dict[str, threading.Thread] = {}
+    _ingest_lock = threading.Lock()
+
+    def __init__(self, root_dir: Optional[str] = None):
+        app_config = db_config.get_app_config()
+        self.root_dir = root_dir or os.path.join(resolve_upload_folder(), "chunked")
+        self.default_chunk_size = app_config["upload_chunk_size"]
+        self.max_request_size = app_config["max_file_size"]
+        self.wait_timeout = app_config["chunked_upload_wait_timeout"]
+        self.retention = app_config["chunked_upload_retention"]
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def is_allowed_file(self, filename: str) -> bool:
+        """检查文件类型是否允许"""
+        allowed_extensions = db_config.get_app_config()["allowed_extensions"]
+        return "." in filename and filename.rsplit(".", 1)[1].lower() in allowed_extensions
+
+    def _upload_dir(self, upload_id: str) -> str:
+        # upload_id 由服务端生成，只允许十六进制字符，防止路径穿越
+        if not upload_id or not all(c in "0123456789abcdef" for c in upload_id):
+            raise ValueError("无效的上传ID")
+        return os.path.join(self.root_dir, upload_id)
+
+    def _chunks_dir(self, upload_id: str) -> str:
+        return os.path.join(self._upload_dir(upload_id), "chunks")
+
+    def _chunk_path(self, upload_id: str, index: int) -> str:
+        return os.path.join(self._chunks_dir(upload_id), f"{index:08d}.part")
+
+    def _ingest_path(self, upload_id: str) -> str:
+        return os.path.join(self._upload_dir(upload_id), "ingest.json")
+
+    def _result_path(self, upload_id: str) -> str:
+        return os.path.join(self._upload_dir(upload_id), "result.json")
+
+    def is_aborted(self, upload_id: str) -> bool:
+        return os.path.exists(os.path.join(self._upload_dir(upload_id), "aborted"))
+
+    def get_manifest(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """读取上传元信息，上传不存在时返回None"""
+        return _read_json(os.path.join(self._upload_dir(upload_id), "manifest.json"))
+
+    def init_upload(self, experiment_type_id: int, data_name: str, file_name: str,
+                    total_size: int, chunk_size: Optional[int] = None,
+                    file_checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        初始化分块上传
+
+        Args:
+            experiment_type_id: 试验类型ID
+            data_name: 数据名称
+            file_name: 原始文件名
+            total_size: 文件总字节数
+            chunk_size: 分块大小，默认使用配置值
+            file_checksum: 整个文件的SHA-256（可选，拼接完成后校验）
+        """
+        chunk_size = int(chunk_size or self.default_chunk_size)
+        total_size = int(total_size)
+        file_name = os.path.basename(file_name or "")
+
+        if not file_name:
+            return {"success": False, "message": "缺少文件名"}
+        if total_size <= 0:
+            return {"success": False, "message": "文件大小必须大于0"}
+        # 预留1MB给请求头等开销
+        if chunk_size <= 0 or chunk_size > self.max_request_size - 1024 * 1024:
+            return {
+                "success": False,
+                "message": f"分块大小必须在1到{self.max_request_size - 1024 * 1024}字节之间",
+            }
+
+        upload_id = uuid.uuid4().hex
+        total_chunks = (total_size + chunk_size - 1) // chunk_size
+        manifest = {
+            "upload_id": upload_id,
+            "experiment_type_id": experiment_type_id,
+            "data_name": data_name,
+            "file_name": file_name,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "total_chunks": total_chunks,
+            "checksum_algorithm": self.CHECKSUM_ALGORITHM,
+            "file_checksum": file_checksum.lower() if file_checksum else None,
+            "created_at": datetime.now().isoformat(),
+        }
+
+        os.makedirs(self._chunks_dir(upload_id), exist_ok=True)
+        _write_json_atomic(
+            os.path.join(self._upload_dir(upload_id), "manifest.json"), manifest
+        )
+        logging.info(
+            f"初始化分块上传 {upload_id}: {file_name}, {total_size} 字节, {total_chunks} 个分块"
+        )
+
+        return {"success": True, "data": manifest}
+
+    def append_chunk(self, upload_id: str, index: int, data: bytes,
+                     checksum: Optional[str]) -> Dict[str, Any]:
+        """
+        接收一个分块，校验通过后落盘
+
+        重复上传同一分块是幂等的，便于客户端在网络中断后重试。
+        """
+        manifest = self.get_manifest(upload_id)
+        if not manifest:
+            return {"success": False, "message": "上传不存在或已过期"}
+        if self.is_aborted(upload_id):
+            return {"success": False, "message": "上传已取消"}
+
+        total_chunks = manifest["total_chunks"]
+        if index < 0 or index >= total_chunks:
+            return {"success": False, "message": f"分块序号超出范围: {index}"}
+
+        # 除最后一块外，每块大小必须等于chunk_size
+        expected_size = manifest["chunk_size"]
+        if index == total_chunks - 1:
+            expected_size = manifest["total_size"] - manifest["chunk_size"] * index
+        if len(data) != expected_size:
+            return {
+                "success": False,
+                "message": f"分块大小不匹配: 期望 {expected_size}，实际 {len(data)}",
+            }
+
+        if not checksum:
+            return {"success": False, "message": "缺少分块校验值"}
+        actual_checksum = hashlib.sha256(data).hexdigest()
+        if actual_checksum != checksum.lower():
+            return {"success": False, "message": "分块校验失败，请重新上传该分块"}
+
+        chunk_path = self._chunk_path(upload_id, index)
+        if not os.path.exists(chunk_path):
+            tmp_path = f"{chunk_path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, chunk_path)
+
+        return {
+            "success": True,
+            "data": {
+                "upload_id": upload_id,
+                "index": index,
+                "received_count": len(self.received_chunks(upload_id)),
+                "total_chunks": total_chunks,
+            },
+        }
+
+    def received_chunks(self, upload_id: str) -> List[int]:
+        """返回已到达的分块序号（升序）"""
+        chunks_dir = self._chunks_dir(upload_id)
+        if not os.path.isdir(chunks_dir):
+            return []
+        return sorted(
+            int(name[:-5]) for name in os.listdir(chunks_dir) if name.endswith(".part")
+        )
+
+    def get_status(self, upload_id: str) -> Dict[str, Any]:
+        """获取上传状态，用于断点续传时确定缺失的分块"""
+        manifest = self.get_manifest(upload_id)
+        if not manifest:
+            return {"success": False, "message": "上传不存在或已过期"}
+
+        result = _read_json(self._result_path(upload_id))
+        received = set(self.received_chunks(upload_id))
+        # 拼接完成后分块会被清理，此时视为全部到达
+        if result and result.get("success"):
+            received = set(range(manifest["total_chunks"]))
+        missing = [i for i in range(manifest["total_chunks"]) if i not in received]
+        ingest = _read_json(self._ingest_path(upload_id))
+
+        return {
+            "success": True,
+            "data": {
+                **manifest,
+                "received_count": len(received),
+                "missing_chunks": missing,
+                "aborted": self.is_aborted(upload_id),
+                "ingest_state": ingest["state"] if ingest else None,
+                "result": result,
+            },
+        }
+
+    def wait_for_chunk(self, upload_id: str, index: int, poll_interval: float = 0.2) -> str:
+        """
+        阻塞等待指定分块到达，返回分块文件路径
+
+        客户端可以任意暂停后续传，不限制单个分块的等待时间；上传被取消、
+        目录被清理或超过 chunked_upload_retention 秒没有新分块到达时放弃。
+        """
+        chunk_path = self._chunk_path(upload_id, index)
+        chunks_dir = self._chunks_dir(upload_id)
+
+        while not os.path.exists(chunk_path):
+            if self.is_aborted(upload_id):
+                raise UploadAbortedError("上传已取消")
+            try:
+                idle_seconds = time.time() - os.path.getmtime(chunks_dir)
+            except OSError:
+                raise UploadAbortedError("上传已过期")
+            if idle_seconds > self.retention:
+                raise UploadAbortedError("上传已过期")
+            time.sleep(poll_interval)
+        return chunk_path
+
+    def open_stream(self, upload_id: str) -> ChunkStreamReader:
+        """打开按序读取分块的流"""
+        manifest = self.get_manifest(upload_id)
+        if not manifest:
+            raise ValueError("上传不存在或已过期")
+        return ChunkStreamReader(self, upload_id, manifest)
+
+    def supports_early_ingest(self, manifest: Dict[str, Any]) -> bool:
+        """CSV可以边接收边解析；Excel是zip容器，必须等文件完整"""
+        return manifest["file_name"].lower().endswith(self.EARLY_INGEST_EXTENSIONS)
+
+    @staticmethod
+    def _ingest_state(state: str, result: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return {
+            "state": state,
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "updated_at": datetime.now().isoformat(),
+            "result": result,
+        }
+
+    def _ingest_alive(self, upload_id: str, ingest: Optional[Dict[str, Any]]) -> bool:
+        """
+        解析任务是否仍在运行
+
+        工作进程退出（如gunicorn按max_requests回收）后状态会停留在running，
+        通过记录的进程号判断；其他主机上的进程无法判断，视为仍在运行。
+        """
+        if not ingest or ingest.get("state") != "running":
+            return False
+        if ingest.get("host") != socket.gethostname():
+            return True
+        if ingest.get("pid") == os.getpid():
+            thread = self._ingest_threads.get(upload_id)
+            return thread is not None and thread.is_alive()
+        return _pid_alive(ingest.get("pid"))
+
+    def start_ingest(self, app, upload_id: str) -> bool:
+        """
+        启动后台解析任务，从已到达的分块开始流式解析并写入ClickHouse
+
+        之前的任务所在进程已退出时从第一个分块重新开始。
+
+        Returns:
+            bool: 是否启动了新的任务
+        """
+        manifest = self.get_manifest(upload_id)
+        if not manifest or not self.supports_early_ingest(manifest) or self.is_aborted(upload_id):
+            return False
+
+        ingest_path = self._ingest_path(upload_id)
+        with self._ingest_lock:
+            ingest = _read_json(ingest_path)
+            if ingest is not None:
+                if ingest["state"] != "running" or self._ingest_alive(upload_id, ingest):
+                    return False
+                logging.warning(f"分块上传 {upload_id} 的解析任务已中断，重新开始解析")
+            _write_json_atomic(ingest_path, self._ingest_state("running"))
+            thread = threading.Thread(
+                target=self._run_ingest,
+                args=(app, upload_id, manifest, self.open_stream(upload_id)),
+                name=f"chunked-ingest-{upload_id[:8]}",
+                daemon=True,
+            )
+            self._ingest_threads[upload_id] = thread
+            thread.start()
+        return True
+
+    def _run_ingest(self, app, upload_id: str, manifest: Dict[str, Any], stream):
+        """在应用上下文中执行与普通上传相同的分块解析管道，数据暂不启用"""
+        from database import db
+        from models.models import ExperimentType
+        from services.data_processor import DataProcessor
+
+        with app.app_context():
+            try:
+                experiment_type = ExperimentType.query.get(manifest["experiment_type_id"])
+                if not experiment_type:
+                    result = {"success": False, "message": "试验类型不存在"}
+                else:
+                    # 分块尚未到齐，无法预先计算原始文件哈希（客户端提供的校验值
+                    # 要到拼接时才验证），只按解析后的数据内容去重
+                    result = DataProcessor().process_upload(
+                        stream,
+                        manifest["data_name"],
+                        experiment_type,
+                        hash_source=False,
+                        activate=False,
+                    )
+            except Exception as e:
+                logging.error(f"分块上传 {upload_id} 解析失败: {e}")
+                result = {"success": False, "message": f"处理失败: {str(e)}"}
+            finally:
+                stream.close()
+
+            try:
+                self._finish_ingest(upload_id, result)
+            finally:
+                db.session.remove()
+                with self._ingest_lock:
+                    self._ingest_threads.pop(upload_id, None)
+
+    def _finish_ingest(self, upload_id: str, result: Dict[str, Any]):
+        """
+        记录解析结果；解析期间上传被取消时丢弃写入的数据
+
+        先写状态再检查取消标记，与abort_upload的顺序相反，两者并发时
+        至少有一方会丢弃数据（丢弃是幂等的）。
+        """
+        from services.data_processor import DataProcessor
+
+        state = "success" if result.get("success") else "failed"
+        _write_json_atomic(self._ingest_path(upload_id), self._ingest_state(state, result))
+        if state == "success" and self.is_aborted(upload_id):
+            DataProcessor().discard_upload(result["data_id"])
+            _write_json_atomic(
+                self._ingest_path(upload_id),
+                self._ingest_state("failed", {"success": False, "message": "上传已取消"}),
+            )
+
+    def _assemble(self, upload_id: str, manifest: Dict[str, Any]) -> str:
+        """按顺序拼接分块为完整文件，并校验整个文件的校验值"""
+        upload_dir = self._upload_dir(upload_id)
+        extension = os.path.splitext(manifest["file_name"])[1].lower()
+        target_path = os.path.join(upload_dir, f"source{extension}")
+        if os.path.exists(target_path):
+            return target_path
+
+        digest = hashlib.sha256()
+        tmp_path = f"{target_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as target:
+            for index in range(manifest["total_chunks"]):
+                with open(self._chunk_path(upload_id, index), "rb") as chunk:
+                    data = chunk.read()
+                digest.update(data)
+                target.write(data)
+
+        if manifest.get("file_checksum") and digest.hexdigest() != manifest["file_checksum"]:
+            os.remove(tmp_path)
+            raise ValueError("文件整体校验失败")
+
+        os.replace(tmp_path, target_path)
+        return target_path
+
+    def _wait_for_ingest(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """等待正在运行的解析任务结束（最多 chunked_upload_wait_timeout 秒），返回任务状态"""
+        ingest_path = self._ingest_path(upload_id)
+        thread = self._ingest_threads.get(upload_id)
+        if thread is not None:
+            thread.join(self.wait_timeout)
+        else:
+            # 解析任务可能运行在其他工作进程中，通过状态文件等待
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                if not self._ingest_alive(upload_id, _read_json(ingest_path)):
+                    break
+                time.sleep(0.5)
+        return _read_json(ingest_path)
+
+    def complete_upload(self, upload_id: str) -> Dict[str, Any]:
+        """
+        完成上传：校验分块完整性，拼接文件并校验整个文件，然后启用数据
+
+        若后台已在边接收边解析，这里等待其结束并启用其写入的数据；没有
+        边接收边解析（如Excel）、解析失败或所在进程已退出时，在拼接完成
+        后同步解析。整个文件校验失败时丢弃已解析的数据。
+        """
+        manifest = self.get_manifest(upload_id)
+        if not manifest:
+            return {"success": False, "message": "上传不存在或已过期"}
+
+        existing_result = _read_json(self._result_path(upload_id))
+        if existing_result and existing_result.get("success"):
+            return existing_result
+        if self.is_aborted(upload_id):
+            return {"success": False, "message": "上传已取消"}
+
+        received = set(self.received_chunks(upload_id))
+        missing = [i for i in range(manifest["total_chunks"]) if i not in received]
+        if missing:
+            return {
+                "success": False,
+                "message": f"还有 {len(missing)} 个分块未上传",
+                "missing_chunks": missing,
+            }
+
+        try:
+            assembled_path = self._assemble(upload_id, manifest)
+        except ValueError as e:
+            # 每个分块都已单独校验，整体不一致说明分块来自不同的文件，只能重新上传
+            logging.warning(f"分块上传 {upload_id} {e}，已取消")
+            self.abort_upload(upload_id)
+            return {"success": False, "message": f"{e}，请重新上传"}
+
+        ingest = _read_json(self._ingest_path(upload_id))
+        if self._ingest_alive(upload_id, ingest):
+            ingest = self._wait_for_ingest(upload_id)
+            if self._ingest_alive(upload_id, ingest):
+                return {"success": True, "processing": True, "message": "数据仍在处理中"}
+
+        result = None
+        if ingest and ingest["state"] == "success":
+            result = self._activate(upload_id, ingest["result"])
+        if result is None:
+            result = self._ingest_file(upload_id, manifest, assembled_path)
+            if result.get("processing"):
+                return result
+            if result.get("success"):
+                result = self._activate(upload_id, result) or {
+                    "success": False,
+                    "message": "数据记录已被清理，请重新完成上传",
+                }
+
+        if result.get("success"):
+            _write_json_atomic(self._result_path(upload_id), result)
+            # 入库成功后分块不再需要，保留拼接好的完整文件
+            shutil.rmtree(self._chunks_dir(upload_id), ignore_errors=True)
+        return result
+
+    def _activate(self, upload_id: str, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        启用解析写入的数据；上传已取消时丢弃数据
+
+        Returns:
+            Dict: 上传结果；数据记录已不存在（如被维护任务清理）时返回None
+        """
+        from services.data_processor import DataProcessor
+
+        processor = DataProcessor()
+        if self.is_aborted(upload_id):
+            processor.discard_upload(result["data_id"])
+            return {"success": False, "message": "上传已取消"}
+        if processor.activate_upload(result["data_id"]) is None:
+            logging.warning(f"分块上传 {upload_id} 的数据记录 {result['data_id']} 已不存在")
+            return None
+        return result
+
+    def _ingest_file(self, upload_id: str, manifest: Dict[str, Any],
+                     file_path: str) -> Dict[str, Any]:
+        """同步解析拼接好的文件，数据暂不启用"""
+        from werkzeug.datastructures import FileStorage
+        from database import db
+        from models.models import ExperimentType
+        from services.data_processor import DataProcessor
+
+        experiment_type = ExperimentType.query.get(manifest["experiment_type_id"])
+        if not experiment_type:
+            return {"success": False, "message": "试验类型不存在"}
+
+        with self._ingest_lock:
+            if self._ingest_alive(upload_id, _read_json(self._ingest_path(upload_id))):
+                return {"success": True, "processing": True, "message": "数据仍在处理中"}
+            self._ingest_threads[upload_id] = threading.current_thread()
+            _write_json_atomic(self._ingest_path(upload_id), self._ingest_state("running"))
+        try:
+            with open(file_path, "rb") as f:
+                result = DataProcessor().process_upload(
+                    FileStorage(stream=f, filename=manifest["file_name"]),
+                    manifest["data_name"],
+                    experiment_type,
+                    # 拼接时已校验过整个文件的校验值
+                    source_hash=manifest.get("file_checksum"),
+                    activate=False,
+                )
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"分块上传 {upload_id} 解析失败: {e}")
+            result = {"success": False, "message": f"处理失败: {str(e)}"}
+        finally:
+            with self._ingest_lock:
+                self._ingest_threads.pop(upload_id, None)
+
+        _write_json_atomic(
+            self._ingest_path(upload_id),
+            self._ingest_state("success" if result.get("success") else "failed", result),
+        )
+        return result
+
+    def abort_upload(self, upload_id: str) -> Dict[str, Any]:
+        """
+        取消上传，不等待正在运行的解析任务
+
+        解析任务在下一次等待分块或结束时发现取消标记，自行清理写入的数据；
+        已解析完成但尚未启用的数据在这里丢弃。已完成的上传不能取消。
+        """
+        from services.data_processor import DataProcessor
+
+        upload_dir = self._upload_dir(upload_id)
+        if not os.path.isdir(upload_dir):
+            return {"success": False, "message": "上传不存在或已过期"}
+
+        result = _read_json(self._result_path(upload_id))
+        if result and result.get("success"):
+            return {"success": False, "message": "上传已完成，请通过删除数据接口删除"}
+
+        open(os.path.join(upload_dir, "aborted"), "w").close()
+        shutil.rmtree(self._chunks_dir(upload_id), ignore_errors=True)
+
+        ingest = _read_json(self._ingest_path(upload_id))
+        if ingest and ingest["state"] == "success":
+            DataProcessor().discard_upload(ingest["result"]["data_id"])
+        return {"success": True, "message": "上传已取消"}
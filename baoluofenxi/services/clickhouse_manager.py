@@ -1,28 +1,42 @@
-import clickhouse_connect
 import pandas as pd
 import logging
+import threading
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import re
 from database_config import db_config
+from services.storage_types import clickhouse_column_type, encode_frame, decode_frame
 
 class ClickHouseManager:
     """ClickHouse数据库管理器"""
     
     def __init__(self):
         self.config = db_config.get_clickhouse_config()
-        self.client = None
-        self.connect()
+        self._client = None
+        self._connect_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """ClickHouse客户端，第一次使用时连接"""
+        if self._client is None:
+            with self._connect_lock:
+                if self._client is None:
+                    self.connect()
+        return self._client
     
     def connect(self):
         """连接ClickHouse数据库"""
+        import clickhouse_connect
+        
         try:
-            self.client = clickhouse_connect.get_client(
+            self._client = clickhouse_connect.get_client(
                 host=self.config['host'],
                 port=self.config['http_port'],
                 username=self.config['user'],
                 password=self.config['password'],
-                database=self.config['database']
+                database=self.config['database'],
+                # 不使用会话，允许请求线程与后台线程并发查询
+                autogenerate_session_id=False
             )
             logging.info("ClickHouse连接成功")
         except Exception as e:
@@ -31,6 +45,8 @@ class ClickHouseManager:
     
     def ensure_database_exists(self):
         """确保数据库存在"""
+        import clickhouse_connect
+        
         try:
             # 先连接到默认数据库
             temp_client = clickhouse_connect.get_client(
@@ -64,7 +80,9 @@ class ClickHouseManager:
         
         return sanitized
     
-    def create_timeseries_table(self, table_name: str, time_column: str, data_columns: List[str]) -> bool:
+    def create_timeseries_table(self, table_name: str, time_column: str, data_columns: List[str],
+                                storage_spec: Optional[Dict[str, Dict[str, Any]]] = None,
+                                ttl_seconds: Optional[int] = None) -> bool:
         """
         创建时序数据表
         
@@ -72,6 +90,8 @@ class ClickHouseManager:
             table_name: 表名
             time_column: 时间列名
             data_columns: 数据列名列表
+            storage_spec: 列存储类型配置（见 storage_types），None表示全部Float64
+            ttl_seconds: 数据保留秒数（临时表使用），到期后整个part直接删除；None表示永久保留
             
         Returns:
             bool: 创建成功返回True
@@ -88,7 +108,14 @@ class ClickHouseManager:
             
             # 添加数据列
             for col in data_columns:
-                columns.append(f"`{col}` Float64")
+                columns.append(f"`{col}` {clickhouse_column_type(storage_spec, col)}")
+            
+            # 临时表一次写入，所有行的插入时间相同，到期时按part整体删除，无需逐行改写
+            ttl_clause = ''
+            settings = 'index_granularity = 8192'
+            if ttl_seconds:
+                ttl_clause = f"TTL timestamp + INTERVAL {int(ttl_seconds)} SECOND"
+                settings += ', ttl_only_drop_parts = 1'
             
             # 创建表的SQL
             create_sql = f"""
@@ -97,7 +124,8 @@ class ClickHouseManager:
             ) ENGINE = MergeTree()
             ORDER BY ({time_column})
             PARTITION BY toYYYYMM(timestamp)
-            SETTINGS index_granularity = 8192
+            {ttl_clause}
+            SETTINGS {settings}
             """
             
             self.client.command(create_sql)
@@ -108,7 +136,8 @@ class ClickHouseManager:
             logging.error(f"创建表 {table_name} 失败: {e}")
             return False
     
-    def insert_dataframe(self, table_name: str, df: pd.DataFrame, time_column: str) -> Dict[str, Any]:
+    def insert_dataframe(self, table_name: str, df: pd.DataFrame, time_column: str,
+                         storage_spec: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         将DataFrame数据插入到ClickHouse表中
         
@@ -116,6 +145,7 @@ class ClickHouseManager:
             table_name: 表名
             df: 要插入的数据
             time_column: 时间列名
+            storage_spec: 列存储类型配置，需与建表时一致
             
         Returns:
             Dict: 插入结果
@@ -136,6 +166,7 @@ class ClickHouseManager:
             
             # 将数据转换为适合ClickHouse的格式
             df_copy = df_copy.fillna(0)  # 填充NaN值为0
+            df_copy = encode_frame(df_copy, storage_spec)
             
             # 插入数据
             self.client.insert_df(safe_table_name, df_copy)
@@ -159,10 +190,116 @@ class ClickHouseManager:
                 'table_name': table_name
             }
     
+    def summary_table_name(self, table_name: str) -> str:
+        """获取试验数据表对应的分桶汇总表名"""
+        return self.sanitize_table_name(f"{table_name}_summary")
+    
+    def create_summary_table(self, table_name: str) -> bool:
+        """
+        创建分桶汇总表（长表：分辨率、桶序号、列名及统计量）
+        
+        Args:
+            table_name: 试验数据表名
+        """
+        try:
+            summary_table = self.summary_table_name(table_name)
+            create_sql = f"""
+            CREATE TABLE IF NOT EXISTS `{summary_table}` (
+                resolution Float64,
+                bucket Int64,
+                column_name String,
+                v_min Float64,
+                v_max Float64,
+                v_sum Float64,
+                v_sumsq Float64,
+                v_count UInt64
+            ) ENGINE = MergeTree()
+            ORDER BY (resolution, column_name, bucket)
+            """
+            self.client.command(create_sql)
+            return True
+        except Exception as e:
+            logging.error(f"创建汇总表 {table_name} 失败: {e}")
+            return False
+    
+    def insert_summary(self, table_name: str, summary_df: pd.DataFrame) -> bool:
+        """写入分桶汇总"""
+        try:
+            if not self.create_summary_table(table_name):
+                return False
+            if not summary_df.empty:
+                self.client.insert_df(self.summary_table_name(table_name), summary_df)
+            logging.info(f"表 {table_name} 写入 {len(summary_df)} 行汇总")
+            return True
+        except Exception as e:
+            logging.error(f"写入汇总表 {table_name} 失败: {e}")
+            return False
+    
+    def build_summary_from_table(self, table_name: str, time_column: str,
+                                 data_columns: List[str], resolutions: List[float],
+                                 storage_spec: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+        """
+        在ClickHouse内由已入库的数据表直接计算分桶汇总（用于临时数据转存）
+        
+        Args:
+            table_name: 试验数据表名
+            time_column: 时间列名
+            data_columns: 数据列名列表
+            resolutions: 汇总分辨率列表
+            storage_spec: 列存储类型配置，定点列按scale还原
+        """
+        try:
+            safe_table_name = self.sanitize_table_name(table_name)
+            if not self.create_summary_table(table_name):
+                return False
+            summary_table = self.summary_table_name(table_name)
+            
+            for resolution in resolutions:
+                for col in data_columns:
+                    scale = (storage_spec or {}).get(col, {}).get('scale')
+                    value_expr = f"toFloat64(`{col}`)" + (f" / {scale}" if scale else "")
+                    self.client.command(f"""
+                    INSERT INTO `{summary_table}`
+                    SELECT
+                        {float(resolution)} AS resolution,
+                        toInt64(floor(`{time_column}` / {float(resolution)})) AS bucket,
+                        %(column)s AS column_name,
+                        min(v), max(v), sum(v), sum(v * v), count()
+                    FROM (SELECT `{time_column}`, {value_expr} AS v FROM `{safe_table_name}`)
+                    GROUP BY bucket
+                    """, parameters={'column': col})
+            
+            logging.info(f"表 {safe_table_name} 汇总计算完成")
+            return True
+        except Exception as e:
+            logging.error(f"计算表 {table_name} 的汇总失败: {e}")
+            return False
+    
+    def query_summary(self, table_name: str, resolution: float,
+                      columns: List[str]) -> pd.DataFrame:
+        """查询指定分辨率、指定列的分桶汇总"""
+        try:
+            return self.client.query_df(
+                f"SELECT resolution, bucket, column_name, v_min, v_max, v_sum, v_sumsq, v_count "
+                f"FROM `{self.summary_table_name(table_name)}` "
+                f"WHERE resolution = %(resolution)s AND column_name IN %(columns)s "
+                f"ORDER BY column_name, bucket",
+                parameters={'resolution': float(resolution), 'columns': list(columns)}
+            )
+        except Exception as e:
+            logging.error(f"查询汇总表 {table_name} 失败: {e}")
+            return pd.DataFrame()
+    
     def query_data(self, table_name: str, time_column: str, 
                    columns: Optional[List[str]] = None,
                    time_range: Optional[tuple] = None,
-                   limit: Optional[int] = None) -> pd.DataFrame:
+                   limit: Optional[int] = None,
+                   storage_spec: Optional[Dict[str, Dict[str, Any]]] = None,
+                   after: Optional[float] = None,
+                   before: Optional[float] = None,
+                   descending: bool = False,
+                   order_by: Optional[List[str]] = None,
+                   offset: Optional[int] = None) -> pd.DataFrame:
         """
         查询表数据
         
@@ -172,6 +309,15 @@ class ClickHouseManager:
             columns: 要查询的列，None表示查询所有列
             time_range: 时间范围 (start, end)
             limit: 限制返回行数
+            storage_spec: 列存储类型配置，Float32/定点列解码为float32
+            after: 只返回时间大于该值的行（键集分页）
+            before: 只返回时间小于该值的行
+            descending: 按时间倒序返回（向前翻页）
+            order_by: 时间相同时的排序列（与时间列同方向）
+            offset: 跳过的行数（与limit一起使用）
+            
+        时间列是表的排序键，after/before 条件与 ORDER BY ... LIMIT 一起
+        通过主键索引定位，按顺序只读取需要的行，耗时与翻页深度无关。
             
         Returns:
             pd.DataFrame: 查询结果
@@ -192,19 +338,28 @@ class ClickHouseManager:
             if time_range:
                 conditions.append(f"`{time_column}` >= {time_range[0]}")
                 conditions.append(f"`{time_column}` <= {time_range[1]}")
+            if after is not None:
+                conditions.append(f"`{time_column}` > {float(after)!r}")
+            if before is not None:
+                conditions.append(f"`{time_column}` < {float(before)!r}")
             
             if conditions:
                 sql += " WHERE " + " AND ".join(conditions)
             
             # 排序
-            sql += f" ORDER BY `{time_column}`"
+            direction = " DESC" if descending else ""
+            sql += " ORDER BY " + ", ".join(
+                f"`{col}`{direction}" for col in [time_column] + list(order_by or [])
+            )
             
             # 限制行数
             if limit:
                 sql += f" LIMIT {limit}"
+                if offset:
+                    sql += f" OFFSET {int(offset)}"
             
             # 执行查询
-            df = self.client.query_df(sql)
+            df = decode_frame(self.client.query_df(sql), storage_spec)
             logging.info(f"成功查询表 {safe_table_name}，返回 {len(df)} 行数据")
             
             return df
@@ -286,12 +441,103 @@ class ClickHouseManager:
         try:
             safe_table_name = self.sanitize_table_name(table_name)
             self.client.command(f"DROP TABLE IF EXISTS `{safe_table_name}`")
+            # 同时删除对应的分桶汇总表
+            self.client.command(f"DROP TABLE IF EXISTS `{self.summary_table_name(table_name)}`")
             logging.info(f"表 {safe_table_name} 删除成功")
             return True
         except Exception as e:
             logging.error(f"删除表 {table_name} 失败: {e}")
             return False
     
+    def promote_temp_table(self, temp_table_name: str, table_name: str, time_column: str,
+                           data_columns: List[str],
+                           storage_spec: Optional[Dict[str, Dict[str, Any]]] = None) -> bool:
+        """
+        将临时表转为永久数据表
+        
+        优先移除TTL后重命名，只修改元数据；服务端不支持时创建永久表，
+        在服务端 INSERT ... SELECT 复制数据后删除临时表（数据不经过应用）
+        
+        Args:
+            temp_table_name: 临时表名
+            table_name: 永久表名
+            
+        Returns:
+            bool: 成功返回True
+        """
+        safe_temp = self.sanitize_table_name(temp_table_name)
+        safe_table = self.sanitize_table_name(table_name)
+        try:
+            self.client.command(f"ALTER TABLE `{safe_temp}` REMOVE TTL")
+            self.client.command(f"RENAME TABLE `{safe_temp}` TO `{safe_table}`")
+            logging.info(f"临时表 {safe_temp} 已转为 {safe_table}")
+            return True
+        except Exception as e:
+            logging.warning(f"临时表 {safe_temp} 无法直接转为永久表，改为复制: {e}")
+        
+        try:
+            if not self.create_timeseries_table(table_name, time_column, data_columns, storage_spec):
+                return False
+            column_list = ', '.join(
+                f"`{col}`" for col in [time_column, 'timestamp'] + list(data_columns)
+            )
+            self.client.command(
+                f"INSERT INTO `{safe_table}` ({column_list}) SELECT {column_list} FROM `{safe_temp}`"
+            )
+            self.client.command(f"DROP TABLE IF EXISTS `{safe_temp}`")
+            logging.info(f"临时表 {safe_temp} 已复制到 {safe_table}")
+            return True
+        except Exception as e:
+            logging.error(f"临时表 {safe_temp} 转为永久表失败: {e}")
+            self.drop_table(table_name)
+            return False
+    
+    def list_tables(self, name_patterns: List[str]) -> List[Dict[str, Any]]:
+        """
+        列出当前数据库中名称匹配的表
+        
+        Args:
+            name_patterns: LIKE匹配模式列表，如 ['exp_%']
+            
+        Returns:
+            List[Dict]: 每项包含 name 与 age_seconds（距最后一次修改表结构的秒数）
+        """
+        try:
+            conditions = ' OR '.join(
+                f"name LIKE %(pattern_{i})s" for i in range(len(name_patterns))
+            )
+            result = self.client.query(
+                f"SELECT name, dateDiff('second', metadata_modification_time, now()) FROM system.tables "
+                f"WHERE database = currentDatabase() AND ({conditions})",
+                parameters={f'pattern_{i}': pattern for i, pattern in enumerate(name_patterns)}
+            )
+            return [
+                {'name': row[0], 'age_seconds': int(row[1])}
+                for row in result.result_rows
+            ]
+        except Exception as e:
+            logging.error(f"列出ClickHouse表失败: {e}")
+            return []
+    
+    def table_storage(self, table_names: List[str]) -> Dict[str, Dict[str, int]]:
+        """查询表占用的磁盘字节数和活动part数（来自system.parts）"""
+        if not table_names:
+            return {}
+        try:
+            result = self.client.query(
+                "SELECT table, sum(bytes_on_disk), count() FROM system.parts "
+                "WHERE database = currentDatabase() AND active AND table IN %(tables)s "
+                "GROUP BY table",
+                parameters={'tables': list(table_names)}
+            )
+            return {
+                row[0]: {'bytes': int(row[1]), 'parts': int(row[2])}
+                for row in result.result_rows
+            }
+        except Exception as e:
+            logging.error(f"查询表存储信息失败: {e}")
+            return {}
+    
     def execute_query(self, query: str) -> Dict[str, Any]:
         """
         执行SQL查询并返回结果
@@ -341,17 +587,17 @@ class ClickHouseManager:
     
     def close(self):
         """关闭连接"""
-        if self.client:
-            self.client.close()
+        if self._client:
+            self._client.close()
+            self._client = None
             logging.info("ClickHouse连接已关闭")
 
 # 全局ClickHouse管理器实例
 clickhouse_manager = None
 
 def get_clickhouse_manager():
-    """获取ClickHouse管理器单例"""
+    """获取ClickHouse管理器单例（不立即连接；数据库由 flask init-db 创建）"""
     global clickhouse_manager
     if clickhouse_manager is None:
         clickhouse_manager = ClickHouseManager()
-        clickhouse_manager.ensure_database_exists()
     return clickhouse_manager
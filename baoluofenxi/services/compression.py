@@ -0,0 +1,197 @@
+import logging
+import os
+import uuid
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # 未安装时不提供br编码
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # 未安装时不提供zstd编码
+    zstandard = None
+
+# 支持的内容编码，按服务端优先顺序排列（客户端权重相同时取靠前的）
+CONTENT_ENCODINGS = ("zstd", "br", "gzip")
+# 各编码的压缩级别：兼顾速度和压缩率，响应体压缩不宜使用最高级别
+_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+# 预压缩文件的扩展名
+_FILE_SUFFIXES = {"zstd": ".zst", "br": ".br", "gzip": ".gz"}
+# 已经压缩过的内容类型，再次压缩没有收益
+_INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/")
+_INCOMPRESSIBLE_TYPES = {"application/zip", "application/gzip", "application/zstd"}
+_STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def available_encodings():
+    """已安装依赖且在配置中启用的内容编码，按优先顺序排列"""
+    enabled = current_app.config["COMPRESSION_ENCODINGS"]
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in CONTENT_ENCODINGS if encoding in enabled and installed[encoding]]
+
+
+def negotiate_encoding() -> Optional[str]:
+    """按 Accept-Encoding 选择内容编码，客户端不接受任何可用编码时返回None"""
+    encodings = available_encodings()
+    if not encodings:
+        return None
+    return request.accept_encodings.best_match(encodings)
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """压缩后的表示使用不同的强ETag"""
+    return f"{etag}-{encoding}"
+
+
+class _Compressor:
+    """统一三种编码的增量压缩接口：compress(chunk) / flush()"""
+
+    def __init__(self, encoding: str):
+        level = _LEVELS[encoding]
+        if encoding == "gzip":
+            # wbits=31 输出带gzip头的数据
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress, self.flush = self._compressor.compress, self._compressor.flush
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+            self.compress, self.flush = self._compressor.process, self._compressor.finish
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self.compress, self.flush = self._compressor.compress, self._compressor.flush
+        else:
+            raise ValueError(f"不支持的内容编码: {encoding}")
+
+
+def compress_bytes(data: bytes, encoding: str) -> bytes:
+    compressor = _Compressor(encoding)
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """逐块压缩响应体，不把整个响应读入内存"""
+    compressor = _Compressor(encoding)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # 与原响应体一样关闭文件等资源
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def precompressed_file(path: str, encoding: str) -> str:
+    """
+    返回文件的预压缩版本（同目录下加扩展名，如 xxx.envc.gz），不存在或
+    比原文件旧时生成；缓存文件写入后不再修改，之后的请求直接发送该文件
+    """
+    target_path = path + _FILE_SUFFIXES[encoding]
+    try:
+        if os.path.getmtime(target_path) >= os.path.getmtime(path):
+            return target_path
+    except OSError:
+        pass
+
+    tmp_path = f"{target_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        compressor = _Compressor(encoding)
+        with open(path, "rb") as source, open(tmp_path, "wb") as target:
+            while True:
+                chunk = source.read(_STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(compressor.compress(chunk))
+            target.write(compressor.flush())
+        os.replace(tmp_path, target_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return target_path
+
+
+def precompressed_paths(path: str):
+    """文件所有可能存在的预压缩版本路径（删除原文件时一并删除）"""
+    return [path + suffix for suffix in _FILE_SUFFIXES.values()]
+
+
+def _is_compressible(response) -> bool:
+    if not request.path.startswith("/api/"):
+        return False
+    if response.status_code < 200 or response.status_code in (204, 206):
+        return False
+    if "no-transform" in response.headers.get("Cache-Control", ""):
+        return False
+    mimetype = response.mimetype or ""
+    return not (mimetype.startswith(_INCOMPRESSIBLE_PREFIXES) or mimetype in _INCOMPRESSIBLE_TYPES)
+
+
+def compress_response(response):
+    """
+    按 Accept-Encoding 压缩 /api/ 下的响应（after_request）
+
+    - 小于 compression_min_size 的响应不压缩
+    - 流式响应（send_file 等）逐块压缩，不读入内存
+    - 已设置 Content-Encoding 的响应（预压缩文件）不再压缩
+    - ETag 加上编码后缀；304 响应使用客户端回传的ETag
+    """
+    if not _is_compressible(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    etag, weak = response.get_etag()
+    if response.status_code == 304:
+        # 返回客户端缓存的那个表示的ETag（可能是压缩或未压缩的）
+        for encoding in CONTENT_ENCODINGS:
+            if etag and request.if_none_match.contains(encoded_etag(etag, encoding)):
+                response.set_etag(encoded_etag(etag, encoding), weak)
+                break
+        return response
+
+    encoding = response.content_encoding
+    if not encoding:
+        encoding = negotiate_encoding()
+        if not encoding or not _compress_body(response, encoding):
+            return response
+
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+    return response
+
+
+def _compress_body(response, encoding: str) -> bool:
+    """压缩响应体，未压缩（响应太小）时返回False"""
+    min_size = current_app.config["COMPRESSION_MIN_SIZE"]
+    length = response.content_length
+
+    if response.direct_passthrough or response.is_streamed:
+        if length is not None and length < min_size:
+            return False
+        response.response = compress_stream(response.response, encoding)
+        response.direct_passthrough = False
+        response.headers.pop("Content-Length", None)
+        # 压缩后字节范围与原文件不对应
+        response.headers.pop("Accept-Ranges", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return False
+        try:
+            response.set_data(compress_bytes(data, encoding))
+        except Exception as e:
+            logging.warning(f"压缩响应失败: {e}")
+            return False
+
+    response.content_encoding = encoding
+    return True
+
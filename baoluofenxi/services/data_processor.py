@@ -2,17 +2,70 @@ import pandas as pd
 import numpy as np
 import logging
 import io
-from datetime import datetime, timedelta
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
 from database import db
 from models.models import (
     ExperimentData,
     ExperimentType,
     EnvelopeSettings,
-    EnvelopeCache,
 )
 from services.clickhouse_manager import get_clickhouse_manager
-import hashlib
-import json
+from services.excel_reader import iter_excel_chunks, read_excel_preview
+from services.dataset_hash import DatasetHasher, file_source_hash
+from services.shared_cache import get_shared_disk_cache
+from services.scratch_store import (
+    SCRATCH_PREFIX,
+    get_scratch_store,
+    is_scratch_id,
+    new_scratch_id,
+)
+from services.envelope_cache import (
+    EnvelopeCacheService,
+    merge_envelope_columns,
+    split_envelope_columns,
+)
+from services.storage_types import (
+    to_output_list,
+    round_to_storage,
+    encode_frame,
+    decode_frame,
+)
+from services.exceedance import (
+    check_exceedance,
+    envelope_arrays,
+    estimate_time_shift,
+    grid_edges,
+    resample_to_grid,
+)
+from services.run_summary import (
+    RunSummaryBuilder,
+    choose_resolution,
+    merge_summaries,
+    summary_envelope,
+)
+from database_config import db_config
+
+TEMP_TABLE_PREFIX = "temp_envelope_data_"
+# ClickHouse临时表名：前缀 + 时间戳 + 随机串（旧版只有时间戳），防止拼入SQL的表名被篡改
+_TEMP_TABLE_PATTERN = re.compile(r"^temp_envelope_data_\d{8}_\d{6}(_[0-9a-f]{8})?$")
+
+
+def is_temp_table_name(temp_data_id):
+    """临时数据ID是否为本系统生成的ClickHouse临时表名"""
+    return bool(temp_data_id) and bool(_TEMP_TABLE_PATTERN.match(temp_data_id))
+
+
+def _is_rewindable(file):
+    """上传文件能否回到开头重新读取"""
+    stream = getattr(file, "stream", file)
+    try:
+        return stream.seekable()
+    except (AttributeError, ValueError):
+        return False
 
 
 class DataProcessor:
@@ -20,6 +73,16 @@ class DataProcessor:
 
     def __init__(self):
         self.allowed_extensions = {"csv", "xlsx", "xls"}
+        app_config = db_config.get_app_config()
+        self.batch_size = app_config["batch_size"]
+        self.summary_resolutions = app_config["summary_resolutions"]
+        self.shared_cache_enabled = app_config["shared_cache_enabled"]
+        self.batch_compare_workers = app_config["batch_compare_workers"]
+        self.temp_storage = app_config["temp_storage"]
+        self.temp_table_ttl = app_config["temp_table_max_age"]
+        self.max_data_points = app_config["max_data_points"]
+        self.page_size = app_config["page_size"]
+        self.max_page_size = app_config["max_page_size"]
         self.clickhouse_manager = get_clickhouse_manager()
 
     def is_allowed_file(self, filename):
@@ -158,7 +221,10 @@ class DataProcessor:
                     "success": False,
                     "message": "不支持的文件格式",
                 }  # 首先检测文件格式
-            is_special_format, preview_content = self.detect_csv_format(file)
+            is_csv = file.filename.lower().endswith(".csv")
+            is_special_format, preview_content = (
+                self.detect_csv_format(file) if is_csv else (False, "")
+            )
 
             if is_special_format:
                 # 特殊格式：所有数据在一个单元格中
@@ -170,32 +236,18 @@ class DataProcessor:
             else:
                 # 标准格式
                 file.seek(0)  # 重置文件指针
-                if file.filename.endswith(".csv"):
+                if is_csv:
                     df = pd.read_csv(file, nrows=preview_rows)
                 else:
-                    # 处理Excel文件，根据扩展名选择引擎
-                    if file.filename.endswith(".xlsx"):
-                        df = pd.read_excel(file, engine="openpyxl", nrows=preview_rows)
-                    elif file.filename.endswith(".xls"):
-                        df = pd.read_excel(file, engine="xlrd", nrows=preview_rows)
-                    else:
-                        # 尝试自动检测
-                        try:
-                            df = pd.read_excel(
-                                file, engine="openpyxl", nrows=preview_rows
-                            )
-                        except Exception:
-                            try:
-                                file.seek(0)
-                                df = pd.read_excel(
-                                    file, engine="xlrd", nrows=preview_rows
-                                )
-                            except Exception as e:
-                                logging.error(f"Excel预览文件读取失败: {e}")
-                                return {
-                                    "success": False,
-                                    "message": f"Excel预览失败: {str(e)}",
-                                }
+                    # Excel文件以只读模式逐行读取，读够预览行数即停止
+                    try:
+                        df = read_excel_preview(file, nrows=preview_rows)
+                    except Exception as e:
+                        logging.error(f"Excel预览文件读取失败: {e}")
+                        return {
+                            "success": False,
+                            "message": f"Excel预览失败: {str(e)}",
+                        }
                 format_type = "standard"
                 format_message = "标准格式"
 
@@ -239,124 +291,438 @@ class DataProcessor:
             logging.error(f"预览文件失败: {e}")
             return {"success": False, "message": f"预览失败: {str(e)}"}
 
-    def process_upload(self, file, data_name, experiment_type):
-        """处理文件上传"""
-        try:
-            if not self.is_allowed_file(file.filename):
-                return {"success": False, "message": "不支持的文件格式"}  # 读取文件数据
-            if file.filename.endswith(".csv"):
-                # 首先检测文件格式
-                is_special_format, preview_content = self.detect_csv_format(file)
-
-                if is_special_format:
-                    # 处理特殊格式，读取完整文件内容
-                    logging.info(f"检测到特殊格式文件: {file.filename}")
-                    file.seek(0)  # 重置文件指针
-                    full_content = file.read()
-                    if isinstance(full_content, bytes):
-                        full_content = full_content.decode("utf-8")
-                    df = self.parse_special_format_complete(full_content)
-                else:
-                    # 标准格式
-                    file.seek(0)  # 重置文件指针
-                    df = pd.read_csv(file)
+    def iter_upload_chunks(self, file, chunk_size=None):
+        """
+        按块读取上传文件，CSV与Excel共用同一分块管道
+
+        Args:
+            file: 上传的文件
+            chunk_size: 每块行数，默认使用配置的batch_size
+
+        Yields:
+            pd.DataFrame: 原始数据块（未清洗）
+        """
+        chunk_size = chunk_size or self.batch_size
+
+        if file.filename.lower().endswith(".csv"):
+            # 首先检测文件格式
+            is_special_format, _ = self.detect_csv_format(file)
+            file.seek(0)  # 重置文件指针
+
+            if is_special_format:
+                # 特殊格式需要整体转换，读取完整文件内容
+                logging.info(f"检测到特殊格式文件: {file.filename}")
+                full_content = file.read()
+                if isinstance(full_content, bytes):
+                    full_content = full_content.decode("utf-8")
+                yield self.parse_special_format_complete(full_content)
             else:
-                # 处理Excel文件，根据扩展名选择引擎
-                file.seek(0)  # 重置文件指针
-                if file.filename.endswith(".xlsx"):
-                    df = pd.read_excel(file, engine="openpyxl")
-                elif file.filename.endswith(".xls"):
-                    df = pd.read_excel(file, engine="xlrd")
-                else:
-                    # 尝试自动检测
-                    try:
-                        df = pd.read_excel(file, engine="openpyxl")
-                    except Exception:
-                        try:
-                            file.seek(0)
-                            df = pd.read_excel(file, engine="xlrd")
-                        except Exception as e:
-                            logging.error(f"Excel文件读取失败: {e}")
-                            return {
-                                "success": False,
-                                "message": f"Excel文件读取失败: {str(e)}",
-                            }
+                yield from pd.read_csv(file, chunksize=chunk_size)
+        else:
+            # Excel文件以只读模式流式读取，内存占用与文件大小无关
+            yield from iter_excel_chunks(file, chunk_size=chunk_size)
 
-            # 验证数据格式
-            validation_result = self.validate_data_format(df, experiment_type)
-            if not validation_result["is_valid"]:
-                return {"success": False, "message": validation_result["message"]}
+    def process_upload(
+        self,
+        file,
+        data_name,
+        experiment_type,
+        source_hash=None,
+        hash_source=True,
+        activate=True,
+    ):
+        """
+        处理文件上传（分块读取、清洗并写入ClickHouse）
 
-            # 数据清洗
-            df_clean = self.clean_data(df, experiment_type)
+        同一试验类型下已存在相同数据时，只创建引用已有ClickHouse表的数据记录：
+        原始文件相同时不解析；前 PREFIX_ROWS 行与已有数据相同时只解析和计算
+        内容哈希，不写入ClickHouse，确认内容不同后再从头写入。
 
-            # 生成表名
-            table_name = f"exp_{experiment_type.id}_{int(datetime.now().timestamp())}"
+        Args:
+            source_hash: 原始文件的SHA-256，未提供时按hash_source决定是否计算
+            hash_source: 是否读取整个文件计算原始哈希（流式解析时应关闭）
+            activate: 写入完成后是否启用数据；为False时记录保持processing状态，
+                由调用方确认后通过activate_upload启用或discard_upload丢弃
+        """
+        status = "active" if activate else "processing"
+        try:
+            if not self.is_allowed_file(file.filename):
+                return {"success": False, "message": "不支持的文件格式"}
 
-            # 创建数据记录
-            experiment_data = ExperimentData(
-                experiment_type_id=experiment_type.id,
-                data_name=data_name,
-                file_name=file.filename,
-                clickhouse_table_name=table_name,  # 使用正确的字段名
-                row_count=len(df_clean),
-                upload_time=datetime.now(),
-                status="active",
+            # 原始文件完全相同时无需解析
+            if source_hash is None and hash_source:
+                source_hash = file_source_hash(file)
+            duplicate = self._find_duplicate_data(
+                experiment_type.id, source_hash=source_hash
             )
+            if duplicate is not None:
+                return self._create_duplicate_record(
+                    duplicate, data_name, file.filename, source_hash=source_hash, status=status
+                )
 
-            db.session.add(experiment_data)
-            db.session.commit()
+            # 文件不能回退时无法在只计算哈希后重新读取，只能边解析边写入
+            result = self._ingest_upload(
+                file,
+                data_name,
+                experiment_type,
+                source_hash,
+                status,
+                check_prefix=_is_rewindable(file),
+            )
+            if result is None:
+                logging.info(f"{file.filename} 与已有数据前缀相同但内容不同，重新读取并写入")
+                file.seek(0)
+                result = self._ingest_upload(
+                    file, data_name, experiment_type, source_hash, status, check_prefix=False
+                )
+            return result
 
-            # 上传数据到ClickHouse
-            clickhouse_result = self.upload_to_clickhouse(
-                df_clean,
-                table_name,
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"处理上传失败: {e}")
+            return {"success": False, "message": f"处理失败: {str(e)}"}
+
+    def _ingest_upload(
+        self, file, data_name, experiment_type, source_hash, status, check_prefix
+    ):
+        """
+        逐块清洗并写入ClickHouse，同时累计分桶汇总和内容哈希
+
+        check_prefix为True时，前 PREFIX_ROWS 行先暂存不写入，按其前缀哈希查找
+        可能重复的已有数据：没有时写入暂存的数据块并继续；有时之后只计算哈希，
+        结束时内容哈希相同则复用已有的表，不同则返回None，由调用方从头重新写入。
+
+        Returns:
+            Dict: 上传结果；需要从头重新写入时返回None
+        """
+        experiment_data = None
+        table_created = False
+        try:
+            chunks = self.iter_upload_chunks(file)
+            try:
+                first_chunk = next(chunks, None)
+            except Exception as e:
+                logging.error(f"文件读取失败: {e}")
+                return {"success": False, "message": f"文件读取失败: {str(e)}"}
+
+            if first_chunk is None:
+                return {"success": False, "message": "文件中没有数据"}
+
+            # 验证数据格式（以第一块为准，确定时间列和数据列为数值列）
+            validation_result = self.validate_data_format(first_chunk, experiment_type)
+            if not validation_result["is_valid"]:
+                return {"success": False, "message": validation_result["message"]}
+
+            storage_spec = experiment_type.get_storage_spec()
+            table_name = None
+            row_count = 0
+            summary_builder = RunSummaryBuilder(
                 experiment_type.time_column,
                 experiment_type.data_columns,
+                self.summary_resolutions,
+            )
+            content_hasher = DatasetHasher(
+                experiment_type.time_column, experiment_type.data_columns
             )
 
-            if not clickhouse_result["success"]:
-                # 如果ClickHouse上传失败，删除数据记录
-                db.session.delete(experiment_data)
-                db.session.commit()
-                return clickhouse_result
+            def write_chunk(df_clean, stored_values):
+                nonlocal experiment_data, table_created, table_name, row_count
+                if experiment_data is None:
+                    # 第一次写入时创建数据记录和ClickHouse表（同一秒内的多个上传表名不同）
+                    table_name = (
+                        f"exp_{experiment_type.id}_{int(datetime.now().timestamp())}"
+                        f"_{uuid.uuid4().hex[:8]}"
+                    )
+                    experiment_data = ExperimentData(
+                        experiment_type_id=experiment_type.id,
+                        data_name=data_name,
+                        file_name=file.filename,
+                        clickhouse_table_name=table_name,  # 使用正确的字段名
+                        row_count=0,
+                        upload_time=datetime.utcnow(),
+                        status="processing",  # 写入完成前不对外可见
+                        source_hash=source_hash,
+                    )
+                    db.session.add(experiment_data)
+                    db.session.commit()
+
+                    if not self.clickhouse_manager.create_timeseries_table(
+                        table_name,
+                        experiment_type.time_column,
+                        experiment_type.data_columns,
+                        storage_spec,
+                    ):
+                        raise Exception("ClickHouse表创建失败")
+                    table_created = True
 
-            # 更新数据记录中的表名（如果ClickHouse中的表名有变化）
-            if clickhouse_result.get("table_name") != table_name:
-                experiment_data.clickhouse_table_name = clickhouse_result["table_name"]
-                db.session.commit()
+                insert_result = self.clickhouse_manager.insert_dataframe(
+                    table_name, df_clean, experiment_type.time_column, storage_spec
+                )
+                if not insert_result["success"]:
+                    raise Exception(insert_result["message"])
+                # ClickHouse中的表名可能有变化
+                table_name = insert_result["table_name"]
+                row_count += insert_result["row_count"]
+                summary_builder.add(stored_values)
+
+            # 前缀哈希确定之前暂存的数据块（最多约 PREFIX_ROWS + batch_size 行）
+            held = [] if check_prefix else None
+            hash_only = False
+            chunk = first_chunk
+            while chunk is not None:
+                if chunk is not first_chunk:
+                    # pandas逐块推断类型，个别块中的空白或文本单元格会使该列变为
+                    # object；沿用第一块的数值类型，无法解析的值按缺失值丢弃
+                    chunk = self._coerce_numeric_columns(chunk, experiment_type)
+                    validation_result = self.validate_data_format(
+                        chunk, experiment_type
+                    )
+                    if not validation_result["is_valid"]:
+                        raise Exception(validation_result["message"])
+
+                df_clean = self.clean_data(chunk, experiment_type)
+                if len(df_clean) > 0:
+                    stored_values = self._stored_values(
+                        df_clean, experiment_type, storage_spec
+                    )
+                    content_hasher.update(stored_values)
+                    if held is not None:
+                        held.append((df_clean, stored_values))
+                        if content_hasher.prefix_complete:
+                            hash_only = self._find_duplicate_data(
+                                experiment_type.id,
+                                prefix_hash=content_hasher.prefix_hexdigest(),
+                            ) is not None
+                            pending, held = held, None
+                            if not hash_only:
+                                for df_part, stored_part in pending:
+                                    write_chunk(df_part, stored_part)
+                    elif not hash_only:
+                        write_chunk(df_clean, stored_values)
+
+                chunk = next(chunks, None)
+
+            if content_hasher.row_count == 0:
+                raise Exception("文件中没有有效数据")
+
+            # 文件不同但数据内容相同（如另存为其他格式），复用已有的表
+            content_hash = content_hasher.hexdigest()
+            prefix_hash = content_hasher.prefix_hexdigest()
+            duplicate = self._find_duplicate_data(
+                experiment_type.id, content_hash=content_hash
+            )
+            if duplicate is not None:
+                # 只有前缀哈希之前的旧记录才会在写入后才发现重复
+                if experiment_data is not None:
+                    db.session.delete(experiment_data)
+                    db.session.commit()
+                    experiment_data = None
+                    self.clickhouse_manager.drop_table(table_name)
+                    table_created = False
+                return self._create_duplicate_record(
+                    duplicate,
+                    data_name,
+                    file.filename,
+                    source_hash=source_hash,
+                    content_hash=content_hash,
+                    prefix_hash=prefix_hash,
+                    status=status,
+                )
+
+            if hash_only:
+                return None
+            # 不足 PREFIX_ROWS 行的文件，数据仍全部暂存
+            for df_part, stored_part in held or []:
+                write_chunk(df_part, stored_part)
+
+            # 更新数据记录中的行数和表名（如果ClickHouse中的表名有变化）
+            experiment_data.row_count = row_count
+            experiment_data.clickhouse_table_name = table_name
+            experiment_data.time_min = summary_builder.time_min
+            experiment_data.time_max = summary_builder.time_max
+            experiment_data.content_hash = content_hash
+            experiment_data.prefix_hash = prefix_hash
+
+            # 汇总写入失败不影响上传，包络计算会回退到原始数据
+            if self.clickhouse_manager.insert_summary(
+                table_name, summary_builder.finalize()
+            ):
+                experiment_data.summary_resolutions = summary_builder.resolutions
+
+            experiment_data.status = status
+            db.session.commit()
 
             logging.info(
-                f'数据上传成功: {data_name}, 行数: {len(df_clean)}, 表名: {clickhouse_result["table_name"]}'
+                f"数据上传成功: {data_name}, 行数: {row_count}, 表名: {table_name}"
             )
 
             return {
                 "success": True,
                 "message": "数据上传成功",
                 "data_id": experiment_data.id,
-                "row_count": len(df_clean),
-                "table_name": clickhouse_result["table_name"],
+                "row_count": row_count,
+                "table_name": table_name,
+                "deduplicated": False,
             }
 
         except Exception as e:
             db.session.rollback()
             logging.error(f"处理上传失败: {e}")
+
+            # 清理已创建的表和数据记录
+            if table_created:
+                self.clickhouse_manager.drop_table(table_name)
+            if experiment_data is not None and experiment_data.id is not None:
+                try:
+                    db.session.delete(experiment_data)
+                    db.session.commit()
+                except Exception as cleanup_error:
+                    db.session.rollback()
+                    logging.error(f"清理数据记录失败: {cleanup_error}")
+
             return {"success": False, "message": f"处理失败: {str(e)}"}
 
-    def upload_to_clickhouse(self, df, table_name, time_column, data_columns):
-        """将数据上传到ClickHouse"""
+    def _find_duplicate_data(
+        self, experiment_type_id, source_hash=None, content_hash=None, prefix_hash=None
+    ):
+        """查找同一试验类型下原始文件、数据内容或数据前缀相同的有效数据"""
+        if not source_hash and not content_hash and not prefix_hash:
+            return None
+
+        query = ExperimentData.query.filter_by(
+            experiment_type_id=experiment_type_id, status="active"
+        )
+        if source_hash:
+            query = query.filter_by(source_hash=source_hash)
+        if content_hash:
+            query = query.filter_by(content_hash=content_hash)
+        if prefix_hash:
+            query = query.filter_by(prefix_hash=prefix_hash)
+
+        for candidate in query.order_by(ExperimentData.id).all():
+            if candidate.clickhouse_table_name and self.clickhouse_manager.table_exists(
+                candidate.clickhouse_table_name
+            ):
+                return candidate
+        return None
+
+    def _create_duplicate_record(
+        self,
+        duplicate,
+        data_name,
+        file_name,
+        source_hash=None,
+        content_hash=None,
+        prefix_hash=None,
+        status="active",
+    ):
+        """创建引用已有ClickHouse表的数据记录（不重复写入数据）"""
+        experiment_data = ExperimentData(
+            experiment_type_id=duplicate.experiment_type_id,
+            data_name=data_name,
+            file_name=file_name,
+            clickhouse_table_name=duplicate.clickhouse_table_name,
+            row_count=duplicate.row_count,
+            upload_time=datetime.utcnow(),
+            status=status,
+            summary_resolutions=duplicate.summary_resolutions,
+            time_min=duplicate.time_min,
+            time_max=duplicate.time_max,
+            source_hash=source_hash or duplicate.source_hash,
+            content_hash=content_hash or duplicate.content_hash,
+            prefix_hash=prefix_hash or duplicate.prefix_hash,
+        )
+        db.session.add(experiment_data)
+        db.session.commit()
+
+        logging.info(
+            f"数据与记录 {duplicate.id} 重复，复用表 {duplicate.clickhouse_table_name}: {data_name}"
+        )
+
+        return {
+            "success": True,
+            "message": "数据已存在，已复用已有数据",
+            "data_id": experiment_data.id,
+            "row_count": experiment_data.row_count,
+            "table_name": experiment_data.clickhouse_table_name,
+            "deduplicated": True,
+            "duplicate_of": duplicate.id,
+        }
+
+    def activate_upload(self, data_id):
+        """启用process_upload(activate=False)写入的数据，记录不存在或已启用时返回None"""
+        experiment_data = ExperimentData.query.get(data_id)
+        if experiment_data is None or experiment_data.status != "processing":
+            return None
+        experiment_data.status = "active"
+        db.session.commit()
+        return experiment_data
+
+    def discard_upload(self, data_id):
+        """
+        丢弃process_upload(activate=False)写入、尚未启用的数据
+
+        ClickHouse表被其他记录共用（去重）时只删除数据记录。
+
+        Returns:
+            bool: 是否删除了数据记录
+        """
+        experiment_data = ExperimentData.query.get(data_id)
+        if experiment_data is None or experiment_data.status != "processing":
+            return False
+
+        table_name = experiment_data.clickhouse_table_name
+        db.session.delete(experiment_data)
+        db.session.commit()
+        shared = ExperimentData.query.filter_by(clickhouse_table_name=table_name).first()
+        if table_name and shared is None:
+            self.clickhouse_manager.drop_table(table_name)
+        logging.info(f"已丢弃未启用的上传数据 {data_id}")
+        return True
+
+    @staticmethod
+    def _coerce_numeric_columns(df, experiment_type):
+        """将数据块中的时间列和数据列按数值解析，无法解析的值转为NaN"""
+        for col in [experiment_type.time_column] + experiment_type.data_columns:
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], errors="coerce")
+        return df
+
+    def _stored_values(self, df_clean, experiment_type, storage_spec):
+        """
+        按存储类型量化数据，使汇总与ClickHouse中实际存储的值一致
+
+        ClickHouse中时间列和未配置存储类型的列都是Float64，整数列同样转为float64
+        """
+        stored = df_clean.astype(np.float64).fillna(0)
+        if storage_spec:
+            stored = decode_frame(encode_frame(stored.copy(), storage_spec), storage_spec)
+        return stored
+
+    def upload_to_clickhouse(
+        self,
+        df,
+        table_name,
+        time_column,
+        data_columns,
+        storage_spec=None,
+        ttl_seconds=None,
+    ):
+        """将数据上传到ClickHouse（ttl_seconds 用于到期自动删除的临时表）"""
         try:
             # 获取ClickHouse管理器
             ch_manager = get_clickhouse_manager()
 
             # 创建表
             if not ch_manager.create_timeseries_table(
-                table_name, time_column, data_columns
+                table_name, time_column, data_columns, storage_spec, ttl_seconds
             ):
                 return {"success": False, "message": "ClickHouse表创建失败"}
 
             # 插入数据
-            insert_result = ch_manager.insert_dataframe(table_name, df, time_column)
+            insert_result = ch_manager.insert_dataframe(
+                table_name, df, time_column, storage_spec
+            )
 
             if insert_result["success"]:
                 logging.info(f'ClickHouse数据插入成功: {insert_result["message"]}')
@@ -416,6 +782,101 @@ class DataProcessor:
                 "message": f"验证数据格式失败: {str(e)}",
             }
 
+    def fetch_run_frame(
+        self, data_record, experiment_type, columns=None, time_range=None, limit=None
+    ):
+        """
+        以DataFrame形式获取单次试验数据，按试验类型的存储配置解码
+
+        Args:
+            data_record: 试验数据记录
+            experiment_type: 试验类型
+            columns: 要查询的数据列（时间列会自动包含），None表示全部列
+            time_range: 时间范围 (start, end)
+            limit: 限制返回行数
+        """
+        time_column = experiment_type.time_column
+        if columns is not None:
+            columns = [time_column] + [col for col in columns if col != time_column]
+
+        # 整次试验的读取使用主机共享的列缓存
+        if (
+            self.shared_cache_enabled
+            and time_range is None
+            and limit is None
+            and data_record.id is not None
+        ):
+            if columns is None:
+                columns = [time_column] + [
+                    col for col in experiment_type.data_columns if col != time_column
+                ]
+            return self._fetch_run_frame_shared(data_record, experiment_type, columns)
+
+        return self.clickhouse_manager.query_data(
+            table_name=data_record.clickhouse_table_name,
+            time_column=time_column,
+            columns=columns,
+            time_range=time_range,
+            limit=limit,
+            storage_spec=experiment_type.get_storage_spec(),
+        )
+
+    def _fetch_run_frame_shared(self, data_record, experiment_type, columns):
+        """
+        按列从主机共享缓存读取整次试验数据，只向ClickHouse查询缺失的列
+
+        试验数据入库后不再修改，缓存键包含数据记录ID（不会复用）；缓存的列为
+        只读内存映射数组，同一主机上的工作进程共享同一份页缓存。分次查询的
+        列按时间排序后逐行对应，因此只在时间严格递增时才缓存。
+        """
+        time_column = experiment_type.time_column
+        shared_cache = get_shared_disk_cache()
+        cache_keys = {
+            column: (data_record.id, data_record.clickhouse_table_name, column)
+            for column in columns
+        }
+
+        arrays = {}
+        for column in columns:
+            array = shared_cache.get_array("runs", cache_keys[column])
+            if array is not None:
+                arrays[column] = array
+        missing = [column for column in columns if column not in arrays]
+        if not missing:
+            return pd.DataFrame(arrays, columns=columns, copy=False)
+
+        df = self.clickhouse_manager.query_data(
+            table_name=data_record.clickhouse_table_name,
+            time_column=time_column,
+            columns=[time_column] + [col for col in missing if col != time_column],
+            storage_spec=experiment_type.get_storage_spec(),
+        )
+        if df.empty:
+            return df
+
+        time_values = df[time_column].to_numpy()
+        cached_time = arrays.get(time_column)
+        if (cached_time is not None and len(cached_time) != len(time_values)) or not bool(
+            np.all(np.diff(time_values) > 0)
+        ):
+            # 时间不唯一（或缓存与表不一致），分次查询的行顺序无法保证一致
+            return self.clickhouse_manager.query_data(
+                table_name=data_record.clickhouse_table_name,
+                time_column=time_column,
+                columns=columns,
+                storage_spec=experiment_type.get_storage_spec(),
+            )
+
+        for column in missing:
+            if column in df.columns:
+                arrays[column] = df[column].to_numpy()
+                shared_cache.put_array("runs", cache_keys[column], arrays[column])
+
+        return pd.DataFrame(
+            {column: arrays[column] for column in columns if column in arrays},
+            copy=False,
+        )
+
     def get_experiment_data(
         self, experiment_data_id, time_range=None, columns=None, limit=None
     ):
@@ -430,20 +891,13 @@ class DataProcessor:
                 return {"success": False, "message": "数据表名不存在"}
 
             # 获取实验类型信息
-            from models.models import ExperimentType
-
             experiment_type = ExperimentType.query.get(data_record.experiment_type_id)
             if not experiment_type:
                 return {"success": False, "message": "实验类型不存在"}
 
             # 从ClickHouse查询数据
-            ch_manager = get_clickhouse_manager()
-            df = ch_manager.query_data(
-                table_name=data_record.clickhouse_table_name,
-                time_column=experiment_type.time_column,
-                columns=columns,
-                time_range=time_range,
-                limit=limit,
+            df = self.fetch_run_frame(
+                data_record, experiment_type, columns, time_range, limit
             )
 
             return {
@@ -457,27 +911,248 @@ class DataProcessor:
             logging.error(f"获取实验数据失败: {e}")
             return {"success": False, "message": f"获取数据失败: {str(e)}"}
 
+    def get_run_columns(self, data_record, columns=None, time_range=None, limit=None):
+        """
+        按列获取单次试验数据（时间列 + 数据列）
+
+        Returns:
+            Dict: data 包含 time_points、data（{列名: numpy数组}）与 row_count；
+                数组由JSON provider或二进制格式直接编码
+        """
+        try:
+            experiment_type = ExperimentType.query.get(data_record.experiment_type_id)
+            if not experiment_type:
+                return {"success": False, "message": "实验类型不存在"}
+
+            columns, error = self._resolve_run_columns(experiment_type, columns)
+            if error:
+                return {"success": False, "message": error}
+
+            df = self.fetch_run_frame(
+                data_record, experiment_type, columns, time_range, limit
+            )
+            return {
+                "success": True,
+                "data": self._run_columns_payload(data_record, experiment_type, columns, df),
+            }
+
+        except Exception as e:
+            logging.error(f"获取实验数据失败: {e}")
+            return {"success": False, "message": f"获取数据失败: {str(e)}"}
+
+    def get_run_page(
+        self,
+        data_record,
+        columns=None,
+        after=None,
+        before=None,
+        page_size=None,
+        offset=None,
+    ):
+        """
+        按时间键集分页浏览单次试验数据
+
+        after 指定时返回游标之后的下一页，before 指定时返回游标之前的上一页，
+        都不指定时返回第一页。游标由时间和该时间上的行偏移组成，时间相同的行
+        按数据列排序，可以在它们中间分页：offset >= 0 表示游标位于该时间的前
+        offset 行之后，offset < 0 表示位于最后 -offset 行之前，None 表示位于该
+        时间所有行之后（after）或之前（before）。每页通过主键索引定位，只有
+        游标时间上的行使用OFFSET，耗时与翻页深度无关。
+
+        Args:
+            page_size: 每页行数，默认 page_size，不超过 max_page_size
+            offset: after 或 before 游标的行偏移
+
+        Returns:
+            Dict: data 与 get_run_columns 相同，另含 page：
+                after/after_offset 为本页最后一行之后的游标（下一页），
+                before/before_offset 为本页第一行之前的游标（上一页），
+                has_more 表示翻页方向上是否还有数据
+        """
+        try:
+            if after is not None and before is not None:
+                return {"success": False, "message": "after 和 before 不能同时指定"}
+            backward = before is not None
+            cursor = before if backward else after
+            if offset is not None and cursor is None:
+                return {"success": False, "message": "offset 需要与 after 或 before 一起指定"}
+            if page_size is None:
+                page_size = self.page_size
+            page_size = min(page_size, self.max_page_size)
+            if page_size <= 0:
+                return {"success": False, "message": "page_size 必须大于0"}
+
+            experiment_type = ExperimentType.query.get(data_record.experiment_type_id)
+            if not experiment_type:
+                return {"success": False, "message": "实验类型不存在"}
+
+            columns, error = self._resolve_run_columns(experiment_type, columns)
+            if error:
+                return {"success": False, "message": error}
+
+            time_column = experiment_type.time_column
+            query_columns = [time_column] + [col for col in columns if col != time_column]
+            query = dict(
+                table_name=data_record.clickhouse_table_name,
+                time_column=time_column,
+                columns=query_columns,
+                storage_spec=experiment_type.get_storage_spec(),
+                # 时间相同的行按数据列排序，使游标偏移指向确定的行
+                order_by=list(experiment_type.data_columns),
+            )
+            # 按翻页方向排列，多取一行判断是否还有数据、页末的同时间行是否已取完
+            limit = page_size + 1
+            frames = []
+            if offset is not None:
+                frames.append(
+                    self._cursor_time_rows(query, cursor, offset, backward, limit)
+                )
+            taken = len(frames[0]) if frames else 0
+            if taken < limit:
+                frames.append(
+                    self.clickhouse_manager.query_data(
+                        **query,
+                        after=after,
+                        before=before,
+                        descending=backward,
+                        limit=limit - taken,
+                    )
+                )
+            frames = [frame for frame in frames if len(frame)] or frames[-1:]
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+            has_more = len(df) > page_size
+            probe = df[time_column].iloc[page_size] if has_more else None
+            df = df.iloc[:page_size].reset_index(drop=True)
+            near_cursor = far_cursor = (None, None)
+            if len(df):
+                times = df[time_column].to_numpy()
+                near_time, far_time = float(times[0]), float(times[-1])
+                # 本页第一行（按翻页方向）之前的游标：仍在游标时间上时与请求相同
+                near_offset = offset if near_time == cursor else None
+                # 本页最后一行之后的游标：该时间的行已取完时为None，
+                # 否则为本页取到的该时间行数（向前翻页时从末尾计数，为负数）
+                step = -1 if backward else 1
+                if probe is None or probe != far_time:
+                    far_offset = None
+                elif offset is not None and far_time == cursor:
+                    far_offset = offset + step * len(df)
+                else:
+                    far_offset = step * int(np.count_nonzero(times == far_time))
+                near_cursor = (near_time, near_offset)
+                far_cursor = (far_time, far_offset)
+            if backward:
+                df = df.iloc[::-1].reset_index(drop=True)
+                near_cursor, far_cursor = far_cursor, near_cursor
+
+            payload = self._run_columns_payload(data_record, experiment_type, columns, df)
+            payload["page"] = {
+                "page_size": page_size,
+                "direction": "backward" if backward else "forward",
+                "has_more": has_more,
+                "after": far_cursor[0],
+                "after_offset": far_cursor[1],
+                "before": near_cursor[0],
+                "before_offset": near_cursor[1],
+            }
+            return {"success": True, "data": payload}
+
+        except Exception as e:
+            logging.error(f"分页获取实验数据失败: {e}")
+            return {"success": False, "message": f"获取数据失败: {str(e)}"}
+
+    def _cursor_time_rows(self, query, cursor, offset, backward, limit):
+        """
+        游标时间上位于游标翻页方向一侧的行（按翻页方向排列，最多limit行）
+
+        offset 的含义见 get_run_page；OFFSET 只在该时间的行内跳过
+        """
+        same_time = dict(query, time_range=(cursor, cursor))
+        if offset >= 0 and not backward:
+            return self.clickhouse_manager.query_data(
+                **same_time, offset=offset, limit=limit
+            )
+        if offset < 0 and backward:
+            return self.clickhouse_manager.query_data(
+                **same_time, descending=True, offset=-offset, limit=limit
+            )
+
+        # 取游标另一侧紧邻游标的行，再反转为翻页方向
+        remaining = offset if offset >= 0 else -offset
+        count = min(remaining, limit)
+        if count == 0:
+            return pd.DataFrame()
+        df = self.clickhouse_manager.query_data(
+            **same_time,
+            descending=offset < 0,
+            offset=remaining - count,
+            limit=count,
+        )
+        return df.iloc[::-1].reset_index(drop=True)
+
+    @staticmethod
+    def _resolve_run_columns(experiment_type, columns):
+        """校验请求的数据列，未指定时返回全部数据列；返回 (列, 错误信息)"""
+        if not columns:
+            return list(experiment_type.data_columns), None
+        missing = [
+            column for column in columns if column not in experiment_type.data_columns
+        ]
+        if missing:
+            return None, f"列 {missing} 不存在"
+        return columns, None
+
+    @staticmethod
+    def _run_columns_payload(data_record, experiment_type, columns, df):
+        """按列组织试验数据（numpy数组，定点列按存储精度舍入）"""
+        time_column = experiment_type.time_column
+        storage_spec = experiment_type.get_storage_spec()
+        time_points = df[time_column].to_numpy() if len(df) else np.array([])
+        values = {
+            column: round_to_storage(df[column].to_numpy(), storage_spec, column)
+            if len(df)
+            else np.array([])
+            for column in columns
+        }
+        return {
+            "data_id": data_record.id,
+            "time_column": time_column,
+            "time_points": time_points,
+            "data": values,
+            "row_count": len(df),
+        }
+
     def get_multiple_experiment_data(
         self, experiment_data_ids, time_range=None, columns=None
     ):
-        """批量获取多个实验数据"""
+        """批量获取多个实验数据，合并为一个DataFrame（保留存储精度对应的dtype）"""
         try:
-            all_data = []
+            frames = []
 
             for data_id in experiment_data_ids:
-                result = self.get_experiment_data(data_id, time_range, columns)
-                if result["success"]:
-                    all_data.extend(result["data"])
+                data_record = ExperimentData.query.get(data_id)
+                if not data_record or not data_record.clickhouse_table_name:
+                    continue
+
+                experiment_type = ExperimentType.query.get(
+                    data_record.experiment_type_id
+                )
+                if not experiment_type:
+                    continue
 
-            if not all_data:
+                df = self.fetch_run_frame(
+                    data_record, experiment_type, columns, time_range
+                )
+                if not df.empty:
+                    frames.append(df)
+
+            if not frames:
                 return {"success": False, "message": "没有获取到有效数据"}
 
-            # 转换为DataFrame进行处理
-            df = pd.DataFrame(all_data)
+            df = pd.concat(frames, ignore_index=True)
 
             return {
                 "success": True,
-                "data": all_data,
                 "combined_df": df,
                 "total_rows": len(df),
             }
@@ -516,6 +1191,9 @@ class DataProcessor:
         selected_columns,
         sampling_points=None,
         use_sampling=True,
+        resolution=None,
+        binary=False,
+        refresh_within=None,
     ):
         """
         为指定列计算包络数据
@@ -525,83 +1203,128 @@ class DataProcessor:
             selected_columns: 选中的数据列
             sampling_points: 采样点数，默认200
             use_sampling: 是否使用采样，False表示使用所有数据点
+            resolution: 汇总分辨率（时间桶宽度），None表示按采样点数自动选择
+            binary: 为True时不解码缓存，返回 {"cache_file": 缓存文件路径}
+            refresh_within: 缓存在该秒数内过期时重新计算（供缓存预热使用）
         """
         try:
-            # 获取历史数据
-            historical_data = ExperimentData.query.filter_by(
-                experiment_type_id=experiment_type_id,
-                is_historical=True,
-                status="active",
-            ).all()
-
-            if not historical_data:
-                return {"error": "没有标记为历史数据的记录"}
-
             # 设置采样参数
             if sampling_points is None:
                 sampling_points = 200
 
-            # 构建缓存键
-            cache_key_data = {
+            cache_params = {
                 "selected_columns": sorted(selected_columns),
                 "sampling_points": sampling_points if use_sampling else "full",
                 "use_sampling": use_sampling,
             }
-            columns_hash = hashlib.md5(
-                json.dumps(cache_key_data, sort_keys=True).encode()
-            ).hexdigest()
-
-            # 检查缓存
-            data_ids = [d.id for d in historical_data]
-            cache = (
-                EnvelopeCache.query.filter_by(
-                    experiment_type_id=experiment_type_id,
-                    selected_columns_hash=columns_hash,
-                )
-                .filter(
-                    EnvelopeCache.historical_data_ids == json.dumps(sorted(data_ids))
-                )
-                .first()
-            )
+            if resolution is not None:
+                cache_params["resolution"] = float(resolution)
 
-            if cache and not cache.is_expired():
-                logging.info(f"使用缓存的包络数据: {cache.id}")
-                return cache.envelope_data
+            cache_service = EnvelopeCacheService()
 
-            # 计算新的包络数据
-            if use_sampling:
-                envelope_data = self._compute_envelope_with_sampling(
-                    historical_data, selected_columns, sampling_points
-                )
-            else:
-                envelope_data = self._compute_envelope_full_data(
-                    historical_data, selected_columns
+            def compute_columns(historical_data, columns):
+                # 计算新的包络数据（优先合并上传时生成的分桶汇总）
+                if not use_sampling:
+                    return self._compute_envelope_full_data(historical_data, columns)
+                envelope_data = self._compute_envelope_from_summaries(
+                    historical_data, columns, sampling_points, resolution
                 )
+                if envelope_data is None:
+                    envelope_data = self._compute_envelope_with_sampling(
+                        historical_data, columns, sampling_points
+                    )
+                return envelope_data
 
-            # 保存到缓存
-            if cache:
-                cache.envelope_data = envelope_data
-                cache.created_at = datetime.now()
-                cache.expires_at = datetime.now() + timedelta(hours=1)
-            else:
-                cache = EnvelopeCache(
+            def compute():
+                # 先读取版本再读取历史数据，按列缓存的结果不会早于其版本
+                version = cache_service.historical_version(experiment_type_id)
+                if version is None:
+                    return {"error": "试验类型不存在"}
+
+                # 获取历史数据
+                historical_data = ExperimentData.query.filter_by(
                     experiment_type_id=experiment_type_id,
-                    selected_columns_hash=columns_hash,
-                    historical_data_ids=json.dumps(sorted(data_ids)),
-                    envelope_data=envelope_data,
-                    created_at=datetime.now(),
-                    expires_at=datetime.now() + timedelta(hours=1),
-                )
-                db.session.add(cache)
+                    is_historical=True,
+                    status="active",
+                ).all()
 
-            db.session.commit()
+                if not historical_data:
+                    return {"error": "没有标记为历史数据的记录"}
+
+                column_params = {
+                    key: value
+                    for key, value in cache_params.items()
+                    if key != "selected_columns"
+                }
+                return self._compose_column_envelopes(
+                    cache_service,
+                    experiment_type_id,
+                    version,
+                    selected_columns,
+                    column_params,
+                    lambda columns: compute_columns(historical_data, columns),
+                    refresh_within,
+                )
 
-            return envelope_data
+            return cache_service.get_or_compute(
+                experiment_type_id,
+                "columns",
+                cache_params,
+                compute,
+                binary=binary,
+                refresh_within=refresh_within,
+            )
 
         except Exception as e:
             logging.error(f"计算包络数据失败: {e}")
             return {"error": f"计算失败: {str(e)}"}
 
+    def _compose_column_envelopes(
+        self,
+        cache_service,
+        experiment_type_id,
+        version,
+        selected_columns,
+        column_params,
+        compute_columns,
+        refresh_within=None,
+    ):
+        """
+        按列组合包络：每列的包络在（历史数据集版本, 采样参数）下单独缓存，
+        只为缺失的列计算一次（查询只投影缺失的列）
+
+        各列的时间点由历史数据和采样参数决定，与列无关；若各列时间点
+        不一致（如某列分桶缺失），整体重新计算。
+        """
+        columns = list(dict.fromkeys(selected_columns))
+        params_by_column = {
+            column: {**column_params, "column": column} for column in columns
+        }
+        parts = cache_service.get_many(
+            experiment_type_id, version, "column", params_by_column, refresh_within
+        )
+
+        missing = [column for column in columns if column not in parts]
+        if missing:
+            logging.info(f"计算缺失列的包络: {missing}，复用缓存列: {len(parts)}")
+            envelope_data = compute_columns(missing)
+            if "error" in envelope_data:
+                return envelope_data
+            computed = split_envelope_columns(envelope_data, missing)
+            cache_service.put_many(
+                experiment_type_id,
+                version,
+                "column",
+                {column: (params_by_column[column], computed[column]) for column in missing},
+            )
+            parts.update(computed)
+
+        envelope_data = merge_envelope_columns(parts, columns)
+        if envelope_data is None:
+            logging.info("各列包络的时间点不一致，重新计算全部列")
+            envelope_data = compute_columns(columns)
+        return envelope_data
+
     def calculate_envelope(self, experiment_type_id):
         """计算包络数据（保持兼容性）"""
         try:
@@ -750,9 +1473,18 @@ class DataProcessor:
             sampling_points: 采样点数
         """
         try:
-            # 从ClickHouse获取所有历史数据
+            # 获取实验类型信息
+            experiment_type = ExperimentType.query.get(
+                data_records[0].experiment_type_id
+            )
+            time_column = experiment_type.time_column
+            storage_spec = experiment_type.get_storage_spec()
+
+            # 从ClickHouse获取所有历史数据（只查询需要的列）
             data_ids = [record.id for record in data_records]
-            combined_result = self.get_multiple_experiment_data(data_ids)
+            combined_result = self.get_multiple_experiment_data(
+                data_ids, columns=selected_columns
+            )
 
             if not combined_result["success"]:
                 return {"error": "获取历史数据失败"}
@@ -762,12 +1494,6 @@ class DataProcessor:
             if df.empty:
                 return {"error": "没有有效的历史数据"}
 
-            # 获取实验类型信息
-            experiment_type = ExperimentType.query.get(
-                data_records[0].experiment_type_id
-            )
-            time_column = experiment_type.time_column
-
             # 按时间分组计算包络
             time_min = df[time_column].min()
             time_max = df[time_column].max()
@@ -777,58 +1503,29 @@ class DataProcessor:
             time_bins = np.linspace(time_min, time_max, n_intervals + 1)
 
             # 按时间区间分组
-            df["time_group"] = pd.cut(
-                df[time_column], bins=time_bins, include_lowest=True
-            )
+            time_group = pd.cut(df[time_column], bins=time_bins, include_lowest=True)
+            grouped = df.groupby(time_group, observed=True)
+            present_columns = [col for col in selected_columns if col in df.columns]
+
+            # 每个时间段的中心点与各列的最大最小值（全为空的时间段用0填充）
+            time_points = grouped[time_column].mean().to_numpy()
+            upper_df = grouped[present_columns].max().fillna(0)
+            lower_df = grouped[present_columns].min().fillna(0)
 
-            # 计算每个时间区间内各列的最大最小值
             envelope_data = {}
-            time_points = []
-
-            # 为每个选中的列计算包络
-            for column in selected_columns:
-                if column not in df.columns:
-                    continue
-
-                upper_envelope = []
-                lower_envelope = []
-                current_time_points = []
-
-                # 按时间分组计算最大最小值
-                grouped = df.groupby("time_group", observed=True)
-
-                for group_name, group_data in grouped:
-                    if len(group_data) == 0:
-                        continue
-
-                    # 计算该时间段的中心点
-                    time_center = group_data[time_column].mean()
-                    current_time_points.append(time_center)
-
-                    # 计算该时间段内该列的最大最小值
-                    column_values = group_data[column].dropna()
-                    if len(column_values) > 0:
-                        max_val = column_values.max()
-                        min_val = column_values.min()
-                        upper_envelope.append(max_val)
-                        lower_envelope.append(min_val)
-                    else:
-                        # 如果该时间段没有数据，使用0填充
-                        upper_envelope.append(0)
-                        lower_envelope.append(0)
-
-                envelope_data[column] = {
-                    "upper": upper_envelope,
-                    "lower": lower_envelope,
-                }
-
-                # 使用第一列的时间点作为基准
-                if not time_points:
-                    time_points = current_time_points
+            for column in present_columns:
+                envelope_data[column] = {
+                    "upper": to_output_list(
+                        upper_df[column].to_numpy(), storage_spec, column
+                    ),
+                    "lower": to_output_list(
+                        lower_df[column].to_numpy(), storage_spec, column
+                    ),
+                }
 
             # 构造返回数据
             return {
-                "time_points": sorted(time_points),
+                "time_points": time_points.tolist(),
                 "envelope_data": envelope_data,
                 "data_count": len(data_records),
                 "sampling_method": "time_interval",
@@ -841,6 +1538,131 @@ class DataProcessor:
             logging.error(f"采样包络计算失败: {e}")
             return {"error": f"采样计算失败: {str(e)}"}
 
+    def _compute_envelope_from_summaries(
+        self, data_records, selected_columns, sampling_points, resolution=None
+    ):
+        """
+        由各次试验的分桶汇总计算包络，无需扫描原始数据
+
+        未指定分辨率时，所有历史数据都具备汇总才会使用；返回None表示
+        没有合适的汇总，由调用方回退到原始数据计算。指定的分辨率缺少
+        汇总时，按该分辨率对原始数据现场分桶。
+        """
+        experiment_type = ExperimentType.query.get(data_records[0].experiment_type_id)
+        time_column = experiment_type.time_column
+        storage_spec = experiment_type.get_storage_spec()
+
+        available = None
+        for record in data_records:
+            resolutions = set(record.summary_resolutions or [])
+            available = resolutions if available is None else available & resolutions
+
+        if resolution is None:
+            if not available or any(
+                record.time_min is None or record.time_max is None
+                for record in data_records
+            ):
+                return None
+            resolution = choose_resolution(
+                sorted(available),
+                min(record.time_min for record in data_records),
+                max(record.time_max for record in data_records),
+                sampling_points,
+            )
+            if resolution is None:
+                return None
+        else:
+            resolution = float(resolution)
+            if resolution <= 0:
+                return {"error": "汇总分辨率必须大于0"}
+
+        if available and resolution in available:
+            summaries = [
+                self.clickhouse_manager.query_summary(
+                    record.clickhouse_table_name, resolution, selected_columns
+                )
+                for record in data_records
+            ]
+            sampling_method = "summary"
+        else:
+            frames = self._fetch_historical_frames(
+                data_records, experiment_type, selected_columns
+            )
+            summaries = [
+                RunSummaryBuilder.from_frame(
+                    frame, time_column, selected_columns, [resolution]
+                )
+                for frame in frames
+            ]
+            sampling_method = "bucket"
+
+        summary = merge_summaries(summaries)
+        if summary.empty:
+            return {"error": "没有有效的历史数据"}
+
+        result = summary_envelope(summary, selected_columns, resolution)
+        time_points = result["time_points"]
+
+        envelope_data = {}
+        for column in selected_columns:
+            column_result = result["columns"][column]
+            # 单精度/定点列的极值本身就是单精度值，转回float32后按存储精度输出
+            dtype = np.float32 if column in storage_spec else np.float64
+            envelope_data[column] = {
+                "upper": to_output_list(
+                    column_result["upper"].astype(dtype), storage_spec, column
+                ),
+                "lower": to_output_list(
+                    column_result["lower"].astype(dtype), storage_spec, column
+                ),
+            }
+
+        return {
+            "time_points": time_points.tolist(),
+            "envelope_data": envelope_data,
+            "data_count": len(data_records),
+            "sampling_method": sampling_method,
+            "sampling_points": len(time_points),
+            "original_points": result["original_points"],
+            "resolution": resolution,
+            "time_range": {
+                "min": float(time_points[0]),
+                "max": float(time_points[-1]),
+            },
+        }
+
+    def _exact_time_envelope(self, frames, time_column, selected_columns):
+        """
+        按精确时间点合并多次试验数据，计算每个时间点各列的最大最小值
+
+        Returns:
+            (upper_df, lower_df): 以时间为索引（升序）的最大/最小值
+        """
+        combined = pd.concat(frames, ignore_index=True)
+        grouped = combined.groupby(time_column, sort=True)[selected_columns]
+        return grouped.max(), grouped.min()
+
+    def _fetch_historical_frames(self, data_records, experiment_type, selected_columns):
+        """获取历史数据记录中存在的表的数据（时间列 + 选中列）"""
+        frames = []
+        for data_record in data_records:
+            if not data_record.clickhouse_table_name:
+                logging.warning(f"数据记录 {data_record.id} 缺少ClickHouse表名")
+                continue
+
+            if not self.clickhouse_manager.table_exists(
+                data_record.clickhouse_table_name
+            ):
+                logging.warning(
+                    f"ClickHouse表 {data_record.clickhouse_table_name} 不存在"
+                )
+                continue
+
+            df = self.fetch_run_frame(data_record, experiment_type, selected_columns)
+            if not df.empty:
+                frames.append(df)
+        return frames
+
     def _compute_envelope_full_data(self, data_records, selected_columns):
         """
         计算完整数据包络 - 不采样，处理每个时间点
@@ -855,75 +1677,43 @@ class DataProcessor:
                 data_records[0].experiment_type_id
             )
             time_column = experiment_type.time_column
+            storage_spec = experiment_type.get_storage_spec()
 
-            # 收集所有实际时间点的数据
-            all_data_by_time = {}  # {time_point: {column: [values]}}
-
-            for data_record in data_records:
-                if not self.clickhouse_manager.table_exists(
-                    data_record.clickhouse_table_name
-                ):
-                    continue
-
-                # 查询完整数据，不限制行数
-                query = f"""
-                SELECT `{time_column}`, {', '.join([f'`{col}`' for col in selected_columns])}
-                FROM `{data_record.clickhouse_table_name}`
-                ORDER BY `{time_column}`
-                """
-
-                result = self.clickhouse_manager.execute_query(query)
-                if not result["success"]:
-                    continue
-
-                # 按实际时间点收集数据
-                for row in result["data"]:
-                    time_point = row[time_column]
-
-                    if time_point not in all_data_by_time:
-                        all_data_by_time[time_point] = {}
-
-                    for column in selected_columns:
-                        if column in row:
-                            if column not in all_data_by_time[time_point]:
-                                all_data_by_time[time_point][column] = []
-                            all_data_by_time[time_point][column].append(row[column])
+            # 查询完整数据，不限制行数
+            frames = self._fetch_historical_frames(
+                data_records, experiment_type, selected_columns
+            )
 
-            if not all_data_by_time:
+            if not frames:
                 return {"error": "没有找到有效的历史数据"}
 
             # 计算每个实际时间点的包络（不采样）
-            sorted_time_points = sorted(all_data_by_time.keys())
-            envelope_data = {}
+            upper_df, lower_df = self._exact_time_envelope(
+                frames, time_column, selected_columns
+            )
+            sorted_time_points = upper_df.index.to_numpy()
 
+            envelope_data = {}
             for column in selected_columns:
-                upper_values = []
-                lower_values = []
-
-                for time_point in sorted_time_points:
-                    if (
-                        column in all_data_by_time[time_point]
-                        and len(all_data_by_time[time_point][column]) > 0
-                    ):
-                        values = all_data_by_time[time_point][column]
-                        upper_values.append(max(values))
-                        lower_values.append(min(values))
-                    else:
-                        # 如果某个时间点没有该列的数据，跳过该点
-                        continue
-
-                envelope_data[column] = {"upper": upper_values, "lower": lower_values}
+                envelope_data[column] = {
+                    "upper": to_output_list(
+                        upper_df[column].to_numpy(), storage_spec, column
+                    ),
+                    "lower": to_output_list(
+                        lower_df[column].to_numpy(), storage_spec, column
+                    ),
+                }
 
             return {
-                "time_points": sorted_time_points,
+                "time_points": sorted_time_points.tolist(),
                 "envelope_data": envelope_data,
                 "data_count": len(data_records),
                 "sampling_method": "full_data",
                 "sampling_points": len(sorted_time_points),
                 "original_points": len(sorted_time_points),
                 "time_range": {
-                    "min": float(min(sorted_time_points)),
-                    "max": float(max(sorted_time_points)),
+                    "min": float(sorted_time_points[0]),
+                    "max": float(sorted_time_points[-1]),
                 },
             }
 
@@ -958,7 +1748,8 @@ class DataProcessor:
     def process_temp_upload(self, file, experiment_type, format_options=None):
         """
         处理临时上传，用于包络分析对比
-        不写入MySQL，只上传到ClickHouse临时表
+        不写入MySQL；默认写入本地暂存区（temp_storage = local），
+        多主机部署时可配置为上传到ClickHouse临时表（temp_storage = clickhouse）
 
         Args:
             file: 上传的文件
@@ -992,23 +1783,32 @@ class DataProcessor:
             if not validation_result["is_valid"]:
                 return {"success": False, "message": validation_result["message"]}
 
-            # 生成临时表名（基于时间戳）
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_table_name = f"temp_envelope_data_{timestamp}"
+            if self.temp_storage == "local":
+                temp_table_name = self._save_temp_to_scratch(
+                    df, experiment_type, file.filename
+                )
+            else:
+                # 生成临时表名（时间戳 + 随机串，同一秒内的上传互不冲突）
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                temp_table_name = (
+                    f"{TEMP_TABLE_PREFIX}{timestamp}_{uuid.uuid4().hex[:8]}"
+                )
 
-            # 上传到ClickHouse临时表
-            clickhouse_result = self.upload_to_clickhouse(
-                df,
-                temp_table_name,
-                experiment_type.time_column,
-                experiment_type.data_columns,
-            )
+                # 上传到ClickHouse临时表，超过保留时间后由ClickHouse自动删除数据
+                clickhouse_result = self.upload_to_clickhouse(
+                    df,
+                    temp_table_name,
+                    experiment_type.time_column,
+                    experiment_type.data_columns,
+                    experiment_type.get_storage_spec(),
+                    ttl_seconds=self.temp_table_ttl,
+                )
 
-            if not clickhouse_result["success"]:
-                return {
-                    "success": False,
-                    "message": f'ClickHouse上传失败: {clickhouse_result["message"]}',
-                }
+                if not clickhouse_result["success"]:
+                    return {
+                        "success": False,
+                        "message": f'ClickHouse上传失败: {clickhouse_result["message"]}',
+                    }
 
             return {
                 "success": True,
@@ -1026,178 +1826,186 @@ class DataProcessor:
             logging.error(f"临时上传处理失败: {e}")
             return {"success": False, "message": f"处理失败: {str(e)}"}
 
-    def get_temp_comparison_data(
-        self,
-        temp_table_name,
-        time_column,
-        selected_columns,
-        use_sampling=True,
-        sampling_points=200,
-    ):
+    def _save_temp_to_scratch(self, df, experiment_type, file_name):
         """
-        从临时表获取对比数据
+        将临时对比数据按列写入本地暂存区，返回临时数据ID
 
-        Args:
-            temp_table_name: 临时表名
-            time_column: 时间列名
-            selected_columns: 选中的数据列
-            use_sampling: 是否使用采样
-            sampling_points: 采样点数
+        与写入ClickHouse临时表时一致：空值填0、按存储类型量化、按时间排序，
+        因此对比结果和另存为正式数据后的结果相同
         """
-        try:
-            # 构建查询语句
-            columns_str = f"`{time_column}`, " + ", ".join(
-                [f"`{col}`" for col in selected_columns]
-            )
-            query = f"""
-            SELECT {columns_str}
-            FROM `{temp_table_name}`
-            ORDER BY `{time_column}`
-            """
-
-            # 执行查询
-            result = self.clickhouse_manager.execute_query(query)
-            if not result["success"]:
-                return {"success": False, "message": f'查询失败: {result["message"]}'}
-
-            data = result["data"]
-            if not data:
-                return {"success": False, "message": "临时表中没有找到数据"}
+        time_column = experiment_type.time_column
+        columns = [time_column] + list(experiment_type.data_columns)
+        stored = self._stored_values(
+            df[columns], experiment_type, experiment_type.get_storage_spec()
+        )
+        stored = stored.sort_values(time_column, kind="stable").reset_index(drop=True)
 
-            # 调试：打印数据结构
-            if data:
-                logging.info(f"临时数据第一行的键: {list(data[0].keys())}")
-                logging.info(f"requested columns: {selected_columns}")
+        temp_data_id = new_scratch_id()
+        get_scratch_store().save(
+            temp_data_id,
+            stored,
+            {"experiment_type_id": experiment_type.id, "file_name": file_name},
+        )
+        return temp_data_id
+
+    def _query_temp_frame(self, temp_data_id, time_column, columns, storage_spec):
+        """从本地暂存区或ClickHouse临时表读取临时对比数据"""
+        if is_scratch_id(temp_data_id):
+            df = get_scratch_store().load(temp_data_id, columns)
+            return df if df is not None else pd.DataFrame()
+        if not is_temp_table_name(temp_data_id):
+            return pd.DataFrame()
+        return self.clickhouse_manager.query_data(
+            table_name=temp_data_id,
+            time_column=time_column,
+            columns=columns,
+            storage_spec=storage_spec,
+        )
 
-            # 检查列是否存在
-            for column in selected_columns:
-                if column not in data[0]:
-                    logging.error(
-                        f"列 '{column}' 不在数据中，可用列: {list(data[0].keys())}"
-                    )
-                    return {"success": False, "message": f"列 {column} 不存在"}
+    def save_temp_data_to_mysql(
+        self, temp_table_name, data_name, experiment_type, file_name
+    ):
+        """
+        将临时数据保存到MySQL元数据表
+        """
+        if is_scratch_id(temp_table_name):
+            return self._promote_scratch_data(
+                temp_table_name, data_name, experiment_type, file_name
+            )
 
-            # 将数据转换为DataFrame以便采样处理
-            df = pd.DataFrame(data)
-            original_points = len(df)
+        if not is_temp_table_name(temp_table_name):
+            return {"success": False, "message": "无效的临时数据ID"}
 
-            if use_sampling and original_points > sampling_points:
-                # 应用采样逻辑
-                time_min = df[time_column].min()
-                time_max = df[time_column].max()
+        try:
+            # 从临时表获取基本信息
+            count_query = f"SELECT count(*) as total FROM `{temp_table_name}`"
+            count_result = self.clickhouse_manager.execute_query(count_query)
 
-                # 创建时间区间
-                n_intervals = min(sampling_points, original_points // 5) or 20
-                time_bins = np.linspace(time_min, time_max, n_intervals + 1)
+            if not count_result["success"]:
+                return {"success": False, "message": "获取数据行数失败"}
 
-                # 按时间区间分组采样
-                df["time_group"] = pd.cut(
-                    df[time_column], bins=time_bins, include_lowest=True
-                )
+            row_count = count_result["data"][0]["total"]
+            if row_count == 0:
+                return {"success": False, "message": "临时数据不存在或已过期"}
 
-                # 每个时间组取中位值或平均值
-                sampled_data = []
-                grouped = df.groupby("time_group", observed=True)
+            # 永久表名沿用临时表名中的时间戳和随机串
+            new_table_name = (
+                f"envelope_data_{temp_table_name[len(TEMP_TABLE_PREFIX):]}"
+            )
 
-                for group_name, group_data in grouped:
-                    if len(group_data) == 0:
-                        continue
+            # 创建MySQL记录（表转为永久表之前不对外可见）
+            experiment_data = ExperimentData(
+                data_name=data_name,
+                experiment_type_id=experiment_type.id,
+                file_name=file_name,
+                status="processing",
+                row_count=row_count,
+                clickhouse_table_name=new_table_name,
+                upload_time=datetime.utcnow(),
+            )
 
-                    # 计算该时间段的中心点
-                    time_center = group_data[time_column].mean()
+            db.session.add(experiment_data)
+            db.session.commit()
 
-                    # 为每个数据列计算平均值
-                    row_data = {time_column: time_center}
-                    for column in selected_columns:
-                        column_values = group_data[column].dropna()
-                        if len(column_values) > 0:
-                            row_data[column] = column_values.mean()
-                        else:
-                            row_data[column] = 0
-
-                    sampled_data.append(row_data)
-
-                # 使用采样后的数据
-                processed_data = sampled_data
-                sampling_method = "time_interval"
-                actual_points = len(sampled_data)
-            else:
-                # 不采样，使用原始数据
-                processed_data = data
-                sampling_method = "full_data"
-                actual_points = original_points
+            # 移除TTL并重命名为永久表
+            if not self.clickhouse_manager.promote_temp_table(
+                temp_table_name,
+                new_table_name,
+                experiment_type.time_column,
+                experiment_type.data_columns,
+                experiment_type.get_storage_spec(),
+            ):
+                # 转换失败时删除MySQL记录
+                db.session.delete(experiment_data)
+                db.session.commit()
+                return {"success": False, "message": "临时表转为永久表失败"}
 
-            # 整理数据格式
-            time_points = [row[time_column] for row in processed_data]
-            comparison_data = {}
+            experiment_data.status = "active"
+            db.session.commit()
 
-            for column in selected_columns:
-                comparison_data[column] = [row[column] for row in processed_data]
+            # 数据已在ClickHouse中，直接在服务端计算分桶汇总
+            self._build_table_summary(experiment_data, experiment_type)
 
             return {
                 "success": True,
-                "data": {
-                    "time_points": time_points,
-                    "data": comparison_data,
-                    "sampling_method": sampling_method,
-                    "sampling_points": actual_points,
-                    "original_points": original_points,
-                    "time_range": {
-                        "min": float(min(time_points)) if time_points else 0,
-                        "max": float(max(time_points)) if time_points else 0,
-                    },
-                },
+                "data_id": experiment_data.id,
+                "message": "数据保存成功",
             }
 
         except Exception as e:
-            logging.error(f"获取临时对比数据失败: {e}")
-            return {"success": False, "message": f"获取数据失败: {str(e)}"}
+            logging.error(f"保存临时数据到MySQL失败: {e}")
+            return {"success": False, "message": f"保存失败: {str(e)}"}
 
-    def save_temp_data_to_mysql(
-        self, temp_table_name, data_name, experiment_type, file_name
-    ):
+    def _promote_scratch_data(self, temp_data_id, data_name, experiment_type, file_name):
         """
-        将临时数据保存到MySQL元数据表
+        将本地暂存区中的临时数据写入ClickHouse并创建数据记录
+
+        暂存数据已经量化，汇总和内容哈希直接在本地计算；内容与已有数据相同时
+        复用已有的表，不再写入ClickHouse
         """
+        store = get_scratch_store()
+        experiment_data = None
+        table_created = False
         try:
-            # 从临时表获取基本信息
-            count_query = f"SELECT count(*) as total FROM {temp_table_name}"
-            count_result = self.clickhouse_manager.execute_query(count_query)
+            df = store.load(temp_data_id)
+            if df is None:
+                return {"success": False, "message": "临时数据不存在或已过期"}
 
-            if not count_result["success"]:
-                return {"success": False, "message": "获取数据行数失败"}
-
-            row_count = count_result["data"][0]["total"]
+            time_column = experiment_type.time_column
+            data_columns = experiment_type.data_columns
+            content_hasher = DatasetHasher(time_column, data_columns)
+            content_hasher.update(df)
+            content_hash = content_hasher.hexdigest()
+            duplicate = self._find_duplicate_data(
+                experiment_type.id, content_hash=content_hash
+            )
+            if duplicate is not None:
+                result = self._create_duplicate_record(
+                    duplicate,
+                    data_name,
+                    file_name,
+                    content_hash=content_hash,
+                    prefix_hash=content_hasher.prefix_hexdigest(),
+                )
+                store.delete(temp_data_id)
+                return result
 
-            # 创建MySQL记录
+            table_name = f"envelope_data_{temp_data_id[len(SCRATCH_PREFIX):]}"
             experiment_data = ExperimentData(
                 data_name=data_name,
                 experiment_type_id=experiment_type.id,
                 file_name=file_name,
-                status="active",
-                row_count=row_count,
-                clickhouse_table_name=temp_table_name.replace(
-                    "temp_", ""
-                ),  # 移除temp前缀
-                upload_time=datetime.now(),
+                status="processing",  # 写入完成前不对外可见
+                row_count=len(df),
+                clickhouse_table_name=table_name,
+                upload_time=datetime.utcnow(),
+                content_hash=content_hash,
+                prefix_hash=content_hasher.prefix_hexdigest(),
             )
-
             db.session.add(experiment_data)
             db.session.commit()
 
-            # 重命名ClickHouse表（移除temp前缀）
-            new_table_name = temp_table_name.replace("temp_", "")
-            rename_query = f"RENAME TABLE {temp_table_name} TO {new_table_name}"
-            rename_result = self.clickhouse_manager.execute_query(rename_query)
+            insert_result = self.upload_to_clickhouse(
+                df, table_name, time_column, data_columns, experiment_type.get_storage_spec()
+            )
+            table_created = True
+            if not insert_result["success"]:
+                raise Exception(insert_result["message"])
 
-            if not rename_result["success"]:
-                # 如果重命名失败，删除MySQL记录
-                db.session.delete(experiment_data)
-                db.session.commit()
-                return {
-                    "success": False,
-                    "message": f'表重命名失败: {rename_result["message"]}',
-                }
+            summary_builder = RunSummaryBuilder(
+                time_column, data_columns, self.summary_resolutions
+            )
+            summary_builder.add(df)
+            experiment_data.time_min = float(df[time_column].min())
+            experiment_data.time_max = float(df[time_column].max())
+            if self.clickhouse_manager.insert_summary(
+                table_name, summary_builder.finalize()
+            ):
+                experiment_data.summary_resolutions = summary_builder.resolutions
+
+            experiment_data.status = "active"
+            db.session.commit()
+            store.delete(temp_data_id)
 
             return {
                 "success": True,
@@ -1206,15 +2014,59 @@ class DataProcessor:
             }
 
         except Exception as e:
-            logging.error(f"保存临时数据到MySQL失败: {e}")
+            db.session.rollback()
+            logging.error(f"保存临时数据失败: {e}")
+
+            if table_created:
+                self.clickhouse_manager.drop_table(experiment_data.clickhouse_table_name)
+            if experiment_data is not None and experiment_data.id is not None:
+                try:
+                    db.session.delete(experiment_data)
+                    db.session.commit()
+                except Exception as cleanup_error:
+                    db.session.rollback()
+                    logging.error(f"清理数据记录失败: {cleanup_error}")
+
             return {"success": False, "message": f"保存失败: {str(e)}"}
 
+    def _build_table_summary(self, experiment_data, experiment_type):
+        """为已入库的数据表计算分桶汇总并记录时间范围"""
+        try:
+            table_name = experiment_data.clickhouse_table_name
+            time_column = experiment_type.time_column
+            range_result = self.clickhouse_manager.execute_query(
+                f"SELECT min(`{time_column}`) AS time_min, "
+                f"max(`{time_column}`) AS time_max FROM `{table_name}`"
+            )
+            if range_result["success"] and range_result["data"]:
+                experiment_data.time_min = range_result["data"][0]["time_min"]
+                experiment_data.time_max = range_result["data"][0]["time_max"]
+
+            if self.clickhouse_manager.build_summary_from_table(
+                table_name,
+                time_column,
+                experiment_type.data_columns,
+                self.summary_resolutions,
+                experiment_type.get_storage_spec(),
+            ):
+                experiment_data.summary_resolutions = self.summary_resolutions
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"计算数据汇总失败: {e}")
+
     def delete_temp_table(self, temp_table_name):
         """
-        删除临时表
+        删除临时表（本地暂存区中的临时数据直接删除目录）
         """
+        if is_scratch_id(temp_table_name):
+            get_scratch_store().delete(temp_table_name)
+            return {"success": True, "message": "临时数据删除成功"}
+        if not is_temp_table_name(temp_table_name):
+            return {"success": False, "message": "无效的临时数据ID"}
+
         try:
-            drop_query = f"DROP TABLE IF EXISTS {temp_table_name}"
+            drop_query = f"DROP TABLE IF EXISTS `{temp_table_name}`"
             result = self.clickhouse_manager.execute_query(drop_query)
 
             if result["success"]:
@@ -1228,144 +2080,417 @@ class DataProcessor:
             logging.error(f"删除临时表失败: {e}")
             return {"success": False, "message": f"删除失败: {str(e)}"}
 
-    def calculate_envelope_simple(self, experiment_type_id, selected_columns):
+    def calculate_envelope_simple(
+        self, experiment_type_id, selected_columns, refresh_within=None
+    ):
         """
         计算简单的包络数据：每个时间点的最大值和最小值
+
+        结果与按列计算的包络共用缓存，历史数据集不变时不重复扫描历史数据表。
         """
         try:
-            # 获取试验类型信息
-            experiment_type = ExperimentType.query.get(experiment_type_id)
-            if not experiment_type:
-                return {"success": False, "message": "试验类型不存在"}
+            envelope_data = EnvelopeCacheService().get_or_compute(
+                experiment_type_id,
+                "simple",
+                {"selected_columns": sorted(selected_columns)},
+                lambda: self._compute_envelope_simple(
+                    experiment_type_id, selected_columns
+                ),
+                refresh_within=refresh_within,
+            )
+            if "error" in envelope_data:
+                return {"success": False, "message": envelope_data["error"]}
+            return {"success": True, "data": envelope_data}
 
-            time_column = experiment_type.time_column
+        except Exception as e:
+            logging.error(f"计算包络数据失败: {e}")
+            return {"success": False, "message": f"计算失败: {str(e)}"}
 
-            # 获取历史数据记录
-            historical_data = ExperimentData.query.filter_by(
-                experiment_type_id=experiment_type_id,
-                is_historical=True,
-                status="active",
-            ).all()
+    def _compute_envelope_simple(self, experiment_type_id, selected_columns):
+        """按精确时间点计算历史数据的最大最小值（不缓存）"""
+        # 获取试验类型信息
+        experiment_type = ExperimentType.query.get(experiment_type_id)
+        if not experiment_type:
+            return {"error": "试验类型不存在"}
+
+        time_column = experiment_type.time_column
+        storage_spec = experiment_type.get_storage_spec()
+
+        # 获取历史数据记录
+        historical_data = ExperimentData.query.filter_by(
+            experiment_type_id=experiment_type_id,
+            is_historical=True,
+            status="active",
+        ).all()
+
+        if not historical_data:
+            return {"error": "没有标记为历史数据的记录"}
+
+        # 检查表是否存在并获取所有历史数据
+        frames = self._fetch_historical_frames(
+            historical_data, experiment_type, selected_columns
+        )
 
-            if not historical_data:
-                return {"success": False, "message": "没有标记为历史数据的记录"}
+        if not frames:
+            return {"error": "没有找到有效的历史数据"}
 
-            # 检查表是否存在并获取所有历史数据
-            all_envelope_data = {}
-            all_time_points = set()
+        # 计算每个时间点的最大最小值
+        upper_df, lower_df = self._exact_time_envelope(
+            frames, time_column, selected_columns
+        )
+        sorted_time_points = upper_df.index.to_numpy()
+
+        envelope_data = {}
+        for column in selected_columns:
+            # 如果该时间点没有数据，使用0
+            envelope_data[column] = {
+                "upper": to_output_list(
+                    upper_df[column].fillna(0).to_numpy(), storage_spec, column
+                ),
+                "lower": to_output_list(
+                    lower_df[column].fillna(0).to_numpy(), storage_spec, column
+                ),
+            }
 
-            for data_record in historical_data:
-                if not data_record.clickhouse_table_name:
-                    logging.warning(f"数据记录 {data_record.id} 缺少ClickHouse表名")
-                    continue
+        return {
+            "time_points": sorted_time_points.tolist(),
+            "envelope_data": envelope_data,
+            "data_count": len(sorted_time_points),
+            "time_range": {
+                "min": float(sorted_time_points[0]),
+                "max": float(sorted_time_points[-1]),
+            },
+        }
+
+    def get_envelope_baseline(self, experiment_type_id, selected_columns):
+        """
+        获取对比用的历史包络基线（精确时间点，与对比接口共用缓存）
 
-                # 检查表是否存在
-                if not self.clickhouse_manager.table_exists(
-                    data_record.clickhouse_table_name
-                ):
-                    logging.warning(
-                        f"ClickHouse表 {data_record.clickhouse_table_name} 不存在"
-                    )
-                    continue
+        Returns:
+            Dict: data 为 (时间点数组, {列名: (上包络, 下包络)})
+        """
+        envelope_result = self.calculate_envelope_simple(
+            experiment_type_id, selected_columns
+        )
+        if not envelope_result["success"]:
+            return envelope_result
 
-                # 构建查询语句，不使用别名，直接使用原列名
-                safe_columns = [f"`{col}`" for col in selected_columns]
-                logging.info(f"selected_columns: {selected_columns}")
-                logging.info(f"safe_columns: {safe_columns}")
-                query = f"""
-                SELECT 
-                    `{time_column}`,
-                    {', '.join(safe_columns)}
-                FROM `{data_record.clickhouse_table_name}`
-                ORDER BY `{time_column}`
-                """
-                logging.info(f"构建的查询SQL: {query}")
-
-                # 执行查询
-                result = self.clickhouse_manager.execute_query(query)
-                if not result["success"]:
-                    logging.error(
-                        f"查询表 {data_record.clickhouse_table_name} 失败: {result['message']}"
-                    )
-                    continue
+        grid_times, envelopes = envelope_arrays(
+            envelope_result["data"], selected_columns
+        )
+        missing = [column for column in selected_columns if column not in envelopes]
+        if missing or len(grid_times) == 0:
+            return {"success": False, "message": f"历史包络中缺少列: {missing}"}
+        return {"success": True, "data": (grid_times, envelopes)}
 
-                # 调试：打印查询结果的键
-                if result["data"]:
-                    actual_columns = list(result["data"][0].keys())
-                    logging.info(
-                        f"表 {data_record.clickhouse_table_name} 查询结果字段: {actual_columns}"
-                    )
+    def compare_on_grid(
+        self,
+        experiment_type,
+        selected_columns,
+        temp_table_name,
+        points=None,
+        resolution=None,
+        align=False,
+        max_shift=None,
+    ):
+        """
+        将历史包络和对比数据重采样到同一个等间隔时间网格上
 
-                # 处理数据
-                for row in result["data"]:
-                    # 检查时间列是否存在
-                    if time_column not in row:
-                        logging.error(
-                            f"时间列 '{time_column}' 不在查询结果中: {list(row.keys())}"
-                        )
-                        continue
+        网格覆盖包络和对比数据的时间范围；每个桶内包络取上包络最大值、
+        下包络最小值（外沿不因降采样而收窄），对比数据取平均值。
 
-                    time_point = row[time_column]
-                    all_time_points.add(time_point)
+        Args:
+            points: 网格点数
+            resolution: 网格时间间隔（优先于points）；两者都未指定时
+                点数取包络与对比数据中较多的一方
+            网格点数不超过配置 max_data_points
+            align, max_shift: 见 check_run_exceedance，对比数据平移后再重采样
 
-                    # 直接使用精确匹配，不做模糊匹配
-                    for column in selected_columns:
-                        if column in row:
-                            if column not in all_envelope_data:
-                                all_envelope_data[column] = {}
+        Returns:
+            Dict: data 与原对比接口结构相同，另含 grid（网格信息）；
+                envelope_data 与 comparison_data 的 time_points 完全相同
+        """
+        baseline_result = self.get_envelope_baseline(
+            experiment_type.id, selected_columns
+        )
+        if not baseline_result["success"]:
+            return {
+                "success": False,
+                "message": f'获取历史包络失败: {baseline_result["message"]}',
+            }
+        envelope_times, envelopes = baseline_result["data"]
 
-                            if time_point not in all_envelope_data[column]:
-                                all_envelope_data[column][time_point] = []
+        run_result = self.fetch_comparison_run(
+            experiment_type, selected_columns, temp_table_name
+        )
+        if not run_result["success"]:
+            return {
+                "success": False,
+                "message": f'获取对比数据失败: {run_result["message"]}',
+            }
+        df = run_result["data"]
+        run_times = df[experiment_type.time_column].to_numpy(dtype=np.float64)
+
+        alignment = None
+        if align:
+            alignment = estimate_time_shift(
+                envelope_times,
+                envelopes,
+                run_times,
+                {column: df[column].to_numpy() for column in selected_columns},
+                max_shift,
+            )
+            run_times = run_times + alignment["time_shift"]
+
+        time_min = float(min(envelope_times[0], run_times[0]))
+        time_max = float(max(envelope_times[-1], run_times[-1]))
+        if resolution:
+            points = int(np.ceil((time_max - time_min) / resolution)) or 1
+        elif not points:
+            points = max(len(envelope_times), len(run_times))
+        if points > self.max_data_points:
+            # 超过点数上限时放宽间隔
+            points = self.max_data_points
+            resolution = None
+        points = max(1, int(points))
+
+        edges = grid_edges(time_min, time_max, points, resolution)
+        time_points = (edges[:-1] + edges[1:]) / 2
+        storage_spec = experiment_type.get_storage_spec()
+
+        envelope_data = {}
+        comparison_data = {}
+        for column in selected_columns:
+            upper, lower = envelopes[column]
+            # numpy数组直接交给响应序列化，网格外的NaN输出为null
+            envelope_data[column] = {
+                "upper": resample_to_grid(envelope_times, upper, edges, "max"),
+                "lower": resample_to_grid(envelope_times, lower, edges, "min"),
+            }
+            comparison_data[column] = round_to_storage(
+                resample_to_grid(run_times, df[column].to_numpy(), edges, "mean"),
+                storage_spec,
+                column,
+            )
 
-                            all_envelope_data[column][time_point].append(row[column])
-                        else:
-                            actual_columns = list(row.keys())
-                            logging.warning(
-                                f"请求的列 '{column}' 不存在，可用列: {actual_columns}"
-                            )
+        time_range = {"min": time_min, "max": time_max}
+        return {
+            "success": True,
+            "data": {
+                "grid": {
+                    "points": points,
+                    "resolution": float(edges[1] - edges[0]),
+                    "time_range": time_range,
+                },
+                "envelope_data": {
+                    "time_points": time_points,
+                    "envelope_data": envelope_data,
+                    "data_count": points,
+                    "original_points": len(envelope_times),
+                    "time_range": time_range,
+                },
+                "comparison_data": {
+                    "time_points": time_points,
+                    "data": comparison_data,
+                    "sampling_method": "grid",
+                    "sampling_points": points,
+                    "original_points": len(df),
+                    "time_range": time_range,
+                },
+                "alignment": alignment,
+            },
+        }
 
-            if not all_time_points:
-                return {"success": False, "message": "没有找到有效的历史数据"}
+    def fetch_comparison_run(
+        self, experiment_type, selected_columns, temp_table_name=None, data_id=None
+    ):
+        """
+        获取对比试验的时间列与选中列：临时表（temp_table_name）或已入库数据（data_id）
 
-            # 计算每个时间点的最大最小值
-            sorted_time_points = sorted(all_time_points)
-            envelope_data = {}
+        Returns:
+            Dict: data 为DataFrame
+        """
+        columns = [experiment_type.time_column] + list(selected_columns)
+        if data_id is not None:
+            data_record = ExperimentData.query.get(data_id)
+            if (
+                not data_record
+                or data_record.status != "active"
+                or data_record.experiment_type_id != experiment_type.id
+            ):
+                return {"success": False, "message": f"数据 {data_id} 不存在"}
+            df = self.fetch_run_frame(data_record, experiment_type, selected_columns)
+        else:
+            df = self._query_temp_frame(
+                temp_table_name,
+                experiment_type.time_column,
+                columns,
+                experiment_type.get_storage_spec(),
+            )
 
-            for column in selected_columns:
-                upper_values = []
-                lower_values = []
+        if df.empty:
+            return {"success": False, "message": "对比数据为空或列不存在"}
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            return {"success": False, "message": f"列 {missing} 不存在"}
+        return {"success": True, "data": df}
 
-                for time_point in sorted_time_points:
-                    if (
-                        column in all_envelope_data
-                        and time_point in all_envelope_data[column]
-                    ):
-                        values = all_envelope_data[column][time_point]
-                        upper_values.append(max(values))
-                        lower_values.append(min(values))
-                    else:
-                        # 如果该时间点没有数据，使用0
-                        upper_values.append(0)
-                        lower_values.append(0)
+    def check_run_exceedance(
+        self,
+        experiment_type,
+        selected_columns,
+        temp_table_name=None,
+        data_id=None,
+        tolerance=0.0,
+        trace_points=500,
+        max_intervals=20,
+        baseline=None,
+        align=False,
+        max_shift=None,
+    ):
+        """
+        检查对比试验是否超出历史包络，返回超限区间和降采样曲线
 
-                envelope_data[column] = {"upper": upper_values, "lower": lower_values}
+        Args:
+            tolerance: 允许超出包络的量
+            trace_points: 降采样曲线最大点数，0表示不返回
+            max_intervals: 每列最多返回的超限区间数
+            baseline: get_envelope_baseline 的结果数据，批量检查时由调用方传入
+            align: 检查前先估计对比试验相对包络中心线的时间偏移并平移
+            max_shift: 允许的最大偏移量，None表示包络时间跨度的10%
+        """
+        try:
+            if baseline is None:
+                baseline_result = self.get_envelope_baseline(
+                    experiment_type.id, selected_columns
+                )
+                if not baseline_result["success"]:
+                    return baseline_result
+                baseline = baseline_result["data"]
 
-            return {
-                "success": True,
-                "data": {
-                    "time_points": sorted_time_points,
-                    "envelope_data": envelope_data,
-                    "data_count": len(sorted_time_points),
-                    "time_range": {
-                        "min": min(sorted_time_points),
-                        "max": max(sorted_time_points),
-                    },
-                },
-            }
+            run_result = self.fetch_comparison_run(
+                experiment_type, selected_columns, temp_table_name, data_id
+            )
+            if not run_result["success"]:
+                return run_result
+            df = run_result["data"]
+
+            grid_times, envelopes = baseline
+            run_times = df[experiment_type.time_column].to_numpy(dtype=np.float64)
+            run_columns = {column: df[column].to_numpy() for column in selected_columns}
+
+            alignment = None
+            if align:
+                alignment = estimate_time_shift(
+                    grid_times, envelopes, run_times, run_columns, max_shift
+                )
+                run_times = run_times + alignment["time_shift"]
+
+            result = check_exceedance(
+                grid_times,
+                envelopes,
+                run_times,
+                run_columns,
+                tolerance=tolerance,
+                trace_points=trace_points,
+                max_intervals=max_intervals,
+            )
+            result["original_points"] = len(df)
+            if alignment is not None:
+                result["alignment"] = alignment
+            return {"success": True, "data": result}
 
         except Exception as e:
-            logging.error(f"计算包络数据失败: {e}")
-            return {"success": False, "message": f"计算失败: {str(e)}"}
+            logging.error(f"包络超限检查失败: {e}")
+            return {"success": False, "message": f"超限检查失败: {str(e)}"}
+
+    def batch_check_exceedance(
+        self,
+        experiment_type,
+        selected_columns,
+        runs,
+        tolerance=0.0,
+        trace_points=0,
+        max_intervals=5,
+        align=False,
+        max_shift=None,
+    ):
+        """
+        批量检查多次对比试验：历史包络基线只获取一次，各试验并行获取数据并比较
+
+        Args:
+            runs: [{"temp_data_id": 临时表名} 或 {"data_id": 数据ID}]
+            align, max_shift: 见 check_run_exceedance，每次试验分别估计偏移
+
+        Returns:
+            Dict: data 包含总体结论、各试验结论和 试验×列 的最大超限量矩阵
+        """
+        baseline_result = self.get_envelope_baseline(
+            experiment_type.id, selected_columns
+        )
+        if not baseline_result["success"]:
+            return baseline_result
+        baseline = baseline_result["data"]
+
+        app = current_app._get_current_object()
+        experiment_type_id = experiment_type.id
+
+        def check(run):
+            # 工作线程使用独立的应用上下文和数据库会话
+            with app.app_context():
+                run_type = ExperimentType.query.get(experiment_type_id)
+                return DataProcessor().check_run_exceedance(
+                    run_type,
+                    selected_columns,
+                    temp_table_name=run.get("temp_data_id"),
+                    data_id=run.get("data_id"),
+                    tolerance=tolerance,
+                    trace_points=trace_points,
+                    max_intervals=max_intervals,
+                    baseline=baseline,
+                    align=align,
+                    max_shift=max_shift,
+                )
+
+        workers = max(1, min(self.batch_compare_workers, len(runs)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(check, runs))
+
+        run_results = []
+        matrix = []
+        for run, result in zip(runs, results):
+            run_id = run.get("temp_data_id") or run.get("data_id")
+            if not result["success"]:
+                run_results.append(
+                    {"run": run_id, "success": False, "message": result["message"]}
+                )
+                matrix.append([None] * len(selected_columns))
+                continue
+
+            check_result = result["data"]
+            run_results.append({"run": run_id, "success": True, **check_result})
+            matrix.append(
+                [
+                    check_result["columns"][column]["max_overshoot"]
+                    for column in selected_columns
+                ]
+            )
+
+        checked = [item for item in run_results if item["success"]]
+        passed_count = sum(1 for item in checked if item["passed"])
+        return {
+            "success": True,
+            "data": {
+                "passed": len(checked) == len(runs) and passed_count == len(runs),
+                "total": len(runs),
+                "passed_count": passed_count,
+                "failed_count": len(checked) - passed_count,
+                "error_count": len(runs) - len(checked),
+                "columns": list(selected_columns),
+                "runs": run_results,
+                "max_overshoot_matrix": matrix,
+            },
+        }
 
     def read_special_format_csv(
         self, file, separator=" ", skip_rows=0, experiment_type=None
@@ -0,0 +1,75 @@
+import hashlib
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 计算原始文件哈希时每次读取的字节数
+_READ_BLOCK_SIZE = 1024 * 1024
+# 前缀哈希覆盖的行数；已保存的前缀哈希依赖该值，修改后旧记录不再能提前判断重复
+PREFIX_ROWS = 10000
+
+
+def file_source_hash(file) -> Optional[str]:
+    """
+    计算上传文件原始字节的SHA-256，计算后恢复读取位置
+
+    文件流不可回退时返回None（无法在解析前判断是否重复）。
+    """
+    stream = getattr(file, "stream", file)
+    try:
+        position = stream.tell()
+        stream.seek(0)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+    digest = hashlib.sha256()
+    while True:
+        block = stream.read(_READ_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block.encode("utf-8") if isinstance(block, str) else block)
+    stream.seek(position)
+    return digest.hexdigest()
+
+
+class DatasetHasher:
+    """
+    规范化数据内容的流式哈希
+
+    对清洗并按存储类型量化后的数据逐块计算：列名 + 按行展开的float64数值。
+    与文件格式、列顺序、数字书写方式无关，相同的数据得到相同的哈希。
+
+    同时计算前 prefix_rows 行的前缀哈希（与分块方式无关），读完前缀即可
+    判断是否可能与已有数据重复；不足 prefix_rows 行时等于完整哈希。
+    """
+
+    def __init__(self, time_column: str, data_columns: List[str], prefix_rows: int = PREFIX_ROWS):
+        self.columns = [time_column] + list(data_columns)
+        self.prefix_rows = prefix_rows
+        self._digest = hashlib.sha256()
+        self._digest.update("\x1f".join(self.columns).encode("utf-8"))
+        self._prefix_digest = self._digest.copy()
+        self.row_count = 0
+
+    def update(self, df: pd.DataFrame):
+        """累计一个数据块"""
+        if df.empty:
+            return
+        # 统一 -0.0 与 0.0；不原地相加，to_numpy 可能返回DataFrame的只读视图
+        values = np.ascontiguousarray(df[self.columns].to_numpy(dtype=np.float64)) + 0.0
+        if self.row_count < self.prefix_rows:
+            self._prefix_digest.update(values[: self.prefix_rows - self.row_count].tobytes())
+        self._digest.update(values.tobytes())
+        self.row_count += len(values)
+
+    @property
+    def prefix_complete(self) -> bool:
+        """前缀哈希是否已覆盖 prefix_rows 行"""
+        return self.row_count >= self.prefix_rows
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+    def prefix_hexdigest(self) -> str:
+        return self._prefix_digest.hexdigest()
@@ -0,0 +1,338 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sqlalchemy import func, update
+
+from database import db
+from database_config import db_config
+from models.models import EnvelopeCache, ExperimentType
+from services.envelope_memory_cache import get_envelope_memory_cache
+from services.envelope_store import EnvelopeStore, decode_envelope, encode_envelope
+from services.shared_cache import get_shared_disk_cache
+
+
+def split_envelope_columns(envelope: Dict[str, Any], columns) -> Dict[str, Dict[str, Any]]:
+    """将多列包络结果拆分为单列结果（时间点等公共字段每列各保存一份）"""
+    shared = {key: value for key, value in envelope.items() if key != "envelope_data"}
+    envelopes = envelope.get("envelope_data", {})
+    return {
+        column: {
+            **shared,
+            "envelope_data": {column: envelopes[column]} if column in envelopes else {},
+        }
+        for column in columns
+    }
+
+
+def merge_envelope_columns(parts: Dict[str, Dict[str, Any]], columns) -> Optional[Dict[str, Any]]:
+    """
+    合并单列包络结果
+
+    各列时间点不一致时无法合并，返回None
+    """
+    first = parts[columns[0]]
+    time_points = first["time_points"]
+    if any(parts[column]["time_points"] != time_points for column in columns[1:]):
+        return None
+
+    merged = {key: value for key, value in first.items() if key != "envelope_data"}
+    merged["envelope_data"] = {}
+    for column in columns:
+        merged["envelope_data"].update(parts[column]["envelope_data"])
+    if "original_points" in merged:
+        merged["original_points"] = max(parts[column]["original_points"] for column in columns)
+    return merged
+
+
+class EnvelopeCacheService:
+    """
+    统一的包络缓存：进程内LRU -> 缓存表 + 缓存文件 -> 计算
+
+    进程内LRU未命中时先查主机共享缓存（同一主机的工作进程共用，无需查询MySQL）。
+    缓存键包含试验类型的历史数据集版本（ExperimentType.historical_version），
+    历史数据集变化时递增版本，旧条目不再命中；在此之前缓存一直有效，
+    envelope_cache_timeout 只作为兜底的过期时间。
+    """
+
+    # 进程内记录的版本号：{试验类型ID: (版本, 读取时间, 试验类型创建时间)}
+    _versions: Dict[int, tuple] = {}
+    _versions_lock = threading.Lock()
+
+    def __init__(self):
+        app_config = db_config.get_app_config()
+        self.max_age = app_config["envelope_cache_timeout"]
+        self.version_check_interval = app_config["historical_version_check_interval"]
+        self.memory_cache = get_envelope_memory_cache()
+        self.shared_cache = get_shared_disk_cache() if app_config["shared_cache_enabled"] else None
+        self.store = EnvelopeStore()
+
+    def historical_version(self, experiment_type_id: int, refresh: bool = False) -> Optional[int]:
+        """
+        获取试验类型的历史数据集版本
+
+        进程内最多缓存 historical_version_check_interval 秒，使其他进程的修改
+        也能及时生效；试验类型不存在时返回None。
+        """
+        now = time.monotonic()
+        with self._versions_lock:
+            cached = self._versions.get(experiment_type_id)
+        if cached and not refresh and now - cached[1] < self.version_check_interval:
+            return cached[0]
+
+        row = (
+            db.session.query(ExperimentType.historical_version, ExperimentType.created_at)
+            .filter(ExperimentType.id == experiment_type_id)
+            .first()
+        )
+        if row is None:
+            return None
+        version, created_at = row
+
+        with self._versions_lock:
+            previous = self._versions.get(experiment_type_id)
+            self._versions[experiment_type_id] = (version, now, created_at)
+        if previous and previous[0] != version:
+            self.memory_cache.invalidate(experiment_type_id)
+        return version
+
+    def bump_version(self, experiment_type_id: int) -> Optional[int]:
+        """历史数据集发生变化：递增版本，已缓存的包络全部失效"""
+        db.session.execute(
+            update(ExperimentType)
+            .where(ExperimentType.id == experiment_type_id)
+            .values(historical_version=func.coalesce(ExperimentType.historical_version, 0) + 1)
+        )
+        db.session.commit()
+        self.memory_cache.invalidate(experiment_type_id)
+        return self.historical_version(experiment_type_id, refresh=True)
+
+    @staticmethod
+    def cache_key(kind: str, params: Dict[str, Any]) -> str:
+        """缓存键：计算方式 + 参数的MD5"""
+        key_data = {"kind": kind, **params}
+        return hashlib.md5(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def get_or_compute(
+        self,
+        experiment_type_id: int,
+        kind: str,
+        params: Dict[str, Any],
+        compute: Callable[[], Dict[str, Any]],
+        binary: bool = False,
+        refresh_within: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        获取缓存的包络结果，未命中时调用compute计算并写入缓存
+
+        Args:
+            kind: 计算方式（如 columns、simple），与params共同组成缓存键
+            compute: 计算函数，返回包络结果，包含 "error" 时不缓存
+            binary: 为True时返回 {"cache_file": 缓存文件路径}
+            refresh_within: 缓存在该秒数内过期时重新计算（供缓存预热提前刷新）
+
+        Returns:
+            Dict: 包络结果
+        """
+        version = self.historical_version(experiment_type_id)
+        if version is None:
+            return {"error": "试验类型不存在"}
+
+        key_hash = self.cache_key(kind, params)
+        memory_key = (experiment_type_id, version, key_hash)
+        if refresh_within is None:
+            if not binary:
+                envelope_data = self.memory_cache.get(memory_key)
+                if envelope_data is not None:
+                    return envelope_data
+            envelope_data = self._shared_get(memory_key, binary)
+            if envelope_data is not None:
+                return envelope_data
+
+        cache = self._find_rows(experiment_type_id, version, [key_hash]).get(key_hash)
+        if self._is_fresh(cache, refresh_within) and self.store.exists(cache.cache_file):
+            logging.info(f"使用缓存的包络数据: {cache.id}")
+            if binary:
+                return {"cache_file": self.store.path(cache.cache_file)}
+            envelope_data = self.store.load(cache.cache_file)
+            if envelope_data is not None:
+                self.memory_cache.put(memory_key, envelope_data)
+                self._shared_put(memory_key, envelope_data)
+                return envelope_data
+
+        envelope_data = compute()
+        # 计算失败的结果不缓存
+        if "error" in envelope_data:
+            return envelope_data
+
+        cache_file = self._save_row(experiment_type_id, version, key_hash, cache, envelope_data)
+        db.session.commit()
+        self._shared_put(memory_key, envelope_data)
+
+        if binary:
+            return {"cache_file": self.store.path(cache_file)}
+        self.memory_cache.put(memory_key, envelope_data)
+        return envelope_data
+
+    def get_many(
+        self,
+        experiment_type_id: int,
+        version: int,
+        kind: str,
+        params_by_part: Dict[Hashable, Dict[str, Any]],
+        refresh_within: Optional[int] = None,
+    ) -> Dict[Hashable, Dict[str, Any]]:
+        """
+        批量获取按部分（如单列）缓存的包络结果，缓存表只查询一次
+
+        Args:
+            version: 历史数据集版本（由调用方在读取历史数据前获取）
+            params_by_part: {部分: 缓存参数}
+
+        Returns:
+            Dict: {部分: 包络结果}，只包含命中的部分
+        """
+        found = {}
+        keys = {part: self.cache_key(kind, params) for part, params in params_by_part.items()}
+        for part, key_hash in keys.items():
+            if refresh_within is None:
+                memory_key = (experiment_type_id, version, key_hash)
+                envelope_data = self.memory_cache.get(memory_key)
+                if envelope_data is None:
+                    envelope_data = self._shared_get(memory_key)
+                if envelope_data is not None:
+                    found[part] = envelope_data
+
+        missing = {part: key_hash for part, key_hash in keys.items() if part not in found}
+        if not missing:
+            return found
+
+        rows = self._find_rows(experiment_type_id, version, list(missing.values()))
+        for part, key_hash in missing.items():
+            cache = rows.get(key_hash)
+            if not self._is_fresh(cache, refresh_within) or not self.store.exists(cache.cache_file):
+                continue
+            envelope_data = self.store.load(cache.cache_file)
+            if envelope_data is not None:
+                self.memory_cache.put((experiment_type_id, version, key_hash), envelope_data)
+                self._shared_put((experiment_type_id, version, key_hash), envelope_data)
+                found[part] = envelope_data
+        return found
+
+    def put_many(
+        self,
+        experiment_type_id: int,
+        version: int,
+        kind: str,
+        entries: Dict[Hashable, tuple],
+    ):
+        """
+        批量写入按部分缓存的包络结果
+
+        Args:
+            entries: {部分: (缓存参数, 包络结果)}
+        """
+        keys = {part: self.cache_key(kind, params) for part, (params, _) in entries.items()}
+        rows = self._find_rows(experiment_type_id, version, list(keys.values()))
+        for part, (_, envelope_data) in entries.items():
+            key_hash = keys[part]
+            self._save_row(experiment_type_id, version, key_hash, rows.get(key_hash), envelope_data)
+        db.session.commit()
+        for part, (_, envelope_data) in entries.items():
+            memory_key = (experiment_type_id, version, keys[part])
+            self.memory_cache.put(memory_key, envelope_data)
+            self._shared_put(memory_key, envelope_data)
+
+    def _shared_key(self, memory_key: tuple) -> tuple:
+        """
+        共享缓存键：加入试验类型的创建时间
+
+        共享缓存不经过MySQL索引，数据库重建后相同的试验类型ID和版本号
+        不会命中旧文件。
+        """
+        with self._versions_lock:
+            cached = self._versions.get(memory_key[0])
+        created_at = cached[2] if cached else None
+        return (str(created_at),) + memory_key
+
+    def _shared_get(self, memory_key: tuple, binary: bool = False) -> Optional[Dict[str, Any]]:
+        """从主机共享缓存读取（未压缩的二进制容器），binary时只返回文件路径"""
+        if self.shared_cache is None:
+            return None
+        shared_key = self._shared_key(memory_key)
+        if binary:
+            path = self.shared_cache.get_path("envelopes", shared_key)
+            return {"cache_file": path} if path else None
+
+        mapped = self.shared_cache.get_bytes("envelopes", shared_key)
+        if mapped is None:
+            return None
+        try:
+            with mapped:
+                envelope_data = decode_envelope(mapped)
+        except ValueError as e:
+            logging.warning(f"共享缓存中的包络数据无效: {e}")
+            return None
+        self.memory_cache.put(memory_key, envelope_data)
+        return envelope_data
+
+    def _shared_put(self, memory_key: tuple, envelope_data: Dict[str, Any]):
+        if self.shared_cache is not None:
+            self.shared_cache.put_bytes(
+                "envelopes", self._shared_key(memory_key), encode_envelope(envelope_data, "none")
+            )
+
+    def _find_rows(self, experiment_type_id: int, version: int, key_hashes) -> Dict[str, EnvelopeCache]:
+        """按缓存键查询缓存行，同一键有多行时取最新的一行"""
+        rows = (
+            EnvelopeCache.query.filter(
+                EnvelopeCache.experiment_type_id == experiment_type_id,
+                EnvelopeCache.historical_version == version,
+                EnvelopeCache.selected_columns_hash.in_(key_hashes),
+            )
+            .order_by(EnvelopeCache.id)
+            .all()
+        )
+        return {row.selected_columns_hash: row for row in rows}
+
+    @staticmethod
+    def _is_fresh(cache: Optional[EnvelopeCache], refresh_within: Optional[int]) -> bool:
+        if cache is None or cache.is_expired():
+            return False
+        if refresh_within is not None:
+            return cache.expires_at > datetime.utcnow() + timedelta(seconds=refresh_within)
+        return True
+
+    def _save_row(self, experiment_type_id: int, version: int, key_hash: str,
+                  cache: Optional[EnvelopeCache], envelope_data: Dict[str, Any]) -> str:
+        """
+        包络数据写入二进制缓存文件，MySQL只保存缓存键和文件名（由调用方提交）
+
+        替换已有缓存行时不删除旧文件：其他请求可能已经读到旧文件名正在发送，
+        提交失败时缓存行也仍指向旧文件；旧文件由定期维护按宽限期清理。
+        """
+        cache_file, cache_size = self.store.save(envelope_data)
+        now = datetime.utcnow()
+        if cache:
+            cache.envelope_data = None
+            cache.cache_file = cache_file
+            cache.cache_size = cache_size
+            cache.created_at = now
+            cache.expires_at = now + timedelta(seconds=self.max_age)
+        else:
+            db.session.add(
+                EnvelopeCache(
+                    experiment_type_id=experiment_type_id,
+                    selected_columns_hash=key_hash,
+                    historical_version=version,
+                    cache_file=cache_file,
+                    cache_size=cache_size,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=self.max_age),
+                )
+            )
+        return cache_file
@@ -0,0 +1,105 @@
+import logging
+import threading
+from collections import OrderedDict
+from numbers import Number
+from typing import Any, Dict, Hashable, Optional
+
+from database_config import db_config
+
+# 估算内存占用：Python float 对象24字节 + 列表中的指针8字节
+_BYTES_PER_NUMBER = 32
+_BYTES_PER_ITEM = 64
+
+
+def estimate_size(value) -> int:
+    """粗略估算包络结果占用的内存字节数"""
+    if isinstance(value, dict):
+        return _BYTES_PER_ITEM + sum(
+            _BYTES_PER_ITEM + estimate_size(item) for item in value.values()
+        )
+    if isinstance(value, (list, tuple)):
+        if value and all(isinstance(item, Number) for item in value):
+            return _BYTES_PER_ITEM + len(value) * _BYTES_PER_NUMBER
+        return _BYTES_PER_ITEM + sum(estimate_size(item) for item in value)
+    return _BYTES_PER_ITEM
+
+
+class EnvelopeMemoryCache:
+    """
+    进程内的包络结果LRU缓存（按估算字节数限制容量）
+
+    缓存键为元组，第一项为试验类型ID，并包含历史数据集版本；
+    历史数据集变化后旧版本的条目不再命中，并由invalidate立即移除。
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = db_config.get_app_config()["envelope_memory_cache_size"]
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Dict[str, Any]):
+        """写入缓存；单个结果超过容量时不缓存"""
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def invalidate(self, experiment_type_id: int):
+        """历史数据集发生变化：移除该试验类型的所有条目"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == experiment_type_id]:
+                _, size = self._entries.pop(key)
+                self.current_bytes -= size
+        logging.info(f"试验类型 {experiment_type_id} 的包络内存缓存已失效")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# 全局包络内存缓存实例
+envelope_memory_cache = None
+
+
+def get_envelope_memory_cache():
+    """获取包络内存缓存单例"""
+    global envelope_memory_cache
+    if envelope_memory_cache is None:
+        envelope_memory_cache = EnvelopeMemoryCache()
+    return envelope_memory_cache
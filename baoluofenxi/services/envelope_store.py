@@ -0,0 +1,201 @@
+import json
+import logging
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from numbers import Number
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from database_config import db_config
+from services.compression import precompressed_paths
+
+# 后端根目录，相对路径的缓存目录以此为基准
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 文件格式：
+#   magic(4) | version(uint8) | 保留(3) | header长度(uint32, 小端) | header(JSON) | 数组数据
+# header 中 meta 为非数组字段，arrays 描述每个数组在数据区中的位置；
+# 数据区起点及每个数组都按8字节对齐，未压缩的数组可以直接映射为numpy视图。
+MAGIC = b"ENVC"
+FORMAT_VERSION = 1
+MEDIA_TYPE = "application/x-envelope"
+FILE_EXTENSION = ".envc"
+COMPRESSIONS = ("none", "zlib")
+
+_PREFIX = struct.Struct("<4sB3xI")
+_ALIGNMENT = 8
+
+
+def _align(size: int) -> int:
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _is_numeric_list(value) -> bool:
+    """判断是否为可存储为数组的数值列表（布尔值除外）"""
+    return isinstance(value, (list, tuple, np.ndarray)) and all(
+        isinstance(item, Number) and not isinstance(item, bool) for item in value
+    )
+
+
+def _split_arrays(value, path: List[str], arrays: List[Tuple[List[str], np.ndarray]]):
+    """将数值列表从嵌套字典中拆出，返回去掉数组后的元数据"""
+    if isinstance(value, dict):
+        meta = {}
+        for key, item in value.items():
+            if _is_numeric_list(item):
+                arrays.append((path + [key], np.asarray(item, dtype=np.float64)))
+            else:
+                meta[key] = _split_arrays(item, path + [key], arrays)
+        return meta
+    return value
+
+
+def _set_path(target: Dict[str, Any], path: List[str], value):
+    for key in path[:-1]:
+        target = target.setdefault(key, {})
+    target[path[-1]] = value
+
+
+def encode_envelope(envelope: Dict[str, Any], compression: str = "zlib") -> bytes:
+    """
+    将包络结果编码为二进制容器
+
+    Args:
+        envelope: 包络结果字典，其中的数值列表按float64数组存储
+        compression: none 或 zlib
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+
+    arrays = []
+    meta = _split_arrays(envelope, [], arrays)
+
+    blocks = []
+    descriptors = []
+    offset = 0
+    for path, array in arrays:
+        raw = np.ascontiguousarray(array, dtype="<f8").tobytes()
+        data = zlib.compress(raw, 1) if compression == "zlib" else raw
+        descriptors.append(
+            {
+                "path": path,
+                "dtype": "<f8",
+                "count": int(array.size),
+                "offset": offset,
+                "nbytes": len(data),
+                "compression": compression,
+            }
+        )
+        padding = _align(len(data)) - len(data)
+        blocks.append(data + b"\0" * padding)
+        offset += len(data) + padding
+
+    header = json.dumps(
+        {"meta": meta, "arrays": descriptors}, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    # header末尾以空格补齐，使数据区按8字节对齐
+    header += b" " * (_align(_PREFIX.size + len(header)) - _PREFIX.size - len(header))
+
+    return b"".join([_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)), header] + blocks)
+
+
+def decode_envelope(buffer, as_list: bool = True) -> Dict[str, Any]:
+    """
+    解码二进制容器
+
+    Args:
+        buffer: bytes 或 mmap 等支持缓冲区协议的对象
+        as_list: True 返回Python列表（用于JSON响应），False 返回numpy数组
+    """
+    view = memoryview(buffer)
+    magic, version, header_length = _PREFIX.unpack_from(view, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError("包络缓存文件格式无效")
+
+    header = json.loads(bytes(view[_PREFIX.size:_PREFIX.size + header_length]))
+    data_start = _PREFIX.size + header_length
+
+    envelope = header["meta"]
+    for descriptor in header["arrays"]:
+        start = data_start + descriptor["offset"]
+        block = view[start:start + descriptor["nbytes"]]
+        if descriptor["compression"] == "zlib":
+            array = np.frombuffer(zlib.decompress(block), dtype=descriptor["dtype"])
+        else:
+            array = np.frombuffer(block, dtype=descriptor["dtype"], count=descriptor["count"])
+        _set_path(envelope, descriptor["path"], array.tolist() if as_list else array)
+    return envelope
+
+
+def resolve_envelope_cache_folder() -> str:
+    """获取包络缓存目录的绝对路径"""
+    cache_folder = db_config.get_app_config()["envelope_cache_folder"]
+    if not os.path.isabs(cache_folder):
+        cache_folder = os.path.join(BASE_DIR, cache_folder)
+    return cache_folder
+
+
+class EnvelopeStore:
+    """
+    包络缓存文件存储
+
+    计算结果以二进制容器保存在本地磁盘，MySQL中只保存缓存键和文件名；
+    命中时通过mmap读取，或直接把文件作为二进制响应返回。
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, compression: Optional[str] = None):
+        app_config = db_config.get_app_config()
+        self.root_dir = root_dir or resolve_envelope_cache_folder()
+        self.compression = compression or app_config["envelope_cache_compression"]
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        """缓存文件的绝对路径（文件名只允许由save生成）"""
+        return os.path.join(self.root_dir, os.path.basename(name))
+
+    def exists(self, name: Optional[str]) -> bool:
+        return bool(name) and os.path.exists(self.path(name))
+
+    def save(self, envelope: Dict[str, Any]) -> Tuple[str, int]:
+        """
+        保存包络结果
+
+        Returns:
+            (文件名, 文件大小)
+        """
+        data = encode_envelope(envelope, self.compression)
+        name = f"{uuid.uuid4().hex}{FILE_EXTENSION}"
+        target_path = self.path(name)
+        tmp_path = f"{target_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, target_path)
+        return name, len(data)
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """通过mmap读取包络结果，文件不存在或损坏时返回None"""
+        try:
+            with open(self.path(name), "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return decode_envelope(mapped)
+        except (OSError, ValueError) as e:
+            logging.warning(f"读取包络缓存文件 {name} 失败: {e}")
+            return None
+
+    def delete(self, name: Optional[str]):
+        """删除缓存文件（不存在时忽略）"""
+        if not name:
+            return
+        path = self.path(name)
+        for file_path in [path] + precompressed_paths(path):
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.warning(f"删除包络缓存文件 {file_path} 失败: {e}")
+
@@ -0,0 +1,420 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def align_to_grid(
+    grid_times: np.ndarray, run_times: np.ndarray, run_values: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将对比试验数据线性插值到包络的时间网格上
+
+    Returns:
+        (插值后的值, 网格点是否落在对比试验的时间范围内)
+    """
+    valid = ~np.isnan(run_values)
+    run_times = run_times[valid]
+    run_values = run_values[valid]
+    if len(run_times) == 0:
+        return np.full(len(grid_times), np.nan), np.zeros(len(grid_times), dtype=bool)
+
+    in_range = (grid_times >= run_times[0]) & (grid_times <= run_times[-1])
+    aligned = np.interp(grid_times, run_times, run_values)
+    return aligned, in_range
+
+
+def grid_edges(
+    time_min: float, time_max: float, points: int, resolution: Optional[float] = None
+) -> np.ndarray:
+    """
+    等间隔时间网格的桶边界（points个桶，points+1个边界）
+
+    指定 resolution 时从 time_min 开始按该间隔划分（最后一个边界可能超过
+    time_max），否则将 [time_min, time_max] 等分
+    """
+    points = max(1, int(points))
+    if resolution:
+        return time_min + np.arange(points + 1) * float(resolution)
+    return np.linspace(time_min, time_max, points + 1)
+
+
+def resample_to_grid(
+    times: np.ndarray, values: np.ndarray, edges: np.ndarray, how: str
+) -> np.ndarray:
+    """
+    将按时间升序的序列重采样到网格的各个桶上
+
+    有数据的桶按 how（max、min 或 mean）聚合；网格比数据密、桶内没有数据时
+    在数据时间范围内线性插值到桶中心；数据时间范围外为NaN。
+    结果为float64，输入为float32时保持float32以减少内存（整数输入同样返回
+    float64，否则NaN和桶平均值会被截断）。
+    """
+    values = np.asarray(values)
+    dtype = np.float32 if values.dtype == np.float32 else np.float64
+    times = np.asarray(times, dtype=np.float64)
+    n = len(edges) - 1
+    result = np.full(n, np.nan)
+
+    valid = ~np.isnan(values)
+    times = times[valid]
+    values = values[valid]
+    if len(times) == 0:
+        return result.astype(dtype, copy=False)
+
+    # 各桶在数据中的起止下标，最后一个桶包含右边界
+    bounds = np.searchsorted(times, edges)
+    bounds[-1] = np.searchsorted(times, edges[-1], side="right")
+    starts, ends = bounds[:-1], bounds[1:]
+    filled = ends > starts
+    if filled.any():
+        segment_starts = starts[filled]
+        segment_values = values[: bounds[-1]]
+        if how == "max":
+            result[filled] = np.maximum.reduceat(segment_values, segment_starts)
+        elif how == "min":
+            result[filled] = np.minimum.reduceat(segment_values, segment_starts)
+        else:
+            sums = np.add.reduceat(segment_values.astype(np.float64), segment_starts)
+            result[filled] = sums / (ends[filled] - segment_starts)
+
+    centers = (edges[:-1] + edges[1:]) / 2
+    gaps = ~filled & (centers >= times[0]) & (centers <= times[-1])
+    if gaps.any():
+        result[gaps] = np.interp(centers[gaps], times, values.astype(np.float64))
+    return result.astype(dtype, copy=False)
+
+
+def mask_intervals(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """返回布尔序列中连续True区间的起止下标（结束下标包含在区间内）"""
+    padded = np.concatenate(([False], mask, [False]))
+    changes = np.flatnonzero(padded[1:] != padded[:-1])
+    return changes[0::2], changes[1::2] - 1
+
+
+def violation_intervals(
+    times: np.ndarray, overshoot: np.ndarray, mask: np.ndarray, direction: str
+) -> List[Dict[str, Any]]:
+    """
+    将超限点合并为区间，统计每个区间的峰值超限量、峰值时间和持续时间
+
+    Args:
+        overshoot: 超出包络的量（正数）
+        mask: 是否超限
+        direction: upper（超上包络）或 lower（低于下包络）
+    """
+    starts, ends = mask_intervals(mask)
+    if len(starts) == 0:
+        return []
+
+    intervals = []
+    for start, end in zip(starts, ends):
+        # 区间内超限量最大的点
+        peak_index = start + int(np.argmax(overshoot[start:end + 1]))
+        intervals.append(
+            {
+                "direction": direction,
+                "start_time": float(times[start]),
+                "end_time": float(times[end]),
+                "duration": float(times[end] - times[start]),
+                "points": int(end - start + 1),
+                "peak_time": float(times[peak_index]),
+                "peak_overshoot": float(overshoot[peak_index]),
+            }
+        )
+    return intervals
+
+
+def downsample_trace(
+    times: np.ndarray,
+    values: np.ndarray,
+    upper: np.ndarray,
+    lower: np.ndarray,
+    max_points: int,
+) -> Dict[str, Any]:
+    """
+    按等点数分段降采样，每段保留对比数据的最小/最大值和包络的外沿，
+    降采样后超限仍然可见
+    """
+    n = len(times)
+    if n == 0:
+        return {"time_points": [], "min": [], "max": [], "upper": [], "lower": []}
+    segments = max(1, min(max_points, n))
+    starts = np.unique(np.linspace(0, n, segments, endpoint=False).astype(np.int64))
+
+    counts = np.diff(np.append(starts, n))
+    time_points = np.add.reduceat(times, starts) / counts
+    return {
+        "time_points": time_points.tolist(),
+        "min": np.fmin.reduceat(values, starts).tolist(),
+        "max": np.fmax.reduceat(values, starts).tolist(),
+        "upper": np.maximum.reduceat(upper, starts).tolist(),
+        "lower": np.minimum.reduceat(lower, starts).tolist(),
+    }
+
+
+def check_exceedance(
+    grid_times: np.ndarray,
+    envelopes: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    run_times: np.ndarray,
+    run_columns: Dict[str, np.ndarray],
+    tolerance: float = 0.0,
+    trace_points: int = 500,
+    max_intervals: int = 20,
+) -> Dict[str, Any]:
+    """
+    检查对比试验是否超出历史包络
+
+    对比数据插值到包络时间网格后逐点向量化比较；只检查落在对比试验
+    时间范围内的网格点。
+
+    Args:
+        grid_times: 包络时间点（升序）
+        envelopes: {列名: (上包络, 下包络)}
+        run_times: 对比试验时间（升序）
+        run_columns: {列名: 对比试验数据}
+        tolerance: 允许超出包络的量
+        trace_points: 降采样曲线的最大点数，0表示不返回曲线
+        max_intervals: 每列最多返回的超限区间数（按峰值超限量从大到小）
+
+    Returns:
+        Dict: passed、各列的超限统计与区间、降采样曲线
+    """
+    grid_times = np.asarray(grid_times, dtype=np.float64)
+    run_times = np.asarray(run_times, dtype=np.float64)
+
+    columns = {}
+    trace = {}
+    checked_points = 0
+    for column, (upper, lower) in envelopes.items():
+        upper = np.asarray(upper, dtype=np.float64)
+        lower = np.asarray(lower, dtype=np.float64)
+        values, in_range = align_to_grid(
+            grid_times, run_times, np.asarray(run_columns[column], dtype=np.float64)
+        )
+
+        times = grid_times[in_range]
+        values = values[in_range]
+        upper = upper[in_range]
+        lower = lower[in_range]
+        checked_points = max(checked_points, len(times))
+
+        above = values - upper
+        below = lower - values
+        above_mask = above > tolerance
+        below_mask = below > tolerance
+
+        intervals = violation_intervals(times, above, above_mask, "upper")
+        intervals += violation_intervals(times, below, below_mask, "lower")
+        intervals.sort(key=lambda item: item["peak_overshoot"], reverse=True)
+
+        violation_points = int(np.count_nonzero(above_mask | below_mask))
+        columns[column] = {
+            "passed": violation_points == 0,
+            "checked_points": int(len(times)),
+            "violation_points": violation_points,
+            "violation_ratio": violation_points / len(times) if len(times) else 0.0,
+            "interval_count": len(intervals),
+            "max_overshoot": intervals[0]["peak_overshoot"] if intervals else 0.0,
+            "total_duration": float(sum(item["duration"] for item in intervals)),
+            "intervals": intervals[:max_intervals],
+            "truncated": len(intervals) > max_intervals,
+        }
+
+        if trace_points:
+            trace[column] = downsample_trace(times, values, upper, lower, trace_points)
+
+    result = {
+        "passed": all(item["passed"] for item in columns.values()),
+        "tolerance": tolerance,
+        "checked_points": checked_points,
+        "columns": columns,
+    }
+    if trace_points:
+        result["trace"] = trace
+    return result
+
+
+def _standardize(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """标准化为零均值单位方差，NaN处置0，返回(标准化后的值, 有效点掩码)"""
+    mask = ~np.isnan(values)
+    result = np.zeros(len(values))
+    if mask.any():
+        valid = values[mask].astype(np.float64)
+        std = valid.std()
+        if std > 0:
+            result[mask] = (valid - valid.mean()) / std
+    return result, mask.astype(np.float64)
+
+
+def _coarse_shift_scores(
+    reference: np.ndarray, run: np.ndarray, min_overlap: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    FFT互相关：返回每个偏移步数k的得分，k表示对比数据整体后移k个网格点
+    (run[n-k] 与 reference[n] 对齐)；重叠点数不足的偏移得分为NaN
+    """
+    a, mask_a = _standardize(reference)
+    b, mask_b = _standardize(run)
+    n = len(a)
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+
+    def correlate(x, y):
+        return np.fft.irfft(np.fft.rfft(x, size) * np.conj(np.fft.rfft(y, size)), size)
+
+    corr = correlate(a, b)
+    overlap = np.rint(correlate(mask_a, mask_b))
+    lags = np.arange(size)
+    lags[lags >= size // 2] -= size
+
+    required = max(2.0, min_overlap * min(mask_a.sum(), mask_b.sum()))
+    scores = np.where(overlap >= required, corr / np.maximum(overlap, 1), np.nan)
+    return lags, scores
+
+
+def _refined_shift_scores(
+    reference_times: np.ndarray,
+    reference: np.ndarray,
+    run_times: np.ndarray,
+    run: np.ndarray,
+    shifts: np.ndarray,
+    eval_points: int,
+) -> np.ndarray:
+    """在候选偏移量上直接计算皮尔逊相关系数（所有候选一次向量化计算）"""
+    valid = ~np.isnan(reference)
+    reference_times, reference = reference_times[valid], reference[valid]
+    valid = ~np.isnan(run)
+    run_times, run = run_times[valid], run[valid]
+    if len(reference_times) < 2 or len(run_times) < 2:
+        return np.full(len(shifts), np.nan)
+
+    times = np.linspace(reference_times[0], reference_times[-1], eval_points)
+    x = np.interp(times, reference_times, reference)
+    source_times = times[None, :] - shifts[:, None]
+    weights = (source_times >= run_times[0]) & (source_times <= run_times[-1])
+    y = np.interp(source_times.ravel(), run_times, run).reshape(source_times.shape)
+
+    count = weights.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = (weights * x).sum(axis=1) / count
+        mean_y = (weights * y).sum(axis=1) / count
+        dx = (x[None, :] - mean_x[:, None]) * weights
+        dy = (y - mean_y[:, None]) * weights
+        scores = (dx * dy).sum(axis=1) / np.sqrt(
+            (dx * dx).sum(axis=1) * (dy * dy).sum(axis=1)
+        )
+    scores[count < 2] = np.nan
+    return scores
+
+
+def estimate_time_shift(
+    grid_times: np.ndarray,
+    envelopes: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    run_times: np.ndarray,
+    run_columns: Dict[str, np.ndarray],
+    max_shift: Optional[float] = None,
+    coarse_points: int = 2048,
+    refine_steps: int = 32,
+    refine_span: int = 3,
+    min_overlap: float = 0.5,
+) -> Dict[str, Any]:
+    """
+    估计对比试验相对历史包络中心线的时间偏移
+
+    先将中心线和对比数据按桶平均降采样到 coarse_points 点的等间隔网格，
+    用FFT互相关一次求出所有偏移量的相关性；再在最优粗偏移
+    ±refine_span 个网格间隔内取 2*refine_steps+1 个候选偏移，在原始数据上直接
+    计算相关系数，并在最优候选 ±1 个候选间隔内再细化一轮。桶平均会平滑掉窄峰，
+    粗估计可能偏离真实偏移两三个网格间隔，所以第一轮要覆盖多个间隔。
+    多列时取各列相关性的平均值。
+
+    Args:
+        max_shift: 允许的最大偏移量（时间单位），None表示包络时间跨度的10%
+        refine_span: 第一轮细化覆盖粗偏移两侧的网格间隔数
+        min_overlap: 偏移后重叠部分至少占较短序列的比例
+
+    Returns:
+        Dict: time_shift（加到对比试验时间上的偏移量）、correlation（细化后的
+            平均相关系数）、coarse_shift（粗估计的偏移量）；无法估计时偏移为0
+    """
+    grid_times = np.asarray(grid_times, dtype=np.float64)
+    run_times = np.asarray(run_times, dtype=np.float64)
+    if max_shift is None:
+        max_shift = 0.1 * (grid_times[-1] - grid_times[0])
+    no_shift = {"time_shift": 0.0, "correlation": None, "coarse_shift": 0.0}
+    if len(grid_times) < 2 or len(run_times) < 2 or max_shift <= 0:
+        return no_shift
+
+    time_min = min(grid_times[0], run_times[0])
+    time_max = max(grid_times[-1], run_times[-1])
+    edges = grid_edges(time_min, time_max, coarse_points)
+    step = edges[1] - edges[0]
+    centrelines = {
+        column: (np.asarray(upper, dtype=np.float64) + np.asarray(lower, dtype=np.float64)) / 2
+        for column, (upper, lower) in envelopes.items()
+    }
+
+    # 粗估计：各列FFT互相关得分取平均
+    total = None
+    for column, centreline in centrelines.items():
+        lags, scores = _coarse_shift_scores(
+            resample_to_grid(grid_times, centreline, edges, "mean"),
+            resample_to_grid(
+                run_times, np.asarray(run_columns[column], dtype=np.float64), edges, "mean"
+            ),
+            min_overlap,
+        )
+        total = scores if total is None else total + scores
+    if total is None:
+        return no_shift
+    total[np.abs(lags * step) > max_shift] = np.nan
+    if np.all(np.isnan(total)):
+        return no_shift
+    coarse_shift = float(lags[np.nanargmax(total)] * step)
+
+    # 细化：在粗估计附近的候选偏移上直接计算相关系数，先宽后窄两轮
+    eval_points = min(len(grid_times), 8 * coarse_points)
+    best_shift, best_score = coarse_shift, None
+    window = refine_span * step
+    for _ in range(2):
+        shifts = best_shift + np.linspace(-window, window, 2 * refine_steps + 1)
+        shifts = shifts[np.abs(shifts) <= max_shift]
+        total = sum(
+            _refined_shift_scores(
+                grid_times,
+                centreline,
+                run_times,
+                np.asarray(run_columns[column], dtype=np.float64),
+                shifts,
+                eval_points,
+            )
+            for column, centreline in centrelines.items()
+        ) / len(centrelines)
+        if np.all(np.isnan(total)):
+            break
+        best = int(np.nanargmax(total))
+        best_shift, best_score = float(shifts[best]), float(total[best])
+        window /= refine_steps
+    if best_score is None:
+        return dict(no_shift, coarse_shift=coarse_shift)
+
+    return {
+        "time_shift": best_shift,
+        "correlation": best_score,
+        "coarse_shift": coarse_shift,
+    }
+
+
+def envelope_arrays(
+    envelope: Dict[str, Any], columns: List[str]
+) -> Tuple[Optional[np.ndarray], Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """从包络结果中取出时间点和各列上下包络的numpy数组（缺少的列忽略）"""
+    envelope_data = envelope.get("envelope_data", {})
+    arrays = {
+        column: (
+            np.asarray(envelope_data[column]["upper"], dtype=np.float64),
+            np.asarray(envelope_data[column]["lower"], dtype=np.float64),
+        )
+        for column in columns
+        if column in envelope_data
+    }
+    return np.asarray(envelope.get("time_points", []), dtype=np.float64), arrays
@@ -0,0 +1,145 @@
+import logging
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+
+def detect_excel_engine(filename: str) -> Optional[str]:
+    """根据扩展名选择Excel读取引擎，无法判断时返回None"""
+    lower_name = (filename or "").lower()
+    if lower_name.endswith(".xlsx"):
+        return "openpyxl"
+    if lower_name.endswith(".xls"):
+        return "xlrd"
+    return None
+
+
+def _build_header(raw_header) -> List[str]:
+    """构建列名，空列名按pandas习惯命名为 Unnamed: i"""
+    header = []
+    for i, name in enumerate(raw_header):
+        if name is None or (isinstance(name, str) and not name.strip()):
+            header.append(f"Unnamed: {i}")
+        else:
+            header.append(str(name).strip())
+    return header
+
+
+def _rows_to_frame(rows, header) -> pd.DataFrame:
+    """将行缓冲转换为DataFrame，并推断数值类型"""
+    df = pd.DataFrame.from_records(rows, columns=header)
+    return df.infer_objects()
+
+
+def _iter_openpyxl_rows(file):
+    """以只读模式逐行读取xlsx，不加载整个工作簿"""
+    from openpyxl import load_workbook
+
+    stream = getattr(file, "stream", file)
+    stream.seek(0)
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        for row in worksheet.iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _iter_xlrd_rows(file):
+    """逐行读取xls（xlrd按需加载工作表）"""
+    import xlrd
+
+    stream = getattr(file, "stream", file)
+    stream.seek(0)
+    book = xlrd.open_workbook(file_contents=stream.read(), on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        for i in range(sheet.nrows):
+            yield tuple(
+                None if value == "" else value for value in sheet.row_values(i)
+            )
+    finally:
+        book.release_resources()
+
+
+def _iter_rows(file, engine: str):
+    if engine == "openpyxl":
+        return _iter_openpyxl_rows(file)
+    if engine == "xlrd":
+        return _iter_xlrd_rows(file)
+    raise ValueError(f"不支持的Excel引擎: {engine}")
+
+
+def iter_excel_chunks(
+    file, chunk_size: int = 10000, engine: Optional[str] = None,
+    max_rows: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    流式读取Excel文件，按块产出DataFrame
+
+    Args:
+        file: 文件对象（支持FileStorage）
+        chunk_size: 每块行数
+        engine: 读取引擎，None表示按文件名自动选择
+        max_rows: 最多读取的数据行数，None表示读取全部
+
+    Yields:
+        pd.DataFrame: 每块数据，列名取自第一行
+    """
+    engines = [engine] if engine else []
+    if not engines:
+        detected = detect_excel_engine(getattr(file, "filename", ""))
+        engines = [detected] if detected else ["openpyxl", "xlrd"]
+
+    last_error = None
+    for candidate in engines:
+        rows = _iter_rows(file, candidate)
+        try:
+            raw_header = next(rows, None)
+        except Exception as e:
+            # 自动检测时，当前引擎无法打开文件则尝试下一个
+            last_error = e
+            logging.warning(f"Excel引擎 {candidate} 读取失败: {e}")
+            continue
+
+        try:
+            if raw_header is None:
+                return
+            header = _build_header(raw_header)
+            width = len(header)
+
+            buffer = []
+            read_rows = 0
+            for row in rows:
+                # 只读模式下工作表末尾可能出现全空行
+                if row is None or all(value is None for value in row):
+                    continue
+                row = tuple(row[:width])
+                if len(row) < width:
+                    row += (None,) * (width - len(row))
+                buffer.append(row)
+                read_rows += 1
+
+                if max_rows is not None and read_rows >= max_rows:
+                    break
+                if len(buffer) >= chunk_size:
+                    yield _rows_to_frame(buffer, header)
+                    buffer = []
+
+            if buffer:
+                yield _rows_to_frame(buffer, header)
+            return
+        finally:
+            # 提前结束时也要释放工作簿句柄
+            rows.close()
+
+    raise last_error or ValueError("Excel文件读取失败")
+
+
+def read_excel_preview(file, nrows: int = 10, engine: Optional[str] = None) -> pd.DataFrame:
+    """读取Excel前N行，读够即停止，不解析整个工作簿"""
+    chunks = list(iter_excel_chunks(file, chunk_size=nrows, engine=engine, max_rows=nrows))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
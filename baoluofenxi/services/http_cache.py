@@ -0,0 +1,44 @@
+import hashlib
+import json
+from typing import Optional
+
+from flask import current_app, request
+
+from services.compression import CONTENT_ENCODINGS, encoded_etag
+
+# 客户端和代理可以保存响应，但每次使用前必须用ETag重新验证
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(*parts) -> str:
+    """由决定响应内容的各部分（数据版本、请求参数等）生成强ETag"""
+    key = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def not_modified(etag: str):
+    """
+    请求的 If-None-Match 与ETag一致时返回304响应，否则返回None
+
+    用法：
+        etag = make_etag(...)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+        return with_etag(jsonify(...), etag)
+    """
+    # 压缩后的响应ETag带有编码后缀，客户端回传的是带后缀的值
+    candidates = [etag] + [encoded_etag(etag, encoding) for encoding in CONTENT_ENCODINGS]
+    if not any(request.if_none_match.contains(candidate) for candidate in candidates):
+        return None
+
+    response = current_app.response_class(status=304)
+    return with_etag(response, etag)
+
+
+def with_etag(response, etag: Optional[str]):
+    """为成功的响应设置ETag和缓存控制头"""
+    if etag and response.status_code in (200, 304):
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
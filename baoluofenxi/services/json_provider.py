@@ -0,0 +1,95 @@
+import dataclasses
+import decimal
+import math
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+from services.storage_types import to_output_list
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库json
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """
+    序列化器不能直接处理的类型
+
+    - numpy数组：转换为列表，NaN/inf输出为null；float32按单精度有效位数输出
+    - numpy标量：转换为Python数值，NaN/inf为null
+    - datetime/date：ISO 8601字符串（与模型 to_dict 一致）
+    - Decimal、UUID、dataclass、带 __html__ 的对象与Flask默认行为相同
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f":
+            return [
+                None if item is None or math.isinf(item) else item
+                for item in to_output_list(value, nan_as_none=True)
+            ]
+        return value.tolist()
+    if isinstance(value, np.generic):
+        value = value.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    支持numpy数组/标量的JSON序列化
+
+    安装orjson时由orjson直接序列化连续存储的numpy数组（不经过 tolist()），
+    NaN/inf 输出为 null，datetime 输出为ISO 8601字符串；未安装时使用标准库json，
+    通过 default 转换numpy类型（单精度按7位有效数字）。计算层可以把numpy数组
+    直接放进响应。
+    """
+
+    default = staticmethod(_default)
+    # 字段顺序不影响客户端，不排序以减少开销
+    sort_keys = False
+
+    def _orjson_options(self, indent: bool = False) -> int:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # 传入了标准库参数（如 cls）时保持标准库行为
+        if orjson is None or set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(
+            obj, default=self.default, option=self._orjson_options("indent" in kwargs)
+        ).decode("utf-8")
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # 直接使用orjson输出的bytes，不再解码为str
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
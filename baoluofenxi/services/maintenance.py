@@ -0,0 +1,339 @@
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+
+from database import db
+from database_config import db_config
+from models.models import EnvelopeCache, ExperimentData, ExperimentType
+from services.clickhouse_manager import get_clickhouse_manager
+from services.envelope_store import FILE_EXTENSION, EnvelopeStore
+from services.scratch_store import get_scratch_store
+from services.shared_cache import get_shared_disk_cache
+
+# 由本系统创建的ClickHouse表
+DATA_TABLE_PATTERNS = ["exp\\_%", "envelope\\_data\\_%"]
+TEMP_TABLE_PATTERNS = ["temp\\_envelope\\_data\\_%"]
+SUMMARY_SUFFIX = "_summary"
+
+# 多进程部署时只允许一个进程执行维护
+MAINTENANCE_LOCK_NAME = "envelope_analysis_maintenance"
+
+
+class MaintenanceService:
+    """
+    定期维护：清理过期/不可达的包络缓存、已删除数据的ClickHouse表、
+    过期的临时表、临时对比数据和分块上传目录，并统计回收的空间
+    """
+
+    def __init__(self):
+        app_config = db_config.get_app_config()
+        self.grace_period = timedelta(seconds=app_config["maintenance_grace_period"])
+        self.temp_table_max_age = timedelta(seconds=app_config["temp_table_max_age"])
+        self.chunked_upload_retention = app_config["chunked_upload_retention"]
+        self.clickhouse_manager = get_clickhouse_manager()
+
+    def run(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        执行一次维护
+
+        Args:
+            dry_run: 只统计将要清理的内容，不实际删除
+
+        Returns:
+            Dict: 维护报告
+        """
+        with self._maintenance_lock() as acquired:
+            if not acquired:
+                return {"success": False, "message": "其他进程正在执行维护"}
+
+            started = time.monotonic()
+            report = {"dry_run": dry_run}
+            steps = [
+                ("envelope_cache", self.clean_envelope_cache),
+                ("data_tables", self.clean_data_tables),
+                ("temp_tables", self.clean_temp_tables),
+                ("chunked_uploads", self.clean_chunked_uploads),
+                ("scratch_data", self.clean_scratch_data),
+                ("shared_cache", self.clean_shared_cache),
+            ]
+            for name, step in steps:
+                try:
+                    report[name] = step(dry_run)
+                except Exception as e:
+                    db.session.rollback()
+                    logging.error(f"维护步骤 {name} 失败: {e}")
+                    report[name] = {"error": str(e)}
+
+            report["reclaimed_bytes"] = sum(
+                item.get("reclaimed_bytes", 0) for item in report.values() if isinstance(item, dict)
+            )
+            report["elapsed_seconds"] = round(time.monotonic() - started, 3)
+            logging.info(f"维护完成: 回收 {report['reclaimed_bytes']} 字节")
+            return {"success": True, "message": "维护完成", "report": report}
+
+    @contextmanager
+    def _maintenance_lock(self):
+        """MySQL命名锁；其他数据库（如开发用SQLite）不加锁"""
+        if db.engine.dialect.name != "mysql":
+            yield True
+            return
+
+        connection = db.engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT GET_LOCK(:name, 0)"), {"name": MAINTENANCE_LOCK_NAME}
+            ).scalar() == 1
+            yield acquired
+        finally:
+            try:
+                connection.execute(text("DO RELEASE_LOCK(:name)"), {"name": MAINTENANCE_LOCK_NAME})
+            finally:
+                connection.close()
+
+    def clean_envelope_cache(self, dry_run: bool = False) -> Dict[str, Any]:
+        """删除过期、历史数据集版本已变化以及旧版（无版本）的缓存行和缓存文件"""
+        store = EnvelopeStore()
+        versions = dict(db.session.query(ExperimentType.id, ExperimentType.historical_version).all())
+
+        stale_rows = []
+        referenced_files = set()
+        for cache in EnvelopeCache.query.all():
+            reachable = (
+                cache.historical_version is not None
+                and versions.get(cache.experiment_type_id) == cache.historical_version
+                and not cache.is_expired()
+            )
+            if reachable:
+                if cache.cache_file:
+                    referenced_files.add(cache.cache_file)
+            else:
+                stale_rows.append(cache)
+
+        reclaimed_bytes = 0
+        deleted_files = 0
+        for cache in stale_rows:
+            if store.exists(cache.cache_file):
+                reclaimed_bytes += os.path.getsize(store.path(cache.cache_file))
+                deleted_files += 1
+            if not dry_run:
+                store.delete(cache.cache_file)
+                db.session.delete(cache)
+        if not dry_run:
+            db.session.commit()
+
+        # 没有缓存行引用的文件（写文件后提交失败等），超过宽限期才删除
+        cutoff = time.time() - self.grace_period.total_seconds()
+        stale_rows_files = {cache.cache_file for cache in stale_rows}
+        for name in os.listdir(store.root_dir):
+            path = store.path(name)
+            if (
+                name in referenced_files
+                or name in stale_rows_files
+                or not (name.endswith(FILE_EXTENSION) or name.endswith(".tmp"))
+                or os.path.getmtime(path) > cutoff
+            ):
+                continue
+            reclaimed_bytes += os.path.getsize(path)
+            deleted_files += 1
+            if not dry_run:
+                store.delete(name)
+
+        return {
+            "deleted_rows": len(stale_rows),
+            "deleted_files": deleted_files,
+            "reclaimed_bytes": reclaimed_bytes,
+        }
+
+    def clean_data_tables(self, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        删除不再被引用的数据表
+
+        - 软删除超过宽限期、且没有其他有效记录共用（去重）的表
+        - 超过宽限期和分块上传保留时间仍处于processing状态的上传（进程中断遗留）
+        - ClickHouse中存在但没有任何数据记录引用的表，以及失去数据表的汇总表
+        """
+        now = datetime.utcnow()
+        cutoff = now - self.grace_period
+        # 分块上传写入的数据在complete之前一直处于processing状态，至少保留到上传目录过期
+        processing_cutoff = now - max(
+            self.grace_period, timedelta(seconds=self.chunked_upload_retention)
+        )
+        records = ExperimentData.query.all()
+
+        live_tables = set()
+        for record in records:
+            if record.status != "deleted" and record.clickhouse_table_name:
+                if self._is_stale_upload(record, processing_cutoff):
+                    continue
+                live_tables.add(record.clickhouse_table_name)
+
+        drop_tables = set()
+        stale_uploads = []
+        for record in records:
+            table_name = record.clickhouse_table_name
+            if record.status == "deleted":
+                if record.deleted_at is None:
+                    # 记录删除时间之前删除的数据，从现在开始计算宽限期
+                    if not dry_run:
+                        record.deleted_at = now
+                    continue
+                if record.deleted_at < cutoff and table_name and table_name not in live_tables:
+                    drop_tables.add(table_name)
+            elif self._is_stale_upload(record, processing_cutoff):
+                stale_uploads.append(record)
+                if table_name and table_name not in live_tables:
+                    drop_tables.add(table_name)
+
+        # 没有数据记录引用的表（只清理超过宽限期的，避免误删正在写入的表）
+        referenced_tables = {record.clickhouse_table_name for record in records}
+        existing_tables = self.clickhouse_manager.list_tables(DATA_TABLE_PATTERNS)
+        existing_names = {table["name"] for table in existing_tables}
+        for table in existing_tables:
+            name = table["name"]
+            if name.endswith(SUMMARY_SUFFIX):
+                if name[: -len(SUMMARY_SUFFIX)] not in existing_names:
+                    drop_tables.add(name)
+                continue
+            if name not in referenced_tables and self._older_than(table, self.grace_period):
+                drop_tables.add(name)
+
+        drop_tables &= existing_names
+        result = self._drop_tables(sorted(drop_tables), dry_run)
+
+        if not dry_run:
+            for record in stale_uploads:
+                db.session.delete(record)
+            db.session.commit()
+
+        result["stale_uploads"] = len(stale_uploads)
+        return result
+
+    def clean_temp_tables(self, dry_run: bool = False) -> Dict[str, Any]:
+        """删除超过保留时间的临时对比表"""
+        stale = [
+            table["name"]
+            for table in self.clickhouse_manager.list_tables(TEMP_TABLE_PATTERNS)
+            if self._older_than(table, self.temp_table_max_age)
+        ]
+        return self._drop_tables(stale, dry_run)
+
+    def clean_chunked_uploads(self, dry_run: bool = False) -> Dict[str, Any]:
+        """删除超过保留时间的分块上传目录"""
+        from services.chunked_upload import ChunkedUploadManager
+
+        root_dir = ChunkedUploadManager().root_dir
+        cutoff = time.time() - self.chunked_upload_retention
+        removed = []
+        reclaimed_bytes = 0
+        for name in os.listdir(root_dir):
+            path = os.path.join(root_dir, name)
+            if not os.path.isdir(path) or os.path.getmtime(path) > cutoff:
+                continue
+            reclaimed_bytes += _directory_size(path)
+            removed.append(name)
+            if not dry_run:
+                shutil.rmtree(path, ignore_errors=True)
+        return {"removed": removed, "reclaimed_bytes": reclaimed_bytes}
+
+    def clean_scratch_data(self, dry_run: bool = False) -> Dict[str, Any]:
+        """删除本地暂存区中过期的临时对比数据"""
+        return get_scratch_store().clean_expired(dry_run)
+
+    def clean_shared_cache(self, dry_run: bool = False) -> Dict[str, Any]:
+        """主机共享缓存超过容量时按LRU淘汰（与写入时触发的淘汰相同）"""
+        if dry_run or not db_config.get_app_config()["shared_cache_enabled"]:
+            return {"removed": 0, "reclaimed_bytes": 0}
+        removed, freed = get_shared_disk_cache().evict()
+        return {"removed": removed, "reclaimed_bytes": freed}
+
+    def _drop_tables(self, table_names: List[str], dry_run: bool) -> Dict[str, Any]:
+        """删除表（连同汇总表）并统计回收的磁盘空间与part数"""
+        summary_names = [name + SUMMARY_SUFFIX for name in table_names if not name.endswith(SUMMARY_SUFFIX)]
+        storage = self.clickhouse_manager.table_storage(table_names + summary_names)
+
+        dropped = []
+        for name in table_names:
+            if dry_run or self.clickhouse_manager.drop_table(name):
+                dropped.append(name)
+
+        measured = dropped + [
+            name + SUMMARY_SUFFIX for name in dropped if not name.endswith(SUMMARY_SUFFIX)
+        ]
+        return {
+            "dropped_tables": dropped,
+            "reclaimed_bytes": sum(storage.get(name, {}).get("bytes", 0) for name in measured),
+            "reclaimed_parts": sum(storage.get(name, {}).get("parts", 0) for name in measured),
+        }
+
+    @staticmethod
+    def _is_stale_upload(record: ExperimentData, cutoff: datetime) -> bool:
+        """进程中断遗留的上传（upload_time 与 cutoff 均为UTC时间）"""
+        return (
+            record.status == "processing"
+            and record.upload_time is not None
+            and record.upload_time < cutoff
+        )
+
+    @staticmethod
+    def _older_than(table: Dict[str, Any], max_age: timedelta) -> bool:
+        return table["age_seconds"] > max_age.total_seconds()
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class MaintenanceScheduler:
+    """按固定间隔在后台线程中执行维护"""
+
+    def __init__(self, app, interval: Optional[int] = None):
+        self.app = app
+        self.interval = interval or db_config.get_app_config()["maintenance_interval"]
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="maintenance", daemon=True)
+        self._thread.start()
+        logging.info(f"定期维护已启动，间隔: {self.interval} 秒")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop(self):
+        # 启动后先等待一个间隔，避免与启动时的缓存预热争抢资源
+        while not self._stop_event.wait(self.interval):
+            try:
+                with self.app.app_context():
+                    MaintenanceService().run()
+            except Exception as e:
+                logging.error(f"定期维护失败: {e}")
+
+
+# 全局维护调度实例（未启用时为None）
+maintenance_scheduler = None
+
+
+def start_maintenance_scheduler(app) -> MaintenanceScheduler:
+    """启动定期维护（每个进程只启动一次）"""
+    global maintenance_scheduler
+    if maintenance_scheduler is None:
+        maintenance_scheduler = MaintenanceScheduler(app)
+        maintenance_scheduler.start()
+    return maintenance_scheduler
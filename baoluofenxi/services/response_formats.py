@@ -0,0 +1,202 @@
+import base64
+from numbers import Number
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import current_app, jsonify, request
+
+try:
+    import msgpack
+except ImportError:  # 未安装时不提供MessagePack格式
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # 未安装时不提供Arrow格式
+    pa = None
+
+# 各响应格式的媒体类型；json 排在最前，Accept 为 */* 时默认返回JSON
+JSON_MEDIA_TYPE = "application/json"
+BASE64_MEDIA_TYPE = "application/vnd.envelope.base64+json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# 时间轴：等间隔时编码为 start/step/count，否则保留float64精度
+TIME_KEYS = ("time_points",)
+# 等间隔判断的相对容差（相对于步长）
+_UNIFORM_TOLERANCE = 1e-6
+
+
+class UnsupportedFormatError(ValueError):
+    """请求的响应格式不存在、依赖未安装或不适用于该数据"""
+
+
+def available_formats() -> Dict[str, str]:
+    """当前可用的通用响应格式 {格式名: 媒体类型}"""
+    formats = {"json": JSON_MEDIA_TYPE, "base64": BASE64_MEDIA_TYPE}
+    if msgpack is not None:
+        formats["msgpack"] = MSGPACK_MEDIA_TYPE
+    if pa is not None:
+        formats["arrow"] = ARROW_MEDIA_TYPE
+    return formats
+
+
+def negotiate_format(explicit: Optional[str] = None,
+                     extra: Optional[Dict[str, str]] = None) -> str:
+    """
+    确定响应格式：显式的 format 参数优先，否则按 Accept 头协商
+
+    Args:
+        explicit: 请求参数中的格式名
+        extra: 接口特有的格式 {格式名: 媒体类型}（如包络的 binary）
+
+    Raises:
+        UnsupportedFormatError: 显式指定的格式不可用
+    """
+    formats = dict(available_formats(), **(extra or {}))
+    if explicit:
+        if explicit not in formats:
+            raise UnsupportedFormatError(
+                f"不支持的响应格式: {explicit}，可用格式: {', '.join(formats)}"
+            )
+        return explicit
+
+    best = request.accept_mimetypes.best_match(list(formats.values()), default=JSON_MEDIA_TYPE)
+    for name, media_type in formats.items():
+        if media_type == best:
+            return name
+    return "json"
+
+
+def _as_array(value) -> Optional[np.ndarray]:
+    """数值列表（可含表示缺失的None）转换为float64数组，其他值返回None"""
+    if isinstance(value, np.ndarray):
+        return value if value.dtype.kind in "fiu" else None
+    if not isinstance(value, (list, tuple)) or not value:
+        return None
+    first = next((item for item in value if item is not None), None)
+    if not isinstance(first, Number) or isinstance(first, bool):
+        return None
+    try:
+        return np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+
+
+def uniform_axis(times: np.ndarray) -> Optional[Dict[str, Any]]:
+    """时间轴等间隔时返回 {encoding: range, start, step, count}，否则返回None"""
+    count = len(times)
+    if count < 2 or np.isnan(times).any():
+        return None
+    start = float(times[0])
+    step = (float(times[-1]) - start) / (count - 1)
+    if step <= 0:
+        return None
+    expected = start + np.arange(count) * step
+    if np.max(np.abs(times - expected)) > abs(step) * _UNIFORM_TOLERANCE:
+        return None
+    return {"encoding": "range", "start": start, "step": step, "count": count}
+
+
+def _pack(value, key: Optional[str], raw: bool):
+    """将数组替换为紧凑编码：等间隔时间轴、float32数据块（时间轴为float64）"""
+    if isinstance(value, dict):
+        return {k: _pack(v, k, raw) for k, v in value.items()}
+
+    array = _as_array(value)
+    if array is None:
+        if isinstance(value, (list, tuple)):
+            return [_pack(item, None, raw) for item in value]
+        return value.item() if isinstance(value, np.generic) else value
+
+    encoding = "float32"
+    if key in TIME_KEYS:
+        axis = uniform_axis(array.astype(np.float64, copy=False))
+        if axis is not None:
+            return axis
+        encoding = "float64"
+
+    data = np.ascontiguousarray(array, dtype="<f4" if encoding == "float32" else "<f8").tobytes()
+    return {
+        "encoding": encoding,
+        "count": len(array),
+        "data": data if raw else base64.b64encode(data).decode("ascii"),
+    }
+
+
+def _flatten_arrays(value, path: List[str], arrays: List[Tuple[str, np.ndarray, bool]]):
+    """拆出嵌套字典中的数组（列名为以 . 连接的路径），返回剩余的元数据"""
+    if not isinstance(value, dict):
+        return value.item() if isinstance(value, np.generic) else value
+    meta = {}
+    for key, item in value.items():
+        array = _as_array(item)
+        if array is not None:
+            arrays.append((".".join(path + [str(key)]), array, key in TIME_KEYS))
+        else:
+            meta[key] = _flatten_arrays(item, path + [str(key)], arrays)
+    return meta
+
+
+def _encode_arrow(payload: Dict[str, Any]) -> bytes:
+    """
+    编码为Arrow IPC流：所有数组作为同一张表的列（时间列float64，数据列float32），
+    其余字段以JSON存入schema元数据的 meta 键
+    """
+    arrays = []
+    meta = _flatten_arrays(payload, [], arrays)
+    if len({len(array) for _, array, _ in arrays}) > 1:
+        raise UnsupportedFormatError("数据中的数组长度不一致，不支持Arrow格式")
+
+    columns = {
+        name: pa.array(array.astype(np.float64 if is_time else np.float32, copy=False))
+        for name, array, is_time in arrays
+    }
+    table = pa.table(columns).replace_schema_metadata(
+        {"meta": current_app.json.dumps(meta)}
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _msgpack_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化类型: {type(value)}")
+
+
+def format_response(payload: Dict[str, Any], output_format: str):
+    """
+    按格式生成成功响应（JSON格式与 jsonify({"success": True, "data": payload}) 相同）
+
+    - base64: JSON，数组为base64编码的小端float32数据块
+    - msgpack: MessagePack，数组为bin类型的小端float32数据块
+    - arrow: Arrow IPC流，只包含data部分
+    等间隔的时间轴在非JSON格式中编码为 {encoding: range, start, step, count}
+    """
+    if output_format == "json":
+        response = jsonify({"success": True, "data": payload})
+    elif output_format == "base64":
+        response = current_app.response_class(
+            current_app.json.dumps({"success": True, "data": _pack(payload, None, raw=False)}),
+            mimetype=BASE64_MEDIA_TYPE,
+        )
+    elif output_format == "msgpack":
+        response = current_app.response_class(
+            msgpack.packb(
+                {"success": True, "data": _pack(payload, None, raw=True)},
+                use_bin_type=True,
+                default=_msgpack_default,
+            ),
+            mimetype=MSGPACK_MEDIA_TYPE,
+        )
+    elif output_format == "arrow":
+        response = current_app.response_class(_encode_arrow(payload), mimetype=ARROW_MEDIA_TYPE)
+    else:
+        raise UnsupportedFormatError(f"不支持的响应格式: {output_format}")
+
+    # 同一URL按Accept返回不同格式，共享缓存需要区分
+    response.vary.add("Accept")
+    return response
@@ -0,0 +1,159 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 汇总表的列顺序（长表：每行是某分辨率下某列的一个时间桶）
+SUMMARY_COLUMNS = [
+    "resolution", "bucket", "column_name", "v_min", "v_max", "v_sum", "v_sumsq", "v_count",
+]
+
+_AGGREGATIONS = {
+    "v_min": "min",
+    "v_max": "max",
+    "v_sum": "sum",
+    "v_sumsq": "sum",
+    "v_count": "sum",
+}
+
+
+def bucket_index(times, resolution: float) -> np.ndarray:
+    """时间点所在的桶序号，桶为 [k * resolution, (k + 1) * resolution)"""
+    return np.floor(np.asarray(times, dtype=np.float64) / resolution).astype(np.int64)
+
+
+def merge_summaries(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """合并多个汇总（同一分辨率、同一桶的统计量可直接相加或取极值）"""
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    combined = pd.concat(frames, ignore_index=True)
+    merged = (
+        combined.groupby(["resolution", "column_name", "bucket"], sort=True)
+        .agg(_AGGREGATIONS)
+        .reset_index()
+    )
+    return merged[SUMMARY_COLUMNS]
+
+
+class RunSummaryBuilder:
+    """
+    单次试验的分桶汇总构建器
+
+    上传时逐块调用 add()，每个标准分辨率下按固定时间桶累计各列的
+    最小值、最大值、和、平方和与计数；桶边界与试验无关，因此不同试验的
+    汇总可以直接合并得到包络，而无需重新扫描原始数据。
+    """
+
+    def __init__(self, time_column: str, data_columns: List[str], resolutions: List[float]):
+        self.time_column = time_column
+        self.data_columns = list(data_columns)
+        self.resolutions = [float(res) for res in resolutions]
+        self.time_min = None
+        self.time_max = None
+        self._partials = []
+
+    def add(self, df: pd.DataFrame):
+        """累计一个数据块"""
+        if df.empty or not self.resolutions:
+            return
+
+        times = df[self.time_column].to_numpy(dtype=np.float64)
+        chunk_min, chunk_max = float(times.min()), float(times.max())
+        self.time_min = chunk_min if self.time_min is None else min(self.time_min, chunk_min)
+        self.time_max = chunk_max if self.time_max is None else max(self.time_max, chunk_max)
+
+        values = df[self.data_columns].astype(np.float64)
+        squares = values * values
+
+        for resolution in self.resolutions:
+            buckets = bucket_index(times, resolution)
+            grouped = values.groupby(buckets)
+            stats = {
+                "v_min": grouped.min(),
+                "v_max": grouped.max(),
+                "v_sum": grouped.sum(),
+                "v_sumsq": squares.groupby(buckets).sum(),
+                "v_count": grouped.count(),
+            }
+
+            # 宽表转长表：(bucket, column) -> 统计量
+            partial = pd.concat(
+                {name: stat.stack() for name, stat in stats.items()}, axis=1
+            )
+            partial.index.names = ["bucket", "column_name"]
+            partial = partial.reset_index()
+            partial["resolution"] = resolution
+            self._partials.append(partial[SUMMARY_COLUMNS])
+
+        # 分块较多时及时合并，避免中间结果堆积
+        if len(self._partials) >= 64:
+            self._partials = [merge_summaries(self._partials)]
+
+    def finalize(self) -> pd.DataFrame:
+        """返回合并后的汇总长表"""
+        summary = merge_summaries(self._partials)
+        self._partials = [summary]
+        return summary
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, time_column: str, data_columns: List[str],
+                   resolutions: List[float]) -> pd.DataFrame:
+        """直接对完整数据计算汇总"""
+        builder = cls(time_column, data_columns, resolutions)
+        builder.add(df)
+        return builder.finalize()
+
+
+def choose_resolution(available: List[float], time_min: float, time_max: float,
+                      sampling_points: int, min_fill_ratio: float = 0.1) -> Optional[float]:
+    """
+    为给定的采样点数选择汇总分辨率
+
+    选择桶数不超过采样点数的最细分辨率；若桶数太少（低于采样点数的
+    min_fill_ratio），说明标准分辨率与请求不匹配，返回None以回退到原始数据计算。
+    """
+    span = max(time_max - time_min, 0.0)
+    for resolution in sorted(available):
+        bucket_count = int(np.floor(time_max / resolution) - np.floor(time_min / resolution)) + 1
+        if bucket_count <= sampling_points:
+            if bucket_count >= max(1, sampling_points * min_fill_ratio) or span == 0:
+                return resolution
+            return None
+    return None
+
+
+def summary_envelope(summary: pd.DataFrame, selected_columns: List[str],
+                     resolution: float) -> Dict[str, object]:
+    """
+    由合并后的汇总计算包络
+
+    Returns:
+        Dict: time_points（桶中心）、各列 upper/lower/mean 数组以及原始点数
+    """
+    summary = summary[summary["resolution"] == resolution]
+    buckets = np.unique(summary["bucket"].to_numpy())
+    time_points = (buckets.astype(np.float64) + 0.5) * resolution
+
+    columns = {}
+    original_points = 0
+    for column in selected_columns:
+        col_summary = (
+            summary[summary["column_name"] == column].set_index("bucket").reindex(buckets)
+        )
+        counts = col_summary["v_count"].to_numpy(dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = col_summary["v_sum"].to_numpy(dtype=np.float64) / counts
+        columns[column] = {
+            "upper": np.nan_to_num(col_summary["v_max"].to_numpy(dtype=np.float64)),
+            "lower": np.nan_to_num(col_summary["v_min"].to_numpy(dtype=np.float64)),
+            "mean": np.nan_to_num(mean),
+        }
+        original_points = max(original_points, int(np.nansum(counts)))
+
+    return {
+        "time_points": time_points,
+        "columns": columns,
+        "original_points": original_points,
+    }
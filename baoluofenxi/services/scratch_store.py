@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from database_config import db_config
+from services.chunked_upload import resolve_upload_folder
+
+SCRATCH_PREFIX = "scratch_"
+# 临时数据ID由服务端生成：前缀 + 时间戳 + 随机串，只允许这些字符，防止路径穿越
+_SCRATCH_ID_PATTERN = re.compile(r"^scratch_\d{8}_\d{6}_[0-9a-f]{8}$")
+_META_FILE = "meta.json"
+
+
+def is_scratch_id(temp_data_id: Optional[str]) -> bool:
+    """临时数据ID是否指向本地暂存区（否则为ClickHouse临时表名）"""
+    return bool(temp_data_id) and bool(_SCRATCH_ID_PATTERN.match(temp_data_id))
+
+
+def new_scratch_id() -> str:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{SCRATCH_PREFIX}{timestamp}_{uuid.uuid4().hex[:8]}"
+
+
+class ScratchStore:
+    """
+    临时对比数据的本地列式暂存区
+
+    目录结构（位于 uploads/scratch/<temp_data_id>/ 下）：
+        meta.json  试验类型、列名、行数、时间范围和创建时间
+        c<i>.npy   第i列的数据（与ClickHouse中存储的值一致，已按存储类型量化）
+
+    对比时按列内存映射读取，不经过ClickHouse；只有另存为正式数据时才写入
+    ClickHouse。写入时先写临时目录再原子重命名，超过保留时间的条目视为
+    不存在，由定期维护删除。
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, ttl: Optional[int] = None):
+        app_config = db_config.get_app_config()
+        self.root_dir = root_dir or os.path.join(resolve_upload_folder(), "scratch")
+        self.ttl = ttl or app_config["scratch_ttl"]
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _entry_dir(self, temp_data_id: str) -> str:
+        if not is_scratch_id(temp_data_id):
+            raise ValueError("无效的临时数据ID")
+        return os.path.join(self.root_dir, temp_data_id)
+
+    def save(self, temp_data_id: str, df: pd.DataFrame, meta: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按列写入暂存区
+
+        Args:
+            df: 已按时间排序、按存储类型量化的数据
+            meta: 附加元信息（试验类型ID、原始文件名等）
+        """
+        entry_dir = self._entry_dir(temp_data_id)
+        tmp_dir = f"{entry_dir}.{uuid.uuid4().hex[:8]}.tmp"
+        os.makedirs(tmp_dir)
+        try:
+            columns = [str(column) for column in df.columns]
+            for index, column in enumerate(df.columns):
+                np.save(
+                    os.path.join(tmp_dir, f"c{index}.npy"),
+                    np.ascontiguousarray(df[column].to_numpy()),
+                    allow_pickle=False,
+                )
+            meta = dict(meta, columns=columns, row_count=len(df), created_at=time.time())
+            with open(os.path.join(tmp_dir, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(tmp_dir, entry_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        return meta
+
+    def meta(self, temp_data_id: str) -> Optional[Dict[str, Any]]:
+        """读取元信息；不存在或已过期返回None"""
+        try:
+            with open(os.path.join(self._entry_dir(temp_data_id), _META_FILE), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta.get("created_at", 0) > self.ttl:
+            return None
+        return meta
+
+    def load(self, temp_data_id: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        以内存映射方式读取指定列（None表示全部列），不存在或已过期返回None；
+        请求的列不存在时结果中不包含该列
+        """
+        meta = self.meta(temp_data_id)
+        if meta is None:
+            return None
+
+        entry_dir = self._entry_dir(temp_data_id)
+        stored_columns = meta["columns"]
+        data = {}
+        for column in columns if columns is not None else stored_columns:
+            if column not in stored_columns or column in data:
+                continue
+            path = os.path.join(entry_dir, f"c{stored_columns.index(column)}.npy")
+            data[column] = np.load(path, mmap_mode="r", allow_pickle=False)
+        return pd.DataFrame(data, copy=False)
+
+    def delete(self, temp_data_id: str) -> bool:
+        entry_dir = self._entry_dir(temp_data_id)
+        if not os.path.isdir(entry_dir):
+            return False
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return True
+
+    def clean_expired(self, dry_run: bool = False) -> Dict[str, Any]:
+        """删除过期条目和写入中断遗留的临时目录"""
+        now = time.time()
+        removed = []
+        reclaimed_bytes = 0
+        for name in os.listdir(self.root_dir):
+            path = os.path.join(self.root_dir, name)
+            if not os.path.isdir(path):
+                continue
+            if is_scratch_id(name):
+                meta_path = os.path.join(path, _META_FILE)
+                try:
+                    with open(meta_path, encoding="utf-8") as f:
+                        created_at = json.load(f).get("created_at", 0)
+                except (OSError, ValueError):
+                    created_at = os.path.getmtime(path)
+            elif name.endswith(".tmp"):
+                created_at = os.path.getmtime(path)
+            else:
+                continue
+            if now - created_at <= self.ttl:
+                continue
+
+            for root, _, files in os.walk(path):
+                for file_name in files:
+                    try:
+                        reclaimed_bytes += os.path.getsize(os.path.join(root, file_name))
+                    except OSError:
+                        pass
+            removed.append(name)
+            if not dry_run:
+                shutil.rmtree(path, ignore_errors=True)
+
+        if removed and not dry_run:
+            logging.info(f"清理过期临时对比数据 {len(removed)} 个")
+        return {"removed": removed, "reclaimed_bytes": reclaimed_bytes}
+
+
+# 全局暂存区实例
+scratch_store = None
+
+
+def get_scratch_store():
+    """获取临时对比数据暂存区单例"""
+    global scratch_store
+    if scratch_store is None:
+        scratch_store = ScratchStore()
+    return scratch_store
@@ -0,0 +1,223 @@
+import hashlib
+import logging
+import mmap
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from database_config import db_config
+from services.envelope_store import BASE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows：淘汰时不加锁，并发淘汰只会重复删除
+    fcntl = None
+
+# 命中时最多每隔该秒数更新一次文件修改时间（LRU顺序），避免每次读取都写元数据
+_TOUCH_INTERVAL = 60
+# 淘汰到上限的该比例以下，避免每次写入都触发淘汰
+_EVICT_TARGET = 0.9
+
+
+def resolve_shared_cache_folder() -> str:
+    """获取共享缓存目录的绝对路径"""
+    cache_folder = db_config.get_app_config()["shared_cache_folder"]
+    if not os.path.isabs(cache_folder):
+        cache_folder = os.path.join(BASE_DIR, cache_folder)
+    return cache_folder
+
+
+class SharedDiskCache:
+    """
+    同一主机上所有工作进程共享的磁盘缓存
+
+    - 文件路径由命名空间和缓存键的哈希决定，文件名本身就是索引，查找无需数据库
+    - 写入临时文件后原子重命名，读取方不会看到写了一半的文件
+    - 读取时通过内存映射打开，各进程共享操作系统的页缓存
+    - 命中时更新文件修改时间；所有进程写入的总大小超过上限时，
+      持有文件锁的进程按修改时间从旧到新淘汰（LRU）
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        app_config = db_config.get_app_config()
+        self.root_dir = root_dir or resolve_shared_cache_folder()
+        self.max_bytes = max_bytes or app_config["shared_cache_size"]
+        os.makedirs(self.root_dir, exist_ok=True)
+        self._lock_path = os.path.join(self.root_dir, ".lock")
+        # 本进程自上次统计以来写入的字节数，超过上限的10%时重新统计总大小
+        self._written = 0
+        self._written_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, namespace: str, key: Any, extension: str = "") -> str:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.root_dir, namespace, digest[:2], digest + extension)
+
+    def get_bytes(self, namespace: str, key: Any) -> Optional[mmap.mmap]:
+        """以只读内存映射返回缓存内容，未命中返回None"""
+        path = self.path(namespace, key)
+        try:
+            with open(path, "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return mapped
+
+    def put_bytes(self, namespace: str, key: Any, data: bytes) -> str:
+        """写入缓存内容，返回缓存文件路径"""
+        path = self.path(namespace, key)
+        self._write(path, lambda f: f.write(data))
+        return path
+
+    def get_array(self, namespace: str, key: Any) -> Optional[np.ndarray]:
+        """以只读内存映射返回缓存的numpy数组，未命中返回None"""
+        path = self.path(namespace, key, ".npy")
+        try:
+            array = np.load(path, mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return array
+
+    def put_array(self, namespace: str, key: Any, array: np.ndarray) -> str:
+        path = self.path(namespace, key, ".npy")
+        self._write(path, lambda f: np.save(f, np.ascontiguousarray(array), allow_pickle=False))
+        return path
+
+    def get_path(self, namespace: str, key: Any, extension: str = "") -> Optional[str]:
+        """返回已缓存文件的路径（用于直接发送文件），未命中返回None"""
+        path = self.path(namespace, key, extension)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        self._touch(path)
+        self.hits += 1
+        return path
+
+    def _write(self, path: str, writer):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                writer(f)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"写入共享缓存失败 {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._written_lock:
+            self._written += size
+            need_evict = self._written > self.max_bytes * (1 - _EVICT_TARGET)
+            if need_evict:
+                self._written = 0
+        if need_evict:
+            self.evict()
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            if time.time() - os.path.getmtime(path) > _TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    @contextmanager
+    def _evict_lock(self):
+        """跨进程的淘汰锁；其他进程正在淘汰时返回False"""
+        if fcntl is None:
+            yield True
+            return
+        with open(self._lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.root_dir):
+            for name in files:
+                if name == ".lock":
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> Tuple[int, int]:
+        """
+        总大小超过上限时按LRU淘汰
+
+        Returns:
+            (删除的文件数, 释放的字节数)
+        """
+        with self._evict_lock() as acquired:
+            if not acquired:
+                return 0, 0
+
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return 0, 0
+
+            # 已经映射该文件的进程仍可继续读取，删除只影响之后的查找
+            target = self.max_bytes * _EVICT_TARGET
+            removed = 0
+            freed = 0
+            for _, size, path in sorted(entries):
+                if total - freed <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+            logging.info(f"共享缓存淘汰 {removed} 个文件，释放 {freed} 字节")
+            return removed, freed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._scan()
+        return {
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# 全局共享缓存实例
+shared_disk_cache = None
+
+
+def get_shared_disk_cache():
+    """获取共享磁盘缓存单例"""
+    global shared_disk_cache
+    if shared_disk_cache is None:
+        shared_disk_cache = SharedDiskCache()
+    return shared_disk_cache
@@ -0,0 +1,163 @@
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 支持的存储类型：ClickHouse列类型 -> 写入时的numpy类型
+STORAGE_TYPES = {
+    "Float64": np.float64,
+    "Float32": np.float32,
+    "Int32": np.int32,
+}
+
+DEFAULT_STORAGE_TYPE = "Float64"
+
+# 通配符键，作为未单独配置列的默认类型
+WILDCARD_KEY = "*"
+
+
+def normalize_storage_spec(storage_types: Optional[Dict[str, Any]],
+                           data_columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    校验并规范化列存储类型配置
+
+    配置格式示例::
+
+        {"*": "Float32", "C1": {"type": "Int32", "scale": 1000}}
+
+    Float32 直接存储单精度浮点数；Int32 为定点数，存储 round(value * scale)。
+
+    Returns:
+        Dict: {列名: {"type": 类型, "scale": 缩放系数}}，只包含非Float64的列
+
+    Raises:
+        ValueError: 配置无效
+    """
+    if not storage_types:
+        return {}
+    if not isinstance(storage_types, dict):
+        raise ValueError("存储类型配置必须是对象")
+
+    unknown_columns = [
+        col for col in storage_types if col != WILDCARD_KEY and col not in data_columns
+    ]
+    if unknown_columns:
+        raise ValueError(f'存储类型配置中存在未知的数据列: {", ".join(unknown_columns)}')
+
+    normalized = {}
+    for col in data_columns:
+        raw = storage_types.get(col, storage_types.get(WILDCARD_KEY))
+        if raw is None:
+            continue
+
+        if isinstance(raw, str):
+            col_type, scale = raw, None
+        elif isinstance(raw, dict):
+            col_type, scale = raw.get("type"), raw.get("scale")
+        else:
+            raise ValueError(f'列 "{col}" 的存储类型配置无效')
+
+        if col_type not in STORAGE_TYPES:
+            raise ValueError(
+                f'列 "{col}" 的存储类型 "{col_type}" 不受支持，可选: {", ".join(STORAGE_TYPES)}'
+            )
+
+        if col_type == "Int32":
+            if not isinstance(scale, (int, float)) or scale <= 0:
+                raise ValueError(f'列 "{col}" 使用Int32定点存储时必须指定正数scale')
+            normalized[col] = {"type": col_type, "scale": scale}
+        elif col_type != DEFAULT_STORAGE_TYPE:
+            normalized[col] = {"type": col_type, "scale": None}
+
+    return normalized
+
+
+def column_storage(storage_spec: Optional[Dict[str, Dict[str, Any]]], column: str) -> Dict[str, Any]:
+    """获取单列的存储配置，未配置时为Float64"""
+    if storage_spec and column in storage_spec:
+        return storage_spec[column]
+    return {"type": DEFAULT_STORAGE_TYPE, "scale": None}
+
+
+def clickhouse_column_type(storage_spec, column: str) -> str:
+    """获取列在ClickHouse中的类型"""
+    return column_storage(storage_spec, column)["type"]
+
+
+def encode_frame(df: pd.DataFrame, storage_spec) -> pd.DataFrame:
+    """按存储配置编码写入的数据（原地修改并返回df）"""
+    if not storage_spec:
+        return df
+
+    for col, col_spec in storage_spec.items():
+        if col not in df.columns:
+            continue
+        if col_spec["type"] == "Int32":
+            scaled = np.rint(df[col].to_numpy(dtype=np.float64) * col_spec["scale"])
+            info = np.iinfo(np.int32)
+            if len(scaled) and (scaled.min() < info.min or scaled.max() > info.max):
+                raise ValueError(f'列 "{col}" 的数值超出Int32定点存储范围')
+            df[col] = scaled.astype(np.int32)
+        else:
+            df[col] = df[col].astype(STORAGE_TYPES[col_spec["type"]])
+    return df
+
+
+def decode_frame(df: pd.DataFrame, storage_spec) -> pd.DataFrame:
+    """
+    将查询结果解码为数值（原地修改并返回df）
+
+    Float32与定点列解码为float32，内存占用为float64的一半。
+    """
+    if not storage_spec:
+        return df
+
+    for col, col_spec in storage_spec.items():
+        if col not in df.columns:
+            continue
+        if col_spec["type"] == "Int32":
+            df[col] = (df[col].to_numpy(dtype=np.float32) / np.float32(col_spec["scale"]))
+        else:
+            df[col] = df[col].astype(np.float32)
+    return df
+
+
+def output_decimals(storage_spec, column: str) -> Optional[int]:
+    """输出时保留的小数位数，定点列由scale决定"""
+    col_spec = column_storage(storage_spec, column)
+    if col_spec["type"] == "Int32":
+        return max(0, int(math.ceil(math.log10(col_spec["scale"]))))
+    return None
+
+
+def round_to_storage(values, storage_spec, column: str) -> np.ndarray:
+    """定点列按存储精度舍入（保留数组与dtype），其他列原样返回"""
+    arr = np.asarray(values)
+    decimals = output_decimals(storage_spec, column)
+    if decimals is None or arr.dtype.kind != "f":
+        return arr
+    return np.round(arr, decimals)
+
+
+def to_output_list(values, storage_spec=None, column: Optional[str] = None,
+                   nan_as_none: bool = False) -> List[Optional[float]]:
+    """
+    将数值数组转换为可JSON序列化的列表
+
+    float32直接转换会产生 0.10000000149011612 这类尾数，
+    这里按单精度有效位数（或定点小数位数）还原为最短表示。
+    nan_as_none 为True时NaN输出为None（JSON中的null，图表中显示为断点）。
+    """
+    arr = np.asarray(values)
+    if arr.dtype == np.float32:
+        decimals = output_decimals(storage_spec, column) if column else None
+        if decimals is not None:
+            result = np.round(arr.astype(np.float64), decimals).tolist()
+        else:
+            result = np.char.mod("%.7g", arr).astype(np.float64).tolist()
+    else:
+        result = arr.astype(np.float64, copy=False).tolist()
+    if nan_as_none:
+        result = [None if value != value else value for value in result]
+    return result
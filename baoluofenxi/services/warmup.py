@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import text
+
+from database import db
+from database_config import db_config
+
+
+def reset_connections(app):
+    """
+    丢弃从父进程继承的连接（preload_app 时在master中创建的连接池）
+
+    fork后父子进程共用同一批socket，必须在工作进程中重新建立连接。
+    """
+    import services.clickhouse_manager as clickhouse_module
+
+    with app.app_context():
+        # close=False：不关闭父进程仍在使用的连接，只在本进程中丢弃
+        db.engine.dispose(close=False)
+    clickhouse_module.clickhouse_manager = None
+
+
+def start_background_services(app):
+    """启动缓存预热和定期维护线程（fork后父进程的线程不会继承，需在工作进程中启动）"""
+    import services.cache_warmer as cache_warmer_module
+    import services.maintenance as maintenance_module
+
+    # 父进程中的实例在fork后没有对应线程，丢弃后重新创建
+    cache_warmer_module.cache_warmer = None
+    maintenance_module.maintenance_scheduler = None
+    if app.config.get("CACHE_WARM_ENABLED"):
+        cache_warmer_module.start_cache_warmer(app)
+    if app.config.get("MAINTENANCE_ENABLED"):
+        maintenance_module.start_maintenance_scheduler(app)
+
+
+def warm_up(app, connections: int = 1, envelopes: bool = True) -> Dict[str, Any]:
+    """
+    工作进程接收请求前的预热
+
+    - 建立 connections 个MySQL连接放入连接池（不超过 pool_size）
+    - 连接ClickHouse并执行一次查询
+    - 读取各试验类型的历史数据集版本
+    - envelopes 为True时按已保存的包络配置把包络读入进程内缓存
+      （磁盘缓存未命中时计算并写入）
+
+    各步骤失败只记录日志，不影响进程启动。
+
+    Returns:
+        Dict: 各步骤耗时（秒）或错误信息
+    """
+    report = {}
+    with app.app_context():
+        steps = [
+            ("mysql", lambda: _warm_mysql(connections)),
+            ("clickhouse", _warm_clickhouse),
+            ("historical_versions", _warm_historical_versions),
+        ]
+        if envelopes:
+            steps.append(("envelopes", _warm_envelopes))
+
+        for name, step in steps:
+            started = time.monotonic()
+            try:
+                step()
+                report[name] = round(time.monotonic() - started, 3)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"预热步骤 {name} 失败: {e}")
+                report[name] = f"失败: {e}"
+        db.session.remove()
+
+    logging.info(f"工作进程预热完成: {report}")
+    return report
+
+
+def start_background_warmup(app) -> threading.Thread:
+    """在后台线程中预热连接（不包括包络，包络由缓存预热线程处理），不阻塞启动"""
+    thread = threading.Thread(
+        target=warm_up, args=(app,), kwargs={"envelopes": False}, name="warmup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _warm_mysql(connections: int):
+    pool_size = db_config.get_mysql_config()["pool_size"]
+    opened = []
+    try:
+        # 同时持有多个连接，连接池才会创建多个连接
+        for _ in range(max(1, min(connections, pool_size))):
+            connection = db.engine.connect()
+            opened.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in opened:
+            connection.close()
+
+
+def _warm_clickhouse():
+    from services.clickhouse_manager import get_clickhouse_manager
+
+    if not db_config.is_clickhouse_enabled():
+        return
+    result = get_clickhouse_manager().execute_query("SELECT 1")
+    if not result["success"]:
+        raise RuntimeError(result["message"])
+
+
+def _warm_historical_versions():
+    from models.models import ExperimentType
+    from services.envelope_cache import EnvelopeCacheService
+
+    cache_service = EnvelopeCacheService()
+    for (experiment_type_id,) in db.session.query(ExperimentType.id).all():
+        cache_service.historical_version(experiment_type_id)
+
+
+def _warm_envelopes():
+    from models.models import EnvelopeSettings
+    from services.data_processor import DataProcessor
+
+    sampling_levels = db_config.get_app_config()["cache_warm_sampling_points"]
+    processor = DataProcessor()
+    for settings in EnvelopeSettings.query.all():
+        if not settings.selected_columns:
+            continue
+        columns = sorted(settings.selected_columns)
+        for sampling_points in sampling_levels:
+            result = processor.calculate_envelope_for_columns(
+                settings.experiment_type_id, columns, sampling_points=sampling_points
+            )
+            if "error" in result:
+                logging.info(
+                    f"跳过包络预热 {settings.experiment_type_id} {columns}: {result['error']}"
+                )
+                break
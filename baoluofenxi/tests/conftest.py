@@ -0,0 +1,119 @@
+"""
+测试公共夹具
+
+测试不连接MySQL和ClickHouse：元数据使用临时SQLite数据库，ClickHouse
+由内存中的 FakeClickHouse 代替（按存储类型编码保存，与真实表的取值一致）。
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+import services.clickhouse_manager as clickhouse_module  # noqa: E402
+from database import db  # noqa: E402
+from services.json_provider import NumpyJSONProvider  # noqa: E402
+from services.storage_types import decode_frame, encode_frame  # noqa: E402
+
+
+class FakeClickHouse:
+    """实现 ClickHouseManager 中上传、查询和删除用到的方法"""
+
+    def __init__(self):
+        self.tables = {}
+        self.summaries = {}
+        self.inserted_rows = 0
+
+    def sanitize_table_name(self, table_name):
+        return table_name
+
+    def create_timeseries_table(self, table_name, time_column, data_columns,
+                                storage_spec=None, ttl_seconds=None):
+        self.tables.setdefault(table_name, pd.DataFrame())
+        return True
+
+    def insert_dataframe(self, table_name, df, time_column, storage_spec=None):
+        encoded = encode_frame(df.fillna(0), storage_spec)
+        self.tables[table_name] = pd.concat([self.tables[table_name], encoded], ignore_index=True)
+        self.inserted_rows += len(df)
+        return {"success": True, "row_count": len(df), "table_name": table_name, "message": "ok"}
+
+    def insert_summary(self, table_name, summary_df):
+        self.summaries[table_name] = summary_df.copy()
+        return True
+
+    def query_data(self, table_name, time_column, columns=None, time_range=None, limit=None,
+                   storage_spec=None, after=None, before=None, descending=False,
+                   order_by=None, offset=None):
+        if table_name not in self.tables:
+            return pd.DataFrame()
+        df = self.tables[table_name]
+        if time_range:
+            df = df[(df[time_column] >= time_range[0]) & (df[time_column] <= time_range[1])]
+        if after is not None:
+            df = df[df[time_column] > after]
+        if before is not None:
+            df = df[df[time_column] < before]
+        df = df.sort_values(
+            [time_column] + list(order_by or []), ascending=not descending, kind="stable"
+        )
+        if columns:
+            df = df[columns]
+        if limit:
+            df = df.iloc[offset or 0:].head(limit)
+        return decode_frame(df.reset_index(drop=True), storage_spec)
+
+    def table_exists(self, table_name):
+        return table_name in self.tables
+
+    def drop_table(self, table_name):
+        self.tables.pop(table_name, None)
+        self.summaries.pop(table_name, None)
+        return True
+
+    def list_tables(self, patterns):
+        # 测试中创建的表都视为刚刚创建
+        return [{"name": name, "age_seconds": 0} for name in self.tables]
+
+    def table_storage(self, table_names):
+        return {}
+
+
+@pytest.fixture
+def clickhouse(monkeypatch):
+    fake = FakeClickHouse()
+    monkeypatch.setattr(clickhouse_module, "clickhouse_manager", fake)
+    return fake
+
+
+@pytest.fixture
+def app(tmp_path, clickhouse):
+    app = Flask("tests")
+    app.json = NumpyJSONProvider(app)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'metadata.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={"connect_args": {"check_same_thread": False}},
+    )
+    db.init_app(app)
+    with app.app_context():
+        import models.models  # noqa: F401  注册模型
+
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def experiment_type(app):
+    from models.models import ExperimentType
+
+    experiment_type = ExperimentType(name="测试类型", time_column="t", data_columns=["C1", "C2"])
+    db.session.add(experiment_type)
+    db.session.commit()
+    return experiment_type
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+from database import db
+from models.models import ExperimentData
+from services.chunked_upload import ChunkedUploadManager
+
+CHUNK_SIZE = 64
+
+
+def make_csv(rows=40):
+    lines = ["t,C1,C2"] + [f"{i * 0.1:.1f},{i},{i * 2}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def split_chunks(data):
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ChunkedUploadManager(root_dir=str(tmp_path / "chunked"))
+    manager.wait_timeout = 5
+    return manager
+
+
+def init(manager, experiment_type, data, file_checksum=None):
+    result = manager.init_upload(
+        experiment_type.id, "分块数据", "run.csv", len(data),
+        chunk_size=CHUNK_SIZE, file_checksum=file_checksum,
+    )
+    assert result["success"]
+    return result["data"]["upload_id"]
+
+
+def append_all(manager, upload_id, chunks, start=0):
+    for index, chunk in enumerate(chunks[start:], start):
+        assert manager.append_chunk(upload_id, index, chunk, sha256(chunk))["success"]
+
+
+def wait_ingest(manager, upload_id):
+    thread = manager._ingest_threads.get(upload_id)
+    if thread is not None:
+        thread.join(10)
+    with open(manager._ingest_path(upload_id), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def records():
+    db.session.expire_all()
+    return ExperimentData.query.all()
+
+
+def test_early_ingest_waits_for_complete_before_activation(app, experiment_type, manager, clickhouse):
+    data = make_csv()
+    upload_id = init(manager, experiment_type, data, file_checksum=sha256(data))
+    assert manager.start_ingest(app, upload_id)
+
+    append_all(manager, upload_id, split_chunks(data))
+    assert wait_ingest(manager, upload_id)["state"] == "success"
+    assert [record.status for record in records()] == ["processing"]
+
+    result = manager.complete_upload(upload_id)
+    assert result["success"] and result["row_count"] == 40
+    assert [record.status for record in records()] == ["active"]
+    # 重复调用complete返回同一结果
+    assert manager.complete_upload(upload_id)["data_id"] == result["data_id"]
+
+
+def test_resume_after_pause_longer_than_wait_timeout(app, experiment_type, manager):
+    data = make_csv()
+    chunks = split_chunks(data)
+    manager.wait_timeout = 0.3
+    upload_id = init(manager, experiment_type, data)
+    manager.start_ingest(app, upload_id)
+
+    append_all(manager, upload_id, chunks[:2])
+    time.sleep(1)
+    assert manager.get_status(upload_id)["data"]["ingest_state"] == "running"
+
+    append_all(manager, upload_id, chunks, start=2)
+    wait_ingest(manager, upload_id)
+    result = manager.complete_upload(upload_id)
+    assert result["success"] and result["row_count"] == 40
+
+
+def test_complete_reingests_after_failed_ingest(app, experiment_type, manager, clickhouse, monkeypatch):
+    data = make_csv()
+    upload_id = init(manager, experiment_type, data)
+
+    def broken_insert(*args, **kwargs):
+        return {"success": False, "message": "ClickHouse不可用"}
+
+    with monkeypatch.context() as patch:
+        patch.setattr(clickhouse, "insert_dataframe", broken_insert)
+        manager.start_ingest(app, upload_id)
+        append_all(manager, upload_id, split_chunks(data))
+        assert wait_ingest(manager, upload_id)["state"] == "failed"
+    assert records() == []
+
+    result = manager.complete_upload(upload_id)
+    assert result["success"] and result["row_count"] == 40
+    assert [record.status for record in records()] == ["active"]
+
+
+def test_dead_ingest_owner_is_restarted(app, experiment_type, manager):
+    data = make_csv()
+    upload_id = init(manager, experiment_type, data)
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    state = manager._ingest_state("running")
+    state["pid"] = process.pid
+    with open(manager._ingest_path(upload_id), "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    assert not manager._ingest_alive(upload_id, state)
+    assert manager.start_ingest(app, upload_id)
+    append_all(manager, upload_id, split_chunks(data))
+    wait_ingest(manager, upload_id)
+    assert manager.complete_upload(upload_id)["success"]
+
+
+def test_checksum_mismatch_discards_ingested_run(app, experiment_type, manager, clickhouse):
+    data = make_csv()
+    upload_id = init(manager, experiment_type, data, file_checksum=sha256(b"other file"))
+    manager.start_ingest(app, upload_id)
+    append_all(manager, upload_id, split_chunks(data))
+    assert wait_ingest(manager, upload_id)["state"] == "success"
+
+    result = manager.complete_upload(upload_id)
+    assert not result["success"]
+    assert records() == []
+    assert clickhouse.tables == {}
+    assert manager.get_status(upload_id)["data"]["aborted"]
+
+
+def test_abort_does_not_block_and_ingest_cleans_up(app, experiment_type, manager, clickhouse):
+    data = make_csv()
+    chunks = split_chunks(data)
+    upload_id = init(manager, experiment_type, data)
+    manager.start_ingest(app, upload_id)
+    append_all(manager, upload_id, chunks[:2])
+    thread = manager._ingest_threads[upload_id]
+
+    started = time.monotonic()
+    assert manager.abort_upload(upload_id)["success"]
+    assert time.monotonic() - started < 1
+
+    thread.join(10)
+    assert not thread.is_alive()
+    assert records() == []
+    assert clickhouse.tables == {}
+    assert not manager.append_chunk(upload_id, 2, chunks[2], sha256(chunks[2]))["success"]
+
+
+def test_abort_discards_ingested_run_and_refuses_after_complete(app, experiment_type, manager, clickhouse):
+    data = make_csv()
+    upload_id = init(manager, experiment_type, data)
+    manager.start_ingest(app, upload_id)
+    append_all(manager, upload_id, split_chunks(data))
+    wait_ingest(manager, upload_id)
+
+    assert manager.abort_upload(upload_id)["success"]
+    assert records() == []
+    assert clickhouse.tables == {}
+    assert not manager.complete_upload(upload_id)["success"]
+
+    other_id = init(manager, experiment_type, data)
+    append_all(manager, other_id, split_chunks(data))
+    assert manager.complete_upload(other_id)["success"]
+    assert not manager.abort_upload(other_id)["success"]
+    assert [record.status for record in records()] == ["active"]
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from services.exceedance import (
+    check_exceedance,
+    estimate_time_shift,
+    grid_edges,
+    resample_to_grid,
+)
+
+GRID_TIMES = np.arange(0, 40, 0.002)
+RUN_TIMES = np.arange(0, 40, 0.0031)
+
+
+def profile(t):
+    return np.sin(t * 0.7) + 0.5 * np.sin(t * 2.3) + (t > 15) * 1.5
+
+
+def oscillation(t):
+    return 0.3 * np.sin(t * 0.2) + 2.9 * np.sin(t * 3.44 * 2 * np.pi) * np.exp(-((t - 20) / 6) ** 2)
+
+
+def envelope_of(signal, width=0.1):
+    values = signal(GRID_TIMES)
+    return {"C1": (values + width, values - width)}
+
+
+@pytest.mark.parametrize("shift", [3.3, -1.25, 0.0])
+def test_time_shift_recovers_known_offset(shift):
+    result = estimate_time_shift(
+        GRID_TIMES, envelope_of(profile), RUN_TIMES, {"C1": profile(RUN_TIMES - shift)}
+    )
+    assert result["time_shift"] == pytest.approx(-shift, abs=0.005)
+    assert result["correlation"] > 0.99
+
+
+def test_time_shift_refines_beyond_one_coarse_step():
+    # 桶平均后的粗估计偏离真实偏移约1.7个网格间隔，细化范围需要覆盖它
+    coarse_points = 256
+    step = (GRID_TIMES[-1] - GRID_TIMES[0]) / coarse_points
+    result = estimate_time_shift(
+        GRID_TIMES,
+        envelope_of(oscillation),
+        RUN_TIMES,
+        {"C1": oscillation(RUN_TIMES - 3.3)},
+        coarse_points=coarse_points,
+    )
+    assert abs(result["coarse_shift"] + 3.3) > step
+    assert result["time_shift"] == pytest.approx(-3.3, abs=0.005)
+
+
+def test_time_shift_respects_max_shift():
+    result = estimate_time_shift(
+        GRID_TIMES, envelope_of(profile), RUN_TIMES, {"C1": profile(RUN_TIMES - 3.3)},
+        max_shift=1.0,
+    )
+    assert abs(result["time_shift"]) <= 1.0
+
+
+def test_exceedance_reports_intervals_per_column():
+    grid = np.linspace(0, 10, 1001)
+    envelopes = {
+        "C1": (np.full(len(grid), 1.0), np.full(len(grid), -1.0)),
+        "C2": (np.full(len(grid), 1.0), np.full(len(grid), -1.0)),
+    }
+    run_times = np.linspace(2, 8, 601)
+    c1 = np.zeros(len(run_times))
+    c1[(run_times >= 3) & (run_times <= 3.5)] = 1.5
+    c1[(run_times >= 6) & (run_times <= 6.2)] = -3.0
+
+    result = check_exceedance(
+        grid, envelopes, run_times, {"C1": c1, "C2": np.zeros(len(run_times))}, trace_points=50
+    )
+
+    assert not result["passed"]
+    # 只检查对比试验时间范围 [2, 8] 内的网格点
+    assert result["checked_points"] == 601
+    c1_stats = result["columns"]["C1"]
+    assert c1_stats["interval_count"] == 2
+    assert c1_stats["violation_points"] == 51 + 21
+    assert c1_stats["max_overshoot"] == pytest.approx(2.0)
+    lower, upper = c1_stats["intervals"]
+    assert lower["direction"] == "lower"
+    assert (lower["start_time"], lower["end_time"]) == pytest.approx((6.0, 6.2))
+    assert upper["direction"] == "upper"
+    assert upper["peak_overshoot"] == pytest.approx(0.5)
+    assert result["columns"]["C2"]["passed"]
+    assert len(result["trace"]["C1"]["time_points"]) == 50
+    assert max(result["trace"]["C1"]["max"]) == pytest.approx(1.5)
+
+
+def test_exceedance_tolerance_and_interval_limit():
+    grid = np.linspace(0, 10, 1001)
+    envelopes = {"C1": (np.full(len(grid), 1.0), np.full(len(grid), -1.0))}
+    run = np.where(np.arange(len(grid)) % 10 == 0, 1.2, 0.0)
+
+    strict = check_exceedance(grid, envelopes, grid, {"C1": run}, trace_points=0, max_intervals=5)
+    assert strict["columns"]["C1"]["interval_count"] == 101
+    assert len(strict["columns"]["C1"]["intervals"]) == 5
+    assert strict["columns"]["C1"]["truncated"]
+    assert "trace" not in strict
+
+    tolerant = check_exceedance(grid, envelopes, grid, {"C1": run}, tolerance=0.25, trace_points=0)
+    assert tolerant["passed"]
+
+
+def test_resample_integer_series_onto_wider_grid():
+    times = np.arange(2, 8, dtype=np.int64)
+    values = np.array([1, 2, 4, 7, 11, 16], dtype=np.int64)
+    edges = grid_edges(0, 10, 5)
+
+    resampled = resample_to_grid(times, values, edges, "mean")
+
+    assert resampled.dtype == np.float64
+    # 数据范围 [2, 7] 之外的桶为NaN，桶平均值不截断
+    assert np.array_equal(resampled, [np.nan, 1.5, 5.5, 13.5, np.nan], equal_nan=True)
+    assert resample_to_grid(times, values, edges, "max").dtype == np.float64
+
+
+def test_resample_keeps_float32():
+    values = np.array([1.0, 2.0, 3.0], dtype=np.float32)
+    resampled = resample_to_grid(np.array([0.0, 1.0, 2.0]), values, grid_edges(0, 4, 4), "min")
+    assert resampled.dtype == np.float32
+    assert np.isnan(resampled[-1])
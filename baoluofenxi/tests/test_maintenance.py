@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from database import db
+from models.models import ExperimentData
+from services.maintenance import MaintenanceService
+
+
+def add_processing_upload(experiment_type, clickhouse, name, age):
+    clickhouse.create_timeseries_table(name, "t", ["C1", "C2"])
+    record = ExperimentData(
+        experiment_type_id=experiment_type.id,
+        data_name=name,
+        clickhouse_table_name=name,
+        status="processing",
+        upload_time=datetime.utcnow() - age,
+    )
+    db.session.add(record)
+    db.session.commit()
+
+
+def test_processing_uploads_are_kept_for_the_chunked_upload_retention(experiment_type, clickhouse):
+    service = MaintenanceService()
+    keep_for = max(service.grace_period, timedelta(seconds=service.chunked_upload_retention))
+    add_processing_upload(experiment_type, clickhouse, "exp_recent", timedelta(minutes=5))
+    add_processing_upload(experiment_type, clickhouse, "exp_waiting", keep_for - timedelta(hours=1))
+    add_processing_upload(experiment_type, clickhouse, "exp_stale", keep_for + timedelta(hours=1))
+
+    result = service.clean_data_tables()
+
+    assert result["stale_uploads"] == 1
+    assert result["dropped_tables"] == ["exp_stale"]
+    assert sorted(record.data_name for record in ExperimentData.query.all()) == ["exp_recent", "exp_waiting"]
@@ -0,0 +1,78 @@
+import base64
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from services.response_formats import (
+    BASE64_MEDIA_TYPE,
+    UnsupportedFormatError,
+    _pack,
+    negotiate_format,
+    uniform_axis,
+)
+
+
+def decode(block):
+    dtype = "<f4" if block["encoding"] == "float32" else "<f8"
+    return np.frombuffer(base64.b64decode(block["data"]), dtype=dtype)
+
+
+def test_uniform_axis_detects_ranges():
+    times = np.arange(1000) * 0.001 + 5.0
+    axis = uniform_axis(times)
+    assert axis["encoding"] == "range"
+    assert axis["count"] == 1000
+    assert axis["start"] == 5.0
+    assert axis["step"] == pytest.approx(0.001)
+    assert np.allclose(axis["start"] + np.arange(axis["count"]) * axis["step"], times)
+
+
+@pytest.mark.parametrize("times", [
+    [0.0],
+    [0.0, 0.1, 0.25],
+    [0.0, np.nan, 0.2],
+    [0.3, 0.2, 0.1],
+    [1.0, 1.0, 1.0],
+])
+def test_uniform_axis_rejects_irregular_times(times):
+    assert uniform_axis(np.asarray(times, dtype=np.float64)) is None
+
+
+def test_pack_encodes_nested_arrays():
+    payload = {
+        "time_points": [0.0, 0.5, 1.0],
+        "envelope_data": {"C1": {"upper": [1.0, None, 3.0], "lower": np.array([0, 1, 2])}},
+        "columns": ["C1"],
+        "count": np.int64(3),
+        "raw_times": {"time_points": [0.0, 0.1, 0.3]},
+    }
+    packed = _pack(payload, None, raw=False)
+
+    assert packed["time_points"] == {"encoding": "range", "start": 0.0, "step": 0.5, "count": 3}
+    upper = packed["envelope_data"]["C1"]["upper"]
+    assert upper["encoding"] == "float32" and upper["count"] == 3
+    assert np.array_equal(decode(upper), [1.0, np.nan, 3.0], equal_nan=True)
+    assert decode(packed["envelope_data"]["C1"]["lower"]).tolist() == [0.0, 1.0, 2.0]
+    # 非等间隔的时间轴保留float64精度
+    irregular = packed["raw_times"]["time_points"]
+    assert irregular["encoding"] == "float64"
+    assert decode(irregular).tolist() == [0.0, 0.1, 0.3]
+    assert packed["columns"] == ["C1"]
+    assert packed["count"] == 3 and type(packed["count"]) is int
+
+
+def test_pack_raw_keeps_bytes():
+    packed = _pack({"values": [1.5, 2.5]}, None, raw=True)
+    assert np.frombuffer(packed["values"]["data"], dtype="<f4").tolist() == [1.5, 2.5]
+
+
+def test_negotiate_format():
+    app = Flask("tests")
+    with app.test_request_context(headers={"Accept": f"{BASE64_MEDIA_TYPE}, */*;q=0.1"}):
+        assert negotiate_format() == "base64"
+        assert negotiate_format("json") == "json"
+        with pytest.raises(UnsupportedFormatError):
+            negotiate_format("xml")
+    with app.test_request_context(headers={"Accept": "*/*"}):
+        assert negotiate_format() == "json"
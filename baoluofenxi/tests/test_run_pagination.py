@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from database import db
+from models.models import ExperimentData
+from services.data_processor import DataProcessor
+
+# 时间 3.0 有4行、7.0 有3行、9.0 有12行（多于一页），检查在同时间的行中间分页
+TIMES = [0.0, 1.0, 2.0, 3.0, 3.0, 3.0, 3.0, 4.0, 5.0, 6.0, 7.0, 7.0, 7.0, 8.0] + [9.0] * 12 + [10.0]
+
+
+@pytest.fixture
+def run(clickhouse, experiment_type):
+    # 同时间的行按数据列排序，C1倒序写入以确认分页不依赖写入顺序
+    df = pd.DataFrame({
+        "t": TIMES,
+        "C1": np.arange(len(TIMES), dtype=np.float64),
+        "C2": np.zeros(len(TIMES)),
+    })
+    clickhouse.tables["exp_run"] = df.iloc[::-1].reset_index(drop=True)
+    record = ExperimentData(
+        experiment_type_id=experiment_type.id,
+        data_name="分页",
+        clickhouse_table_name="exp_run",
+        row_count=len(TIMES),
+    )
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def page(record, **kwargs):
+    result = DataProcessor().get_run_page(record, columns=["C1"], **kwargs)
+    assert result["success"], result
+    return result["data"]
+
+
+def walk_forward(record, page_size):
+    pages, cursor = [], {}
+    while True:
+        data = page(record, page_size=page_size, **cursor)
+        pages.append(data["data"]["C1"].tolist())
+        if not data["page"]["has_more"]:
+            return pages
+        cursor = {"after": data["page"]["after"], "offset": data["page"]["after_offset"]}
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 5, 100])
+def test_forward_pages_cover_every_row_once(run, page_size):
+    pages = walk_forward(run, page_size)
+    assert sum(pages, []) == list(range(len(TIMES)))
+    assert all(len(rows) == page_size for rows in pages[:-1])
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 5])
+def test_backward_pages_cover_every_row_once(run, page_size):
+    rows, cursor = [], {"before": 11.0}
+    while True:
+        data = page(run, page_size=page_size, **cursor)
+        rows = data["data"]["C1"].tolist() + rows
+        assert data["page"]["direction"] == "backward"
+        if not data["page"]["has_more"]:
+            break
+        cursor = {"before": data["page"]["before"], "offset": data["page"]["before_offset"]}
+    assert rows == list(range(len(TIMES)))
+
+
+def test_duplicate_times_beyond_one_page_stay_within_page_size(run):
+    first = page(run, after=8.0, page_size=5)
+    assert first["time_points"].tolist() == [9.0] * 5
+    assert first["page"]["after"] == 9.0 and first["page"]["after_offset"] == 5
+    assert first["page"]["has_more"]
+
+    second = page(run, after=9.0, offset=5, page_size=5)
+    assert second["data"]["C1"].tolist() == [19, 20, 21, 22, 23]
+    # 上一页游标指回第一页的末尾
+    assert (second["page"]["before"], second["page"]["before_offset"]) == (9.0, 5)
+    previous = page(run, before=9.0, offset=5, page_size=5)
+    assert previous["data"]["C1"].tolist() == first["data"]["C1"].tolist()
+
+    third = page(run, after=9.0, offset=10, page_size=5)
+    assert third["data"]["C1"].tolist() == [24, 25, 26]
+    assert not third["page"]["has_more"]
+
+
+def test_cursor_offsets_counted_from_group_end(run):
+    # 9.0 的最后7行之前：向后翻页取这7行中的前5行，向前翻页取之前的5行
+    data = page(run, after=9.0, offset=-7, page_size=5)
+    assert data["data"]["C1"].tolist() == [19, 20, 21, 22, 23]
+    assert data["page"]["after_offset"] == -2
+    data = page(run, before=9.0, offset=-7, page_size=5)
+    assert data["data"]["C1"].tolist() == [14, 15, 16, 17, 18]
+    assert data["page"]["before_offset"] is None
+    assert (data["page"]["after"], data["page"]["after_offset"]) == (9.0, -7)
+
+
+def test_page_ending_on_complete_time_uses_strict_cursor(run):
+    data = page(run, page_size=7)
+    assert data["time_points"].tolist() == [0.0, 1.0, 2.0, 3.0, 3.0, 3.0, 3.0]
+    assert data["page"] == {
+        "page_size": 7, "direction": "forward", "has_more": True,
+        "after": 3.0, "after_offset": None, "before": 0.0, "before_offset": None,
+    }
+
+
+def test_rejects_invalid_cursor_arguments(run):
+    processor = DataProcessor()
+    assert not processor.get_run_page(run, after=1.0, before=5.0)["success"]
+    assert not processor.get_run_page(run, offset=3)["success"]
+    assert not processor.get_run_page(run, page_size=0)["success"]
+    assert not processor.get_run_page(run, columns=["missing"])["success"]
@@ -0,0 +1,100 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+import services.scratch_store as scratch_module
+from services.data_processor import DataProcessor
+from services.scratch_store import ScratchStore, is_scratch_id, new_scratch_id
+
+
+def age_entry(store, temp_data_id, seconds):
+    meta_path = os.path.join(store.root_dir, temp_data_id, "meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["created_at"] -= seconds
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def frame():
+    return pd.DataFrame({
+        "t": np.arange(5, dtype=np.float64),
+        "C1": np.linspace(0, 1, 5, dtype=np.float32),
+        "C2": np.arange(5, dtype=np.float64) * 2,
+    })
+
+
+def test_save_and_load_columns(tmp_path):
+    store = ScratchStore(root_dir=str(tmp_path), ttl=3600)
+    temp_data_id = new_scratch_id()
+    assert is_scratch_id(temp_data_id)
+
+    meta = store.save(temp_data_id, frame(), {"experiment_type_id": 7})
+    assert meta["row_count"] == 5
+    assert store.meta(temp_data_id)["experiment_type_id"] == 7
+
+    loaded = store.load(temp_data_id, ["C1", "t", "missing"])
+    assert list(loaded.columns) == ["C1", "t"]
+    assert loaded["C1"].dtype == np.float32
+    pd.testing.assert_frame_equal(store.load(temp_data_id), frame())
+
+    assert store.delete(temp_data_id)
+    assert store.load(temp_data_id) is None
+    assert not store.delete(temp_data_id)
+
+
+def test_expired_entries_are_hidden_and_cleaned(tmp_path):
+    store = ScratchStore(root_dir=str(tmp_path), ttl=60)
+    expired, fresh = new_scratch_id(), new_scratch_id()
+    store.save(expired, frame(), {})
+    store.save(fresh, frame(), {})
+    age_entry(store, expired, 120)
+    leftover = tmp_path / f"{new_scratch_id()}.abcd1234.tmp"
+    leftover.mkdir()
+    os.utime(leftover, (0, 0))
+
+    assert store.meta(expired) is None
+    assert store.load(expired) is None
+
+    preview = store.clean_expired(dry_run=True)
+    assert sorted(preview["removed"]) == sorted([expired, leftover.name])
+    assert preview["reclaimed_bytes"] > 0
+    assert os.path.isdir(tmp_path / expired)
+
+    store.clean_expired()
+    assert sorted(os.listdir(tmp_path)) == [fresh]
+    assert store.load(fresh) is not None
+
+
+@pytest.mark.parametrize("temp_data_id", ["../etc", "scratch_x", "temp_exp_1"])
+def test_rejects_ids_outside_the_store(tmp_path, temp_data_id):
+    store = ScratchStore(root_dir=str(tmp_path), ttl=60)
+    with pytest.raises(ValueError):
+        store.save(temp_data_id, frame(), {})
+
+
+def test_temp_upload_stores_integer_columns_as_float64(tmp_path, monkeypatch, experiment_type):
+    store = ScratchStore(root_dir=str(tmp_path / "scratch"), ttl=3600)
+    monkeypatch.setattr(scratch_module, "scratch_store", store)
+    experiment_type.storage_types = {"C2": "Float32"}
+    data = b"t,C1,C2\n2,20,\n0,0,1\n1,10,2\n"
+    processor = DataProcessor()
+    processor.temp_storage = "local"
+
+    result = processor.process_temp_upload(
+        FileStorage(stream=io.BytesIO(data), filename="cmp.csv"), experiment_type
+    )
+
+    assert result["success"], result
+    loaded = store.load(result["temp_data_id"])
+    # 与ClickHouse表中的类型一致：时间列和未配置的列为Float64
+    assert loaded["t"].dtype == np.float64
+    assert loaded["C1"].dtype == np.float64
+    assert loaded["C2"].dtype == np.float32
+    assert loaded["t"].tolist() == [0.0, 1.0, 2.0]
+    assert loaded["C2"].tolist() == [1.0, 2.0, 0.0]
@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from services.shared_cache import SharedDiskCache
+
+
+def age(path, seconds):
+    stamp = os.path.getmtime(path) - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_bytes_and_arrays_round_trip(tmp_path):
+    cache = SharedDiskCache(root_dir=str(tmp_path), max_bytes=1 << 20)
+    assert cache.get_bytes("envelope", ("a", 1)) is None
+
+    cache.put_bytes("envelope", ("a", 1), b"payload")
+    assert cache.get_bytes("envelope", ("a", 1))[:] == b"payload"
+
+    array = np.arange(10, dtype=np.float32)
+    cache.put_array("column", "k", array)
+    cached = cache.get_array("column", "k")
+    assert cached.dtype == np.float32
+    assert np.array_equal(cached, array)
+    assert cache.get_path("column", "k", ".npy").endswith(".npy")
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_eviction_removes_least_recently_used_first(tmp_path):
+    cache = SharedDiskCache(root_dir=str(tmp_path), max_bytes=10_000)
+    paths = [cache.put_bytes("ns", key, b"x" * 3000) for key in range(3)]
+    for offset, path in enumerate(paths):
+        age(path, 1000 - offset * 100)
+    # 命中会刷新修改时间，最旧的条目因此变为最近使用
+    assert cache.get_bytes("ns", 0) is not None
+
+    cache.put_bytes("ns", 3, b"x" * 3000)
+
+    assert cache.get_bytes("ns", 1) is None
+    assert cache.get_bytes("ns", 0) is not None
+    assert cache.get_bytes("ns", 2) is not None
+    assert cache.get_bytes("ns", 3) is not None
+    assert cache.stats()["bytes"] <= 10_000 * 0.9
+
+
+def test_evict_is_noop_under_limit(tmp_path):
+    cache = SharedDiskCache(root_dir=str(tmp_path), max_bytes=10_000)
+    cache.put_bytes("ns", "k", b"x" * 100)
+    assert cache.evict() == (0, 0)
+    assert cache.stats()["files"] == 1
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.storage_types import (
+    decode_frame,
+    encode_frame,
+    normalize_storage_spec,
+    round_to_storage,
+    to_output_list,
+)
+
+COLUMNS = ["C1", "C2", "C3"]
+
+
+def frame():
+    return pd.DataFrame({
+        "t": [0.0, 0.1, 0.2],
+        "C1": [1.2345, -0.001, 12.5],
+        "C2": [0.1, 0.2, 0.3],
+        "C3": [1e-9, 2.0, 3.0],
+    })
+
+
+def test_normalize_expands_wildcard_and_drops_float64():
+    spec = normalize_storage_spec(
+        {"*": "Float32", "C1": {"type": "Int32", "scale": 1000}, "C3": "Float64"}, COLUMNS
+    )
+    assert spec == {
+        "C1": {"type": "Int32", "scale": 1000},
+        "C2": {"type": "Float32", "scale": None},
+    }
+
+
+@pytest.mark.parametrize("config", [
+    {"C9": "Float32"},
+    {"C1": "Int16"},
+    {"C1": "Int32"},
+    {"C1": {"type": "Int32", "scale": 0}},
+    ["Float32"],
+])
+def test_normalize_rejects_invalid_config(config):
+    with pytest.raises(ValueError):
+        normalize_storage_spec(config, COLUMNS)
+
+
+def test_encode_decode_round_trip():
+    spec = normalize_storage_spec({"C1": {"type": "Int32", "scale": 1000}, "C2": "Float32"}, COLUMNS)
+    encoded = encode_frame(frame(), spec)
+    assert encoded["C1"].dtype == np.int32
+    assert encoded["C1"].tolist() == [1234, -1, 12500]
+    assert encoded["C2"].dtype == np.float32
+    assert encoded["C3"].dtype == np.float64
+
+    decoded = decode_frame(encoded, spec)
+    assert decoded["C1"].dtype == np.float32
+    assert decoded["C1"].to_numpy() == pytest.approx([1.234, -0.001, 12.5], abs=1e-6)
+    assert decoded["C2"].to_numpy() == pytest.approx([0.1, 0.2, 0.3], rel=1e-7)
+    assert decoded["C3"].tolist() == frame()["C3"].tolist()
+
+    # 输出时去掉单精度尾数，定点列按scale保留小数位
+    assert to_output_list(decoded["C1"], spec, "C1") == [1.234, -0.001, 12.5]
+    assert to_output_list(decoded["C2"], spec, "C2") == [0.1, 0.2, 0.3]
+    assert round_to_storage(decoded["C1"].to_numpy(), spec, "C1").dtype == np.float32
+
+
+def test_encode_rejects_values_outside_int32_range():
+    spec = normalize_storage_spec({"C1": {"type": "Int32", "scale": 1e9}}, COLUMNS)
+    with pytest.raises(ValueError):
+        encode_frame(frame(), spec)
+
+
+def test_output_list_nan_as_none():
+    values = np.array([1.5, np.nan], dtype=np.float32)
+    assert to_output_list(values, nan_as_none=True) == [1.5, None]
@@ -0,0 +1,60 @@
+import io
+
+import pytest
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+from services.data_processor import DataProcessor
+
+
+def processor(chunk_size):
+    processor = DataProcessor()
+    processor.batch_size = chunk_size
+    return processor
+
+
+def csv_file(lines):
+    data = ("\n".join(["t,C1,C2"] + lines) + "\n").encode("utf-8")
+    return FileStorage(stream=io.BytesIO(data), filename="run.csv")
+
+
+def xlsx_file(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["t", "C1", "C2"])
+    for row in rows:
+        sheet.append(row)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+    return FileStorage(stream=stream, filename="run.xlsx")
+
+
+@pytest.mark.parametrize("blank", ["", " ", "abc"])
+def test_later_chunk_with_stray_cell_is_coerced(clickhouse, experiment_type, blank):
+    lines = [f"{i},{i},{i * 2}" for i in range(30)]
+    # 第三块（每块10行）中有一个空白或文本单元格，该块按类型推断会变为文本列
+    lines[25] = f"25,{blank},50"
+    result = processor(10).process_upload(csv_file(lines), "数据", experiment_type)
+
+    assert result["success"], result
+    assert result["row_count"] == 29
+    assert 25 not in clickhouse.tables[result["table_name"]]["t"].tolist()
+
+
+def test_excel_chunk_with_empty_column_is_accepted(clickhouse, experiment_type):
+    rows = [[i, i, i * 2] for i in range(20)]
+    for row in rows[10:]:
+        row[2] = None
+    rows.append([20, 20, 40])
+    result = processor(10).process_upload(xlsx_file(rows), "数据", experiment_type)
+
+    assert result["success"], result
+    assert result["row_count"] == 11
+
+
+def test_first_chunk_still_rejects_text_columns(clickhouse, experiment_type):
+    lines = [f"{i},x{i},{i}" for i in range(30)]
+    result = processor(10).process_upload(csv_file(lines), "数据", experiment_type)
+    assert not result["success"]
+    assert "C1" in result["message"]
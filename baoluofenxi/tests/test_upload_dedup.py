@@ -0,0 +1,74 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from services.data_processor import DataProcessor
+from services.dataset_hash import PREFIX_ROWS, DatasetHasher
+
+
+def csv_file(rows, name="run.csv", fmt="{:.1f}", tail_offset=0.0):
+    lines = ["t,C1,C2"]
+    for i in range(rows):
+        c2 = i * 2 + (tail_offset if i >= PREFIX_ROWS else 0.0)
+        lines.append(f"{fmt.format(i * 0.1)},{i},{fmt.format(c2)}")
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+    return FileStorage(stream=io.BytesIO(data), filename=name)
+
+
+def upload(experiment_type, file):
+    result = DataProcessor().process_upload(file, "数据", experiment_type)
+    assert result["success"], result
+    return result
+
+
+def test_prefix_hash_does_not_depend_on_chunking():
+    df = pd.DataFrame({"t": range(25000), "C1": 1.0, "C2": 2.0}, dtype="float64")
+    whole = DatasetHasher("t", ["C1", "C2"])
+    whole.update(df)
+    chunked = DatasetHasher("t", ["C1", "C2"])
+    for start in range(0, len(df), 7000):
+        chunked.update(df.iloc[start:start + 7000])
+    assert whole.prefix_complete and chunked.prefix_complete
+    assert whole.prefix_hexdigest() == chunked.prefix_hexdigest()
+    assert whole.hexdigest() == chunked.hexdigest()
+    assert whole.prefix_hexdigest() != whole.hexdigest()
+
+
+def test_hash_accepts_single_row_chunks_and_ignores_zero_sign():
+    # 单行的float64块 to_numpy 得到的是只读视图，且无需复制即为C连续
+    df = pd.DataFrame({"t": [0.0], "C1": [-0.0], "C2": [1.0]})
+    hasher = DatasetHasher("t", ["C1", "C2"])
+    hasher.update(df)
+    positive = DatasetHasher("t", ["C1", "C2"])
+    positive.update(df.abs())
+    assert hasher.hexdigest() == positive.hexdigest()
+    assert np.signbit(df["C1"].iloc[0])
+
+
+@pytest.mark.parametrize("rows", [50, PREFIX_ROWS + 5000])
+def test_same_content_in_other_file_is_not_written_again(experiment_type, clickhouse, rows):
+    first = upload(experiment_type, csv_file(rows))
+    inserted = clickhouse.inserted_rows
+
+    # 数字书写方式不同，原始文件哈希不同，数据内容相同
+    second = upload(experiment_type, csv_file(rows, fmt="{:.3f}"))
+    assert second["deduplicated"]
+    assert second["table_name"] == first["table_name"]
+    assert clickhouse.inserted_rows == inserted
+    assert len(clickhouse.tables) == 1
+
+
+def test_same_prefix_different_content_is_written_in_full(experiment_type, clickhouse):
+    rows = PREFIX_ROWS + 5000
+    first = upload(experiment_type, csv_file(rows))
+    second = upload(experiment_type, csv_file(rows, tail_offset=1.0))
+
+    assert not second["deduplicated"]
+    assert second["row_count"] == rows
+    assert second["table_name"] != first["table_name"]
+    stored = clickhouse.tables[second["table_name"]]
+    assert len(stored) == rows
+    assert stored["C2"].iloc[-1] == (rows - 1) * 2 + 1.0
@@ -0,0 +1,14 @@
+"""
+生产环境WSGI入口
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+默认使用 production 配置（可通过环境变量 FLASK_CONFIG 指定）。后台线程
+（缓存预热、定期维护）和连接池在工作进程中由 gunicorn.conf.py 的钩子启动，
+不在master中创建，preload_app 时fork不会复制线程和连接。
+"""
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get("FLASK_CONFIG") or "production", start_background=False)